@@ -33,7 +33,7 @@ CREATE OR REPLACE TABLE SUPPLIERS (
     RISK_SCORE NUMBER
 );
 
--- Production table
+-- Production table (clustered by date, so date-range queries prune micro-partitions)
 CREATE OR REPLACE TABLE PRODUCTION (
     PRODUCTION_ID STRING,
     PLANT_ID STRING,
@@ -41,7 +41,7 @@ CREATE OR REPLACE TABLE PRODUCTION (
     PRODUCTION_DATE DATE,
     QUANTITY NUMBER,
     EFFICIENCY_PERCENT NUMBER
-);
+) CLUSTER BY (PRODUCTION_DATE, PLANT_ID);
 
 -- Financial KPIs table
 CREATE OR REPLACE TABLE FINANCIAL_KPIS (
@@ -50,7 +50,7 @@ CREATE OR REPLACE TABLE FINANCIAL_KPIS (
     INVENTORY_VALUE NUMBER,
     WORKING_CAPITAL NUMBER,
     COST_SAVINGS NUMBER
-);
+) CLUSTER BY (KPI_DATE);
 
 -- Test tables created
 SELECT 'Tables created successfully' AS STATUS;
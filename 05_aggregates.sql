@@ -0,0 +1,284 @@
+-- Manufacturing Intelligence Demo - Maintained Aggregates
+-- Summary tables kept current from table streams, so INVENTORY_INSIGHTS,
+-- SUPPLIER_RISK and the dashboard read O(plants) rows instead of scanning
+-- the base tables. PRODUCTION_ROLLUP does the same per day, week and month
+-- for date-range views. Run after 04_cortex.sql; loads may keep running.
+
+USE DATABASE MANUFACTURING_DEMO;
+USE SCHEMA DEMO_DATA;
+USE WAREHOUSE DEMO_WH;
+
+-- Inventory totals per plant and category
+CREATE OR REPLACE TABLE INVENTORY_SUMMARY (
+    PLANT_ID STRING,
+    CATEGORY STRING,
+    TOTAL_STOCK NUMBER,
+    TOTAL_REORDER_POINT NUMBER,
+    TOTAL_VALUE DOUBLE,
+    ITEM_COUNT NUMBER,
+    PRIMARY KEY (PLANT_ID, CATEGORY)
+);
+
+-- Production totals per plant (AVG = EFFICIENCY_SUM / EFFICIENCY_COUNT)
+CREATE OR REPLACE TABLE PRODUCTION_SUMMARY (
+    PLANT_ID STRING,
+    TOTAL_QUANTITY NUMBER,
+    EFFICIENCY_SUM DOUBLE,
+    EFFICIENCY_COUNT NUMBER,
+    PRODUCTION_COUNT NUMBER,
+    PRIMARY KEY (PLANT_ID)
+);
+
+-- Supplier risk classification, one row per supplier
+CREATE OR REPLACE TABLE SUPPLIER_RISK_SUMMARY (
+    SUPPLIER_ID STRING,
+    SUPPLIER_NAME STRING,
+    COUNTRY STRING,
+    PERFORMANCE_SCORE NUMBER,
+    RISK_SCORE NUMBER,
+    RISK_CATEGORY STRING,
+    PRIMARY KEY (SUPPLIER_ID)
+);
+
+-- Production per plant and period; GRAIN is DAY, WEEK (Monday start) or MONTH
+CREATE OR REPLACE TABLE PRODUCTION_ROLLUP (
+    GRAIN STRING,
+    PERIOD_START DATE,
+    PLANT_ID STRING,
+    TOTAL_QUANTITY NUMBER,
+    EFFICIENCY_SUM DOUBLE,
+    EFFICIENCY_COUNT NUMBER,
+    PRODUCTION_COUNT NUMBER,
+    PRIMARY KEY (GRAIN, PERIOD_START, PLANT_ID)
+) CLUSTER BY (GRAIN, PERIOD_START);
+
+-- Change capture on the base tables
+CREATE OR REPLACE STREAM INVENTORY_CHANGES ON TABLE INVENTORY;
+CREATE OR REPLACE STREAM PRODUCTION_CHANGES ON TABLE PRODUCTION;
+CREATE OR REPLACE STREAM PRODUCTION_ROLLUP_CHANGES ON TABLE PRODUCTION;
+CREATE OR REPLACE STREAM SUPPLIER_CHANGES ON TABLE SUPPLIERS;
+
+-- Initial full build, as of each stream's offset: a row written after the
+-- stream was created is in the stream, the rest are in the build
+INSERT INTO INVENTORY_SUMMARY
+SELECT
+    PLANT_ID,
+    CATEGORY,
+    SUM(CURRENT_STOCK),
+    SUM(REORDER_POINT),
+    SUM(CURRENT_STOCK * UNIT_COST),
+    COUNT(*)
+FROM INVENTORY AT(STREAM => 'INVENTORY_CHANGES')
+GROUP BY PLANT_ID, CATEGORY;
+
+INSERT INTO PRODUCTION_SUMMARY
+SELECT
+    PLANT_ID,
+    SUM(QUANTITY),
+    SUM(EFFICIENCY_PERCENT),
+    COUNT(EFFICIENCY_PERCENT),
+    COUNT(*)
+FROM PRODUCTION AT(STREAM => 'PRODUCTION_CHANGES')
+GROUP BY PLANT_ID;
+
+INSERT INTO PRODUCTION_ROLLUP
+SELECT
+    g.GRAIN,
+    CASE g.GRAIN
+        WHEN 'WEEK' THEN DATE_TRUNC('WEEK', p.PRODUCTION_DATE)
+        WHEN 'MONTH' THEN DATE_TRUNC('MONTH', p.PRODUCTION_DATE)
+        ELSE p.PRODUCTION_DATE
+    END,
+    p.PLANT_ID,
+    SUM(p.QUANTITY),
+    SUM(p.EFFICIENCY_PERCENT),
+    COUNT(p.EFFICIENCY_PERCENT),
+    COUNT(*)
+FROM PRODUCTION AT(STREAM => 'PRODUCTION_ROLLUP_CHANGES') p
+CROSS JOIN (SELECT 'DAY' AS GRAIN UNION ALL SELECT 'WEEK' UNION ALL SELECT 'MONTH') g
+WHERE p.PRODUCTION_DATE IS NOT NULL
+GROUP BY 1, 2, 3;
+
+INSERT INTO SUPPLIER_RISK_SUMMARY
+SELECT
+    SUPPLIER_ID,
+    SUPPLIER_NAME,
+    COUNTRY,
+    PERFORMANCE_SCORE,
+    RISK_SCORE,
+    CASE
+        WHEN RISK_SCORE >= 4 THEN 'HIGH_RISK'
+        WHEN RISK_SCORE >= 2 THEN 'MEDIUM_RISK'
+        ELSE 'LOW_RISK'
+    END
+FROM SUPPLIERS AT(STREAM => 'SUPPLIER_CHANGES');
+
+-- The 04_cortex.sql views now read the summaries
+CREATE OR REPLACE VIEW INVENTORY_INSIGHTS AS
+SELECT
+    PLANT_ID,
+    CATEGORY,
+    TOTAL_STOCK,
+    TOTAL_VALUE,
+    ITEM_COUNT,
+    CASE
+        WHEN TOTAL_STOCK < TOTAL_REORDER_POINT THEN 'LOW_STOCK'
+        WHEN TOTAL_STOCK > TOTAL_REORDER_POINT * 3 THEN 'EXCESS_STOCK'
+        ELSE 'NORMAL'
+    END AS STOCK_STATUS
+FROM INVENTORY_SUMMARY
+WHERE ITEM_COUNT > 0;
+
+CREATE OR REPLACE VIEW SUPPLIER_RISK AS
+SELECT
+    SUPPLIER_NAME,
+    COUNTRY,
+    PERFORMANCE_SCORE,
+    RISK_SCORE,
+    RISK_CATEGORY
+FROM SUPPLIER_RISK_SUMMARY
+ORDER BY RISK_SCORE DESC;
+
+-- Apply inventory deltas (updates arrive as a DELETE + INSERT pair)
+CREATE OR REPLACE TASK REFRESH_INVENTORY_SUMMARY
+    WAREHOUSE = DEMO_WH
+    SCHEDULE = '1 MINUTE'
+WHEN SYSTEM$STREAM_HAS_DATA('INVENTORY_CHANGES')
+AS
+MERGE INTO INVENTORY_SUMMARY s
+USING (
+    SELECT
+        PLANT_ID,
+        CATEGORY,
+        SUM(IFF(METADATA$ACTION = 'INSERT', 1, -1) * CURRENT_STOCK) AS DELTA_STOCK,
+        SUM(IFF(METADATA$ACTION = 'INSERT', 1, -1) * REORDER_POINT) AS DELTA_REORDER_POINT,
+        SUM(IFF(METADATA$ACTION = 'INSERT', 1, -1) * CURRENT_STOCK * UNIT_COST) AS DELTA_VALUE,
+        SUM(IFF(METADATA$ACTION = 'INSERT', 1, -1)) AS DELTA_ITEMS
+    FROM INVENTORY_CHANGES
+    GROUP BY PLANT_ID, CATEGORY
+) d
+ON s.PLANT_ID = d.PLANT_ID AND s.CATEGORY = d.CATEGORY
+WHEN MATCHED THEN UPDATE SET
+    TOTAL_STOCK = s.TOTAL_STOCK + d.DELTA_STOCK,
+    TOTAL_REORDER_POINT = s.TOTAL_REORDER_POINT + d.DELTA_REORDER_POINT,
+    TOTAL_VALUE = s.TOTAL_VALUE + d.DELTA_VALUE,
+    ITEM_COUNT = s.ITEM_COUNT + d.DELTA_ITEMS
+WHEN NOT MATCHED THEN INSERT
+    (PLANT_ID, CATEGORY, TOTAL_STOCK, TOTAL_REORDER_POINT, TOTAL_VALUE, ITEM_COUNT)
+    VALUES (d.PLANT_ID, d.CATEGORY, d.DELTA_STOCK, d.DELTA_REORDER_POINT, d.DELTA_VALUE, d.DELTA_ITEMS);
+
+-- Apply production deltas
+CREATE OR REPLACE TASK REFRESH_PRODUCTION_SUMMARY
+    WAREHOUSE = DEMO_WH
+    SCHEDULE = '1 MINUTE'
+WHEN SYSTEM$STREAM_HAS_DATA('PRODUCTION_CHANGES')
+AS
+MERGE INTO PRODUCTION_SUMMARY s
+USING (
+    SELECT
+        PLANT_ID,
+        SUM(IFF(METADATA$ACTION = 'INSERT', 1, -1) * QUANTITY) AS DELTA_QUANTITY,
+        SUM(IFF(METADATA$ACTION = 'INSERT', 1, -1) * EFFICIENCY_PERCENT) AS DELTA_EFFICIENCY,
+        SUM(IFF(METADATA$ACTION = 'INSERT', 1, -1) * IFF(EFFICIENCY_PERCENT IS NULL, 0, 1)) AS DELTA_EFFICIENCY_COUNT,
+        SUM(IFF(METADATA$ACTION = 'INSERT', 1, -1)) AS DELTA_ROWS
+    FROM PRODUCTION_CHANGES
+    GROUP BY PLANT_ID
+) d
+ON s.PLANT_ID = d.PLANT_ID
+WHEN MATCHED THEN UPDATE SET
+    TOTAL_QUANTITY = s.TOTAL_QUANTITY + d.DELTA_QUANTITY,
+    EFFICIENCY_SUM = s.EFFICIENCY_SUM + d.DELTA_EFFICIENCY,
+    EFFICIENCY_COUNT = s.EFFICIENCY_COUNT + d.DELTA_EFFICIENCY_COUNT,
+    PRODUCTION_COUNT = s.PRODUCTION_COUNT + d.DELTA_ROWS
+WHEN NOT MATCHED THEN INSERT
+    (PLANT_ID, TOTAL_QUANTITY, EFFICIENCY_SUM, EFFICIENCY_COUNT, PRODUCTION_COUNT)
+    VALUES (d.PLANT_ID, d.DELTA_QUANTITY, d.DELTA_EFFICIENCY, d.DELTA_EFFICIENCY_COUNT, d.DELTA_ROWS);
+
+-- Apply production deltas to every rollup grain (a stream feeds one task, hence its own)
+CREATE OR REPLACE TASK REFRESH_PRODUCTION_ROLLUP
+    WAREHOUSE = DEMO_WH
+    SCHEDULE = '1 MINUTE'
+WHEN SYSTEM$STREAM_HAS_DATA('PRODUCTION_ROLLUP_CHANGES')
+AS
+MERGE INTO PRODUCTION_ROLLUP r
+USING (
+    SELECT
+        g.GRAIN,
+        CASE g.GRAIN
+            WHEN 'WEEK' THEN DATE_TRUNC('WEEK', c.PRODUCTION_DATE)
+            WHEN 'MONTH' THEN DATE_TRUNC('MONTH', c.PRODUCTION_DATE)
+            ELSE c.PRODUCTION_DATE
+        END AS PERIOD_START,
+        c.PLANT_ID,
+        SUM(IFF(c.METADATA$ACTION = 'INSERT', 1, -1) * c.QUANTITY) AS DELTA_QUANTITY,
+        SUM(IFF(c.METADATA$ACTION = 'INSERT', 1, -1) * c.EFFICIENCY_PERCENT) AS DELTA_EFFICIENCY,
+        SUM(IFF(c.METADATA$ACTION = 'INSERT', 1, -1) * IFF(c.EFFICIENCY_PERCENT IS NULL, 0, 1)) AS DELTA_EFFICIENCY_COUNT,
+        SUM(IFF(c.METADATA$ACTION = 'INSERT', 1, -1)) AS DELTA_ROWS
+    FROM PRODUCTION_ROLLUP_CHANGES c
+    CROSS JOIN (SELECT 'DAY' AS GRAIN UNION ALL SELECT 'WEEK' UNION ALL SELECT 'MONTH') g
+    WHERE c.PRODUCTION_DATE IS NOT NULL
+    GROUP BY 1, 2, 3
+) d
+ON r.GRAIN = d.GRAIN AND r.PERIOD_START = d.PERIOD_START AND r.PLANT_ID = d.PLANT_ID
+WHEN MATCHED THEN UPDATE SET
+    TOTAL_QUANTITY = r.TOTAL_QUANTITY + d.DELTA_QUANTITY,
+    EFFICIENCY_SUM = r.EFFICIENCY_SUM + d.DELTA_EFFICIENCY,
+    EFFICIENCY_COUNT = r.EFFICIENCY_COUNT + d.DELTA_EFFICIENCY_COUNT,
+    PRODUCTION_COUNT = r.PRODUCTION_COUNT + d.DELTA_ROWS
+WHEN NOT MATCHED THEN INSERT
+    (GRAIN, PERIOD_START, PLANT_ID, TOTAL_QUANTITY, EFFICIENCY_SUM, EFFICIENCY_COUNT, PRODUCTION_COUNT)
+    VALUES (d.GRAIN, d.PERIOD_START, d.PLANT_ID, d.DELTA_QUANTITY, d.DELTA_EFFICIENCY,
+            d.DELTA_EFFICIENCY_COUNT, d.DELTA_ROWS);
+
+-- Upsert changed suppliers, drop deleted ones
+CREATE OR REPLACE TASK REFRESH_SUPPLIER_RISK_SUMMARY
+    WAREHOUSE = DEMO_WH
+    SCHEDULE = '1 MINUTE'
+WHEN SYSTEM$STREAM_HAS_DATA('SUPPLIER_CHANGES')
+AS
+MERGE INTO SUPPLIER_RISK_SUMMARY s
+USING (
+    SELECT
+        SUPPLIER_ID,
+        SUPPLIER_NAME,
+        COUNTRY,
+        PERFORMANCE_SCORE,
+        RISK_SCORE,
+        CASE
+            WHEN RISK_SCORE >= 4 THEN 'HIGH_RISK'
+            WHEN RISK_SCORE >= 2 THEN 'MEDIUM_RISK'
+            ELSE 'LOW_RISK'
+        END AS RISK_CATEGORY,
+        METADATA$ACTION AS CHANGE_ACTION
+    FROM SUPPLIER_CHANGES
+    WHERE NOT (METADATA$ACTION = 'DELETE' AND METADATA$ISUPDATE)
+    -- One source row per supplier, or MERGE fails (or picks one at random) when
+    -- a supplier is deleted and re-inserted, or loaded twice: the insert wins
+    QUALIFY ROW_NUMBER() OVER (
+        PARTITION BY SUPPLIER_ID
+        ORDER BY IFF(METADATA$ACTION = 'INSERT', 0, 1), METADATA$ROW_ID DESC
+    ) = 1
+) d
+ON s.SUPPLIER_ID = d.SUPPLIER_ID
+WHEN MATCHED AND d.CHANGE_ACTION = 'DELETE' THEN DELETE
+WHEN MATCHED THEN UPDATE SET
+    SUPPLIER_NAME = d.SUPPLIER_NAME,
+    COUNTRY = d.COUNTRY,
+    PERFORMANCE_SCORE = d.PERFORMANCE_SCORE,
+    RISK_SCORE = d.RISK_SCORE,
+    RISK_CATEGORY = d.RISK_CATEGORY
+WHEN NOT MATCHED AND d.CHANGE_ACTION = 'INSERT' THEN INSERT
+    (SUPPLIER_ID, SUPPLIER_NAME, COUNTRY, PERFORMANCE_SCORE, RISK_SCORE, RISK_CATEGORY)
+    VALUES (d.SUPPLIER_ID, d.SUPPLIER_NAME, d.COUNTRY, d.PERFORMANCE_SCORE, d.RISK_SCORE, d.RISK_CATEGORY);
+
+ALTER TASK REFRESH_INVENTORY_SUMMARY RESUME;
+ALTER TASK REFRESH_PRODUCTION_SUMMARY RESUME;
+ALTER TASK REFRESH_PRODUCTION_ROLLUP RESUME;
+ALTER TASK REFRESH_SUPPLIER_RISK_SUMMARY RESUME;
+
+-- Verify summaries built
+SELECT 'Aggregates ready' AS STATUS,
+       (SELECT COUNT(*) FROM INVENTORY_SUMMARY) AS INVENTORY_GROUPS,
+       (SELECT COUNT(*) FROM PRODUCTION_SUMMARY) AS PRODUCTION_PLANTS,
+       (SELECT COUNT(*) FROM PRODUCTION_ROLLUP) AS PRODUCTION_PERIODS,
+       (SELECT COUNT(*) FROM SUPPLIER_RISK_SUMMARY) AS SUPPLIERS;
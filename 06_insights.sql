@@ -0,0 +1,23 @@
+-- Manufacturing Intelligence Demo - Precomputed AI Insights
+-- One Cortex commentary per INVENTORY_INSIGHTS and SUPPLIER_RISK row, stored
+-- with the data version it was generated from. insights.py fills the table
+-- with one set-based COMPLETE statement per insight type.
+
+USE DATABASE MANUFACTURING_DEMO;
+USE SCHEMA DEMO_DATA;
+USE WAREHOUSE DEMO_WH;
+
+CREATE TABLE IF NOT EXISTS AI_INSIGHTS (
+    INSIGHT_TYPE STRING,
+    SUBJECT_KEY STRING,
+    SUBJECT STRING,
+    INSIGHT STRING,
+    MODEL STRING,
+    DATA_VERSION STRING,
+    GENERATED_AT TIMESTAMP,
+    PRIMARY KEY (INSIGHT_TYPE, SUBJECT_KEY)
+);
+
+-- Verify table created
+SELECT 'Insights table ready' AS STATUS,
+       (SELECT COUNT(*) FROM AI_INSIGHTS) AS INSIGHTS;
@@ -0,0 +1,35 @@
+-- Manufacturing Intelligence Demo - Bulk Ingestion
+-- Bookkeeping for ingest.py. Every loaded batch is recorded in INGEST_BATCHES,
+-- so a replayed batch is skipped instead of loaded twice. Each micro-batch is
+-- written to a transient <TABLE>_INGEST staging table with write_pandas, then
+-- moved into the base table (INVENTORY stock levels are merged as upserts),
+-- recorded here and cleared from staging in one transaction. Staging tables
+-- other than INVENTORY_INGEST are created by ingest.py on first use.
+
+USE DATABASE MANUFACTURING_DEMO;
+USE SCHEMA DEMO_DATA;
+USE WAREHOUSE DEMO_WH;
+
+CREATE TABLE IF NOT EXISTS INGEST_BATCHES (
+    BATCH_ID STRING,
+    TABLE_NAME STRING,
+    ROW_COUNT NUMBER,
+    LOADED_AT TIMESTAMP,
+    PRIMARY KEY (BATCH_ID)
+);
+
+-- Staging for INVENTORY loads, one LOAD_ID per micro-batch (Snowflake only)
+CREATE TRANSIENT TABLE IF NOT EXISTS INVENTORY_INGEST (
+    LOAD_ID STRING,
+    ITEM_ID STRING,
+    ITEM_NAME STRING,
+    PLANT_ID STRING,
+    CATEGORY STRING,
+    CURRENT_STOCK NUMBER,
+    REORDER_POINT NUMBER,
+    UNIT_COST NUMBER
+);
+
+-- Verify tables created
+SELECT 'Ingestion tables ready' AS STATUS,
+       (SELECT COUNT(*) FROM INGEST_BATCHES) AS BATCHES;
@@ -0,0 +1,182 @@
+"""
+Incremental refresher for the 05_aggregates.sql summary tables
+In Snowflake the summaries are kept current by streams and tasks. On the
+local engine there is no change capture, so writers hand their changed rows
+to the refresher, which folds them into the summaries as per-group deltas.
+"""
+import os
+import pandas as pd
+from backends import SQL_DIR, python_rows, split_sql, translate_statement
+
+AGGREGATES_SCRIPT = os.path.join(SQL_DIR, '05_aggregates.sql')
+
+SUMMARY_TABLES = ['INVENTORY_SUMMARY', 'PRODUCTION_SUMMARY', 'PRODUCTION_ROLLUP', 'SUPPLIER_RISK_SUMMARY']
+
+ROLLUP_GRAINS = ['DAY', 'WEEK', 'MONTH']
+
+INVENTORY_UPSERT = """
+INSERT INTO INVENTORY_SUMMARY (PLANT_ID, CATEGORY, TOTAL_STOCK, TOTAL_REORDER_POINT, TOTAL_VALUE, ITEM_COUNT)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (PLANT_ID, CATEGORY) DO UPDATE SET
+    TOTAL_STOCK = INVENTORY_SUMMARY.TOTAL_STOCK + excluded.TOTAL_STOCK,
+    TOTAL_REORDER_POINT = INVENTORY_SUMMARY.TOTAL_REORDER_POINT + excluded.TOTAL_REORDER_POINT,
+    TOTAL_VALUE = INVENTORY_SUMMARY.TOTAL_VALUE + excluded.TOTAL_VALUE,
+    ITEM_COUNT = INVENTORY_SUMMARY.ITEM_COUNT + excluded.ITEM_COUNT
+"""
+
+PRODUCTION_UPSERT = """
+INSERT INTO PRODUCTION_SUMMARY (PLANT_ID, TOTAL_QUANTITY, EFFICIENCY_SUM, EFFICIENCY_COUNT, PRODUCTION_COUNT)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (PLANT_ID) DO UPDATE SET
+    TOTAL_QUANTITY = PRODUCTION_SUMMARY.TOTAL_QUANTITY + excluded.TOTAL_QUANTITY,
+    EFFICIENCY_SUM = PRODUCTION_SUMMARY.EFFICIENCY_SUM + excluded.EFFICIENCY_SUM,
+    EFFICIENCY_COUNT = PRODUCTION_SUMMARY.EFFICIENCY_COUNT + excluded.EFFICIENCY_COUNT,
+    PRODUCTION_COUNT = PRODUCTION_SUMMARY.PRODUCTION_COUNT + excluded.PRODUCTION_COUNT
+"""
+
+ROLLUP_UPSERT = """
+INSERT INTO PRODUCTION_ROLLUP
+    (GRAIN, PERIOD_START, PLANT_ID, TOTAL_QUANTITY, EFFICIENCY_SUM, EFFICIENCY_COUNT, PRODUCTION_COUNT)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (GRAIN, PERIOD_START, PLANT_ID) DO UPDATE SET
+    TOTAL_QUANTITY = PRODUCTION_ROLLUP.TOTAL_QUANTITY + excluded.TOTAL_QUANTITY,
+    EFFICIENCY_SUM = PRODUCTION_ROLLUP.EFFICIENCY_SUM + excluded.EFFICIENCY_SUM,
+    EFFICIENCY_COUNT = PRODUCTION_ROLLUP.EFFICIENCY_COUNT + excluded.EFFICIENCY_COUNT,
+    PRODUCTION_COUNT = PRODUCTION_ROLLUP.PRODUCTION_COUNT + excluded.PRODUCTION_COUNT
+"""
+
+SUPPLIER_UPSERT = """
+INSERT INTO SUPPLIER_RISK_SUMMARY (SUPPLIER_ID, SUPPLIER_NAME, COUNTRY, PERFORMANCE_SCORE, RISK_SCORE, RISK_CATEGORY)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (SUPPLIER_ID) DO UPDATE SET
+    SUPPLIER_NAME = excluded.SUPPLIER_NAME,
+    COUNTRY = excluded.COUNTRY,
+    PERFORMANCE_SCORE = excluded.PERFORMANCE_SCORE,
+    RISK_SCORE = excluded.RISK_SCORE,
+    RISK_CATEGORY = excluded.RISK_CATEGORY
+"""
+
+
+def risk_category(risk_score):
+    """Same thresholds as the SUPPLIER_RISK view - NULL falls through to LOW_RISK there too"""
+    if risk_score is None or pd.isna(risk_score):
+        return 'LOW_RISK'
+    if risk_score >= 4:
+        return 'HIGH_RISK'
+    if risk_score >= 2:
+        return 'MEDIUM_RISK'
+    return 'LOW_RISK'
+
+
+def period_start(dates, grain):
+    """First day of each date's DAY, WEEK (Monday) or MONTH period"""
+    dates = pd.to_datetime(dates).dt.normalize()
+    if grain == 'WEEK':
+        return dates - pd.to_timedelta(dates.dt.weekday, unit='D')
+    if grain == 'MONTH':
+        return dates - pd.to_timedelta(dates.dt.day - 1, unit='D')
+    return dates
+
+
+def signed_changes(inserted, deleted):
+    """Stack inserted (+1) and deleted (-1) rows, like a stream's METADATA$ACTION"""
+    frames = []
+    if inserted is not None and not inserted.empty:
+        frames.append(inserted.assign(SIGN=1))
+    if deleted is not None and not deleted.empty:
+        frames.append(deleted.assign(SIGN=-1))
+    if not frames:
+        return None
+    return pd.concat(frames, ignore_index=True)
+
+
+class AggregateRefresher:
+    """Keeps the local engine's summary tables in step with base-table writes"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def rebuild(self):
+        """Full rebuild from the base tables (the 05_aggregates.sql initial build)"""
+        with open(AGGREGATES_SCRIPT, 'r') as f:
+            builds = [s for s in split_sql(f.read())
+                      if s.upper().startswith('INSERT INTO') and s.split()[2].upper() in SUMMARY_TABLES]
+        with self.backend.atomic():
+            for table in SUMMARY_TABLES:
+                self.backend.execute(f"DELETE FROM {table}")
+            for statement in builds:
+                for local_statement in translate_statement(statement, self.backend.engine):
+                    self.backend.execute(local_statement)
+
+    def append(self, table, rows):
+        """Insert rows into a base table and fold them into its summary, in one transaction"""
+        with self.backend.atomic():
+            self.backend.insert_rows(table, rows)
+            self.apply_changes(table, inserted=rows)
+
+    def apply_changes(self, table, inserted=None, deleted=None):
+        """Fold changed base-table rows into the summaries (updates = deleted old + inserted new)
+
+        Call it inside the backend.atomic() block that wrote the base table,
+        so the base rows and the summaries commit or roll back together.
+        """
+        changes = signed_changes(inserted, deleted)
+        if changes is None:
+            return
+        handler = {
+            'INVENTORY': self._apply_inventory,
+            'PRODUCTION': self._apply_production,
+            'SUPPLIERS': self._apply_suppliers,
+        }.get(table.upper())
+        if handler is not None:
+            with self.backend.atomic():
+                handler(changes, inserted, deleted)
+
+    def _apply_inventory(self, changes, inserted, deleted):
+        sign = changes['SIGN']
+        delta = pd.DataFrame({
+            'PLANT_ID': changes['PLANT_ID'],
+            'CATEGORY': changes['CATEGORY'],
+            'TOTAL_STOCK': sign * changes['CURRENT_STOCK'],
+            'TOTAL_REORDER_POINT': sign * changes['REORDER_POINT'],
+            'TOTAL_VALUE': sign * changes['CURRENT_STOCK'] * changes['UNIT_COST'],
+            'ITEM_COUNT': sign,
+        }).groupby(['PLANT_ID', 'CATEGORY'], as_index=False).sum()
+        self.backend.executemany(INVENTORY_UPSERT, python_rows(delta))
+
+    def _apply_production(self, changes, inserted, deleted):
+        sign = changes['SIGN']
+        efficiency = pd.to_numeric(changes['EFFICIENCY_PERCENT'])
+        delta = pd.DataFrame({
+            'PLANT_ID': changes['PLANT_ID'],
+            'TOTAL_QUANTITY': sign * changes['QUANTITY'],
+            'EFFICIENCY_SUM': sign * efficiency.fillna(0),
+            'EFFICIENCY_COUNT': sign * efficiency.notna(),
+            'PRODUCTION_COUNT': sign,
+        }).groupby('PLANT_ID', as_index=False).sum()
+        self.backend.executemany(PRODUCTION_UPSERT, python_rows(delta))
+
+        dated = changes['PRODUCTION_DATE'].notna()
+        rollup = pd.concat([pd.DataFrame({
+            'GRAIN': grain,
+            'PERIOD_START': period_start(changes.loc[dated, 'PRODUCTION_DATE'], grain),
+            'PLANT_ID': changes.loc[dated, 'PLANT_ID'],
+            'TOTAL_QUANTITY': (sign * changes['QUANTITY'])[dated],
+            'EFFICIENCY_SUM': (sign * efficiency.fillna(0))[dated],
+            'EFFICIENCY_COUNT': (sign * efficiency.notna())[dated],
+            'PRODUCTION_COUNT': sign[dated],
+        }) for grain in ROLLUP_GRAINS])
+        rollup = rollup.groupby(['GRAIN', 'PERIOD_START', 'PLANT_ID'], as_index=False).sum()
+        self.backend.executemany(ROLLUP_UPSERT, python_rows(rollup))
+
+    def _apply_suppliers(self, changes, inserted, deleted):
+        kept = set(inserted['SUPPLIER_ID']) if inserted is not None else set()
+        if deleted is not None:
+            removed = [(supplier_id,) for supplier_id in deleted['SUPPLIER_ID'] if supplier_id not in kept]
+            if removed:
+                self.backend.executemany("DELETE FROM SUPPLIER_RISK_SUMMARY WHERE SUPPLIER_ID = ?", removed)
+        if inserted is not None and not inserted.empty:
+            rows = inserted[['SUPPLIER_ID', 'SUPPLIER_NAME', 'COUNTRY', 'PERFORMANCE_SCORE', 'RISK_SCORE']]
+            rows = rows.assign(RISK_CATEGORY=rows['RISK_SCORE'].map(risk_category))
+            self.backend.executemany(SUPPLIER_UPSERT, python_rows(rows))
+
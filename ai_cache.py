@@ -0,0 +1,160 @@
+"""
+Persistent answer cache for the AI Assistant
+Answers are keyed on the normalised question, the model and the data version,
+with optional embedding similarity so near-duplicate phrasings also hit.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import numpy as np
+
+DEFAULT_CACHE_PATH = os.path.join(tempfile.gettempdir(), 'manufacturing_ai_cache.sqlite')
+
+# Common contractions, so "what's" and "what is" share a cache entry
+CONTRACTIONS = {"what's": "what is", "who's": "who is", "where's": "where is", "how's": "how is",
+                "which's": "which is", "isn't": "is not", "aren't": "are not", "don't": "do not"}
+
+
+def normalize_question(question):
+    """Lower-case, expand contractions, drop punctuation and extra whitespace"""
+    text = question.lower().replace("’", "'")
+    for contraction, expanded in CONTRACTIONS.items():
+        text = text.replace(contraction, expanded)
+    return ' '.join(re.sub(r"[^a-z0-9]+", ' ', text).split())
+
+
+def hashed_embedding(text, dims=256):
+    """Cheap bag-of-words (+ bigrams) feature-hashing embedding, L2 normalised"""
+    words = normalize_question(text).split()
+    vector = np.zeros(dims, dtype=np.float32)
+    for token in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+        digest = hashlib.md5(token.encode()).digest()
+        vector[int.from_bytes(digest[:4], 'little') % dims] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class AnswerCache:
+    """SQLite-backed answer cache with TTL, LRU eviction and hit/miss counters"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=86400, max_entries=1000,
+                 similarity=0.0, embed=hashed_embedding):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.embed = embed
+        self.stats = {'hits': 0, 'similar_hits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS ANSWERS (
+                CACHE_KEY TEXT PRIMARY KEY,
+                MODEL TEXT,
+                DATA_VERSION TEXT,
+                QUESTION TEXT,
+                ANSWER TEXT,
+                EMBEDDING TEXT,
+                CREATED_AT REAL,
+                LAST_USED REAL
+            )
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def cache_key(question, model, data_version):
+        raw = '\x00'.join([model, str(data_version), normalize_question(question)])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, question, model, data_version):
+        """Cached answer for the question, or None"""
+        now = time.time()
+        key = self.cache_key(question, model, data_version)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT ANSWER, CREATED_AT FROM ANSWERS WHERE CACHE_KEY = ?", [key]
+            ).fetchone()
+            if row and now - row[1] <= self.ttl:
+                self._touch(key, now)
+                self.stats['hits'] += 1
+                return row[0]
+
+            if self.similarity > 0:
+                match = self._similar(question, model, data_version, now)
+                if match is not None:
+                    self._touch(match[0], now)
+                    self.stats['similar_hits'] += 1
+                    return match[1]
+
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, question, model, data_version, answer):
+        now = time.time()
+        key = self.cache_key(question, model, data_version)
+        embedding = json.dumps(self.embed(question).tolist()) if self.similarity > 0 else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ANSWERS VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [key, model, str(data_version), question, answer, embedding, now, now]
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def get_or_compute(self, question, model, data_version, compute):
+        """Return the cached answer, or compute(), cache and return it"""
+        answer = self.get(question, model, data_version)
+        if answer is None:
+            answer = compute()
+            if answer is not None:
+                self.put(question, model, data_version, answer)
+        return answer
+
+    def stream_or_compute(self, question, model, data_version, stream):
+        """Yield the cached answer whole, or relay stream() and cache the result"""
+        answer = self.get(question, model, data_version)
+        if answer is not None:
+            yield answer
+            return
+        chunks = []
+        for chunk in stream():
+            chunks.append(chunk)
+            yield chunk
+        if chunks:
+            self.put(question, model, data_version, ''.join(chunks))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM ANSWERS")
+            self._conn.commit()
+
+    def _touch(self, key, now):
+        self._conn.execute("UPDATE ANSWERS SET LAST_USED = ? WHERE CACHE_KEY = ?", [now, key])
+        self._conn.commit()
+
+    def _similar(self, question, model, data_version, now):
+        rows = self._conn.execute(
+            "SELECT CACHE_KEY, ANSWER, EMBEDDING FROM ANSWERS "
+            "WHERE MODEL = ? AND DATA_VERSION = ? AND EMBEDDING IS NOT NULL AND CREATED_AT >= ?",
+            [model, str(data_version), now - self.ttl]
+        ).fetchall()
+        if not rows:
+            return None
+        matrix = np.array([json.loads(row[2]) for row in rows], dtype=np.float32)
+        scores = matrix @ self.embed(question)
+        best = int(np.argmax(scores))
+        if scores[best] >= self.similarity:
+            return rows[best][0], rows[best][1]
+        return None
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM ANSWERS WHERE CREATED_AT < ?", [now - self.ttl])
+        self._conn.execute(
+            "DELETE FROM ANSWERS WHERE CACHE_KEY NOT IN "
+            "(SELECT CACHE_KEY FROM ANSWERS ORDER BY LAST_USED DESC LIMIT ?)",
+            [self.max_entries]
+        )
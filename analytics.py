@@ -0,0 +1,317 @@
+"""
+In-process anomaly analytics for the Manufacturing Intelligence Demo
+Daily per-plant efficiency is held as a plants x days NumPy matrix, so the
+rolling baselines and z-scores for every plant and day come from a few
+cumulative sums instead of per-row loops. Inventory is held as aligned item
+arrays: daily usage is learned from the stock drops seen between snapshots,
+giving days until each item reaches its reorder point once enough drops
+have been seen. Both are
+updated incrementally - only the latest production days are fetched again,
+plus a one-row checksum of the older days held, which triggers a reload of
+the window when a late load or backfill changed them.
+"""
+import threading
+import time
+import numpy as np
+import pandas as pd
+from dashboard_data import load_date_bounds
+from query_registry import bind_params, register
+
+PRODUCTION_DAYS_QUERY = register('analytics_production_days', """
+SELECT PERIOD_START, PLANT_ID, EFFICIENCY_SUM, EFFICIENCY_COUNT, TOTAL_QUANTITY
+FROM PRODUCTION_ROLLUP
+WHERE GRAIN = 'DAY' AND PERIOD_START >= ?
+""")
+
+PRODUCTION_TOTALS_QUERY = register('analytics_production_totals', """
+SELECT SUM(EFFICIENCY_SUM) AS EFFICIENCY_SUM, SUM(EFFICIENCY_COUNT) AS EFFICIENCY_COUNT,
+       SUM(TOTAL_QUANTITY) AS TOTAL_QUANTITY
+FROM PRODUCTION_ROLLUP
+WHERE GRAIN = 'DAY' AND PERIOD_START >= ? AND PERIOD_START < ?
+""")
+
+INVENTORY_STATE_QUERY = register('analytics_inventory', """
+SELECT ITEM_ID, ITEM_NAME, PLANT_ID, CATEGORY, CURRENT_STOCK, REORDER_POINT
+FROM INVENTORY
+""")
+
+EPOCH = np.datetime64('1970-01-01', 'D')
+
+ITEM_ATTRIBUTES = ['ITEM_NAME', 'PLANT_ID', 'CATEGORY']
+
+
+def columns(frame, names):
+    """NumPy arrays for the named columns of a DataFrame or Arrow table"""
+    if isinstance(frame, pd.DataFrame):
+        return [frame[name].to_numpy() for name in names]
+    return [frame.column(name).to_numpy(zero_copy_only=False) for name in names]
+
+
+def day_numbers(values):
+    """Days since 1970-01-01 for dates, timestamps or ISO strings"""
+    return (pd.to_datetime(values).to_numpy().astype('datetime64[D]') - EPOCH).astype(np.int64)
+
+
+def extend_index(index, keys):
+    """(index with any new keys appended, position of every key)"""
+    keys = pd.Index(keys)
+    missing = keys[index.get_indexer(keys) < 0].unique()
+    if len(missing):
+        index = index.append(missing)
+    return index, index.get_indexer(keys)
+
+
+class EfficiencyHistory:
+    """Daily efficiency sums and counts per plant, with rolling z-score anomalies"""
+
+    def __init__(self, max_days=400):
+        self.max_days = max_days
+        self.plants = pd.Index([], dtype=object)
+        self.first_day = None
+        self.efficiency_sum = np.zeros((0, 0))
+        self.efficiency_count = np.zeros((0, 0))
+        self.quantity = np.zeros((0, 0))
+
+    @property
+    def days(self):
+        return self.efficiency_sum.shape[1]
+
+    @property
+    def last_day(self):
+        """Last day held, as a datetime64, or None when empty"""
+        return EPOCH + self.first_day + self.days - 1 if self.days else None
+
+    def totals(self, until):
+        """Efficiency sum, efficiency count and quantity over the days held before `until`"""
+        end = int(np.clip(day_numbers([until])[0] - self.first_day, 0, self.days)) if self.days else 0
+        return [float(matrix[:, :end].sum()) for matrix in (self.efficiency_sum, self.efficiency_count, self.quantity)]
+
+    def _cells(self, plant_ids, day_values):
+        """Row and column of every (plant, day), growing the matrices to cover them"""
+        self.plants, rows = extend_index(self.plants, plant_ids)
+        days = day_numbers(day_values)
+        first = days.min() if self.first_day is None else min(self.first_day, days.min())
+        last = days.max() if self.first_day is None else max(self.first_day + self.days - 1, days.max())
+        shape = (len(self.plants), last - first + 1)
+        if self.first_day is None or shape != self.efficiency_sum.shape:
+            offset = 0 if self.first_day is None else self.first_day - first
+            grown = []
+            for matrix in (self.efficiency_sum, self.efficiency_count, self.quantity):
+                bigger = np.zeros(shape)
+                bigger[:matrix.shape[0], offset:offset + matrix.shape[1]] = matrix
+                grown.append(bigger)
+            self.efficiency_sum, self.efficiency_count, self.quantity = grown
+            self.first_day = first
+        return rows, days - self.first_day
+
+    def set_days(self, frame):
+        """Replace whole plant-days from PRODUCTION_ROLLUP day rows"""
+        if len(frame) == 0:
+            return
+        day, plant, eff_sum, eff_count, quantity = columns(
+            frame, ['PERIOD_START', 'PLANT_ID', 'EFFICIENCY_SUM', 'EFFICIENCY_COUNT', 'TOTAL_QUANTITY'])
+        rows, cols = self._cells(plant, day)
+        self.efficiency_sum[rows, cols] = eff_sum.astype(float)
+        self.efficiency_count[rows, cols] = eff_count.astype(float)
+        self.quantity[rows, cols] = quantity.astype(float)
+        self._trim()
+
+    def add_production(self, frame):
+        """Fold in new PRODUCTION rows (e.g. a freshly ingested batch)"""
+        if len(frame) == 0:
+            return
+        day, plant, efficiency, quantity = columns(
+            frame, ['PRODUCTION_DATE', 'PLANT_ID', 'EFFICIENCY_PERCENT', 'QUANTITY'])
+        rows, cols = self._cells(plant, day)
+        efficiency = efficiency.astype(float)
+        counted = ~np.isnan(efficiency)
+        np.add.at(self.efficiency_sum, (rows[counted], cols[counted]), efficiency[counted])
+        np.add.at(self.efficiency_count, (rows[counted], cols[counted]), 1.0)
+        np.add.at(self.quantity, (rows, cols), np.nan_to_num(quantity.astype(float)))
+        self._trim()
+
+    def _trim(self):
+        extra = self.days - self.max_days
+        if extra > 0:
+            self.efficiency_sum = self.efficiency_sum[:, extra:]
+            self.efficiency_count = self.efficiency_count[:, extra:]
+            self.quantity = self.quantity[:, extra:]
+            self.first_day += extra
+
+    def zscores(self, window=28, min_periods=7):
+        """(efficiency, baseline mean, baseline std, z) matrices - each day against the `window` days before it"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            efficiency = self.efficiency_sum / self.efficiency_count
+        observed = ~np.isnan(efficiency)
+        values = np.where(observed, efficiency, 0.0)
+        pad = np.zeros((len(self.plants), 1))
+        total = np.hstack([pad, np.cumsum(values, axis=1)])
+        squares = np.hstack([pad, np.cumsum(values ** 2, axis=1)])
+        counts = np.hstack([pad, np.cumsum(observed, axis=1)])
+
+        # Window [t - window, t - 1] is cumulative[t] - cumulative[max(t - window, 0)]
+        end = np.arange(self.days)
+        start = np.maximum(end - window, 0)
+        n = counts[:, end] - counts[:, start]
+        s = total[:, end] - total[:, start]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = s / n
+            variance = (squares[:, end] - squares[:, start] - n * mean ** 2) / (n - 1)
+            std = np.sqrt(np.maximum(variance, 0.0))
+            z = (efficiency - mean) / std
+        z[(n < min_periods) | ~(std > 1e-9) | ~observed] = np.nan
+        return efficiency, mean, std, z
+
+    def anomalies(self, window=28, threshold=3.0, recent_days=7, min_periods=7):
+        """Plant-days in the last `recent_days` whose efficiency fell `threshold` std below baseline"""
+        empty = pd.DataFrame(columns=['PLANT_ID', 'DATE', 'EFFICIENCY', 'BASELINE', 'Z_SCORE'])
+        if not self.days:
+            return empty
+        efficiency, mean, _, z = self.zscores(window, min_periods)
+        recent = max(self.days - recent_days, 0)
+        rows, cols = np.nonzero(z[:, recent:] <= -threshold)
+        if not len(rows):
+            return empty
+        cols = cols + recent
+        alerts = pd.DataFrame({
+            'PLANT_ID': self.plants.to_numpy()[rows],
+            'DATE': EPOCH + self.first_day + cols,
+            'EFFICIENCY': efficiency[rows, cols].round(1),
+            'BASELINE': mean[rows, cols].round(1),
+            'Z_SCORE': z[rows, cols].round(2),
+        })
+        return alerts.sort_values('Z_SCORE', ignore_index=True)
+
+
+class StockProjection:
+    """Per-item stock, reorder point and estimated daily usage as aligned arrays
+
+    INVENTORY carries no dates, so a snapshot is dated when it is taken and
+    usage is an EWMA of the drop rates between snapshots. An item is only
+    projected once min_observations drops have been seen - before that, only
+    items already at or below their reorder point are flagged.
+    """
+
+    def __init__(self, smoothing=0.3, min_observations=3):
+        self.smoothing = smoothing
+        self.min_observations = min_observations
+        self.items = pd.Index([], dtype=object)
+        self.stock = np.zeros(0)
+        self.reorder_point = np.zeros(0)
+        self.usage = np.zeros(0)
+        self.observations = np.zeros(0, dtype=np.int64)
+        self.seen_at = np.zeros(0)
+        self.attributes = pd.DataFrame(columns=ITEM_ATTRIBUTES)
+
+    def update(self, frame, as_of=None):
+        """Take an INVENTORY snapshot; stock drops since the last one refine each item's usage"""
+        if len(frame) == 0:
+            return
+        as_of = time.time() if as_of is None else as_of
+        item, stock, reorder_point = columns(frame, ['ITEM_ID', 'CURRENT_STOCK', 'REORDER_POINT'])
+        stock = stock.astype(float)
+        reorder_point = reorder_point.astype(float)
+        known = len(self.items)
+        self.items, positions = extend_index(self.items, item)
+        grow = len(self.items) - known
+        if grow:
+            self.stock = np.concatenate([self.stock, np.full(grow, np.nan)])
+            self.reorder_point = np.concatenate([self.reorder_point, np.full(grow, np.nan)])
+            self.usage = np.concatenate([self.usage, np.full(grow, np.nan)])
+            self.observations = np.concatenate([self.observations, np.zeros(grow, dtype=np.int64)])
+            self.seen_at = np.concatenate([self.seen_at, np.full(grow, np.nan)])
+
+        previous = self.stock[positions]
+        elapsed_days = (as_of - self.seen_at[positions]) / 86400
+        # Increases are replenishments, not negative usage
+        observed = (elapsed_days > 0) & (previous > stock)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rate = (previous - stock) / elapsed_days
+        usage = self.usage[positions]
+        # The first drop seeds the average
+        averaged = np.where(np.isnan(usage), rate, self.smoothing * rate + (1 - self.smoothing) * usage)
+        usage = np.where(observed, averaged, usage)
+
+        self.stock[positions] = stock
+        self.reorder_point[positions] = reorder_point
+        self.usage[positions] = usage
+        self.observations[positions] += observed
+        self.seen_at[positions] = as_of
+        self.attributes = self.attributes.reindex(self.items)
+        self.attributes.iloc[positions] = np.column_stack(columns(frame, ITEM_ATTRIBUTES))
+
+    def days_to_reorder(self):
+        """Days until each item reaches its reorder point: 0 at or below it, NaN until usage is known"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            days = (self.stock - self.reorder_point) / self.usage
+        days[self.usage <= 0] = np.inf
+        days[self.observations < self.min_observations] = np.nan
+        days[self.stock <= self.reorder_point] = 0.0
+        return np.maximum(days, 0.0)
+
+    def alerts(self, horizon_days=14):
+        """Items at or projected to reach their reorder point within horizon_days, soonest first"""
+        days = self.days_to_reorder()
+        at_risk = np.nonzero(days <= horizon_days)[0]
+        alerts = self.attributes.iloc[at_risk].reset_index(names='ITEM_ID')
+        alerts['CURRENT_STOCK'] = self.stock[at_risk]
+        alerts['REORDER_POINT'] = self.reorder_point[at_risk]
+        alerts['DAILY_USAGE'] = self.usage[at_risk].round(1)
+        alerts['DAYS_TO_REORDER'] = days[at_risk].round(1)
+        return alerts.sort_values('DAYS_TO_REORDER', ignore_index=True)
+
+
+class AnomalyEngine:
+    """Efficiency and stock-out alerts kept current with the data version"""
+
+    def __init__(self, run_query, window=28, threshold=3.0, recent_days=7, lookback_days=3,
+                 min_observations=3, horizon_days=14):
+        self.run_query = run_query
+        self.window = window
+        self.threshold = threshold
+        self.recent_days = recent_days
+        self.lookback_days = lookback_days
+        self.horizon_days = horizon_days
+        self.efficiency = EfficiencyHistory(max_days=window + recent_days)
+        self.stock = StockProjection(min_observations=min_observations)
+        self.version = None
+        self._lock = threading.Lock()
+
+    def refresh(self, data_version):
+        """Fetch what changed since the last refresh - recent production days and the inventory snapshot"""
+        with self._lock:
+            if self.version == data_version and self.version is not None:
+                return
+            last = self.efficiency.last_day
+            if last is None:
+                bounds = load_date_bounds(self.run_query)
+                since = bounds[1] - pd.Timedelta(days=self.efficiency.max_days - 1) if bounds else None
+            else:
+                # The latest days may still be filling in - fetch them again
+                since = pd.Timestamp(last - self.lookback_days).date()
+                if self._changed_before(since):
+                    # A late load or backfill further back - fetch every day held
+                    since = pd.Timestamp(EPOCH + self.efficiency.first_day).date()
+            if since is not None:
+                days = self.run_query(PRODUCTION_DAYS_QUERY, bind_params([pd.Timestamp(since).date()]))
+                self.efficiency.set_days(days)
+            self.stock.update(self.run_query(INVENTORY_STATE_QUERY))
+            self.version = data_version
+
+    def _changed_before(self, since):
+        """True when the held days before `since` no longer add up to PRODUCTION_ROLLUP's"""
+        first = pd.Timestamp(EPOCH + self.efficiency.first_day).date()
+        if first >= since:
+            return False
+        names = ['EFFICIENCY_SUM', 'EFFICIENCY_COUNT', 'TOTAL_QUANTITY']
+        totals = columns(self.run_query(PRODUCTION_TOTALS_QUERY, bind_params([first, since])), names)
+        warehouse = pd.to_numeric(pd.Series([column[0] for column in totals]), errors='coerce').fillna(0.0)
+        return not np.allclose(warehouse.to_numpy(dtype=float), self.efficiency.totals(since))
+
+    def efficiency_alerts(self):
+        with self._lock:
+            return self.efficiency.anomalies(self.window, self.threshold, self.recent_days)
+
+    def stock_alerts(self):
+        with self._lock:
+            return self.stock.alerts(self.horizon_days)
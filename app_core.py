@@ -0,0 +1,811 @@
+"""
+Shared Streamlit app for the Manufacturing Intelligence Demo
+app.py (snowflake.connector or the local engine) and streamlit_snowflake_app.py
+(Streamlit in Snowflake) are thin entry points that pick a deployment and
+call main(). Heavy modules - plotly, pyarrow, duckdb and the Snowflake
+drivers - are imported on first use, and no session or connection is opened
+until a query needs one.
+"""
+import html
+import os
+import time
+from datetime import timedelta
+from functools import partial
+import streamlit as st
+import pandas as pd
+from backends import SnowparkBackend, backend_from_env
+from dashboard_data import load_dashboard_data, load_date_bounds, load_production_trend
+from ai_cache import DEFAULT_CACHE_PATH, AnswerCache
+from query_cache import QueryCache
+from result_store import result_store_from_env
+from cache_warmer import CacheWarmer
+from context_index import ContextIndex
+from question_router import QuestionRouter
+from insights import INSIGHT_SPECS, InsightJob, load_insights
+from llm import ANALYST_PROMPT, cortex_rest_stream, llm_from_env, snowpark_stream
+from explorer_data import EXPLORER_TABLES, PAGE_SIZES, page_query, row_key, summary_query, table_query
+from connection_pool import ConnectionPool
+from analytics import AnomalyEngine
+from chart_data import MAX_BARS, FigureCache, chart_series, load_plant_regions
+from instrumentation import InstrumentedLLM, current_session, instrumentation_from_env, result_size
+from query_registry import name_of
+
+CSS = """
+<style>
+    .main-header {
+        background: linear-gradient(90deg, #1f77b4 0%, #2ca02c 100%);
+        padding: 1rem;
+        border-radius: 10px;
+        color: white;
+        text-align: center;
+        margin-bottom: 2rem;
+    }
+    .metric-card {
+        background: white;
+        padding: 1rem;
+        border-radius: 8px;
+        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+        text-align: center;
+    }
+    .insight-box {
+        background: #e3f2fd;
+        padding: 1rem;
+        border-radius: 8px;
+        border-left: 4px solid #2196f3;
+        margin: 1rem 0;
+    }
+</style>
+"""
+
+
+# Relative to the latest production date, not today - demo data is historical
+DATE_PRESETS = {"All time": None, "Last 30 days": 30, "Last 90 days": 90, "Last 12 months": 365, "Custom": None}
+
+
+class ConnectorDeployment:
+    """Local deployment - pooled snowflake.connector sessions, or the local engine"""
+    subtitle = "Unified Manufacturing Analytics"
+    setup_hint = "💡 Check your .env configuration"
+
+    def create_backend(self):
+        return backend_from_env(get_connection_pool())
+
+    def stream_fn(self):
+        return cortex_rest_stream(cortex_rest_auth)
+
+
+class SnowparkDeployment:
+    """Streamlit in Snowflake - the app's active Snowpark session"""
+    subtitle = "Native Streamlit in Snowflake"
+    setup_hint = "💡 Check the app owner's role and warehouse"
+
+    def __init__(self):
+        self._session = None
+
+    def session(self):
+        if self._session is None:
+            from snowflake.snowpark.context import get_active_session
+            self._session = get_active_session()
+        return self._session
+
+    def create_backend(self):
+        return SnowparkBackend(self.session())
+
+    def stream_fn(self):
+        def stream(model, prompt):
+            yield from snowpark_stream(self.session())(model, prompt)
+        return stream
+
+
+# Set by main() - one deployment per Streamlit server process
+deployment = None
+
+
+def get_snowflake_connection():
+    """Create Snowflake connection"""
+    import snowflake.connector
+    return snowflake.connector.connect(
+        account=os.getenv('SNOWFLAKE_ACCOUNT'),
+        user=os.getenv('SNOWFLAKE_USER'),
+        password=os.getenv('SNOWFLAKE_PASSWORD'),
+        warehouse=os.getenv('SNOWFLAKE_WAREHOUSE'),
+        database=os.getenv('SNOWFLAKE_DATABASE'),
+        schema=os.getenv('SNOWFLAKE_SCHEMA'),
+        role=os.getenv('SNOWFLAKE_ROLE'),
+        # Server-side ? bind variables, so statement text stays stable
+        paramstyle='qmark'
+    )
+
+@st.cache_resource
+def get_connection_pool():
+    """Snowflake connection pool shared by all sessions"""
+    return ConnectionPool(
+        get_snowflake_connection,
+        size=int(os.getenv('SNOWFLAKE_POOL_SIZE', '4')),
+        timeout=int(os.getenv('SNOWFLAKE_POOL_TIMEOUT', '30'))
+    )
+
+def cortex_rest_auth():
+    """Host and session token of a pooled connection, for Cortex REST streaming"""
+    with get_connection_pool().connection() as conn:
+        return conn.host, conn.rest.token
+
+@st.cache_resource
+def get_query_backend():
+    """Query backend for this deployment"""
+    return deployment.create_backend()
+
+@st.cache_resource
+def get_query_cache():
+    """Result cache shared by all sessions, invalidated per table on change"""
+    backend = get_query_backend()
+    return QueryCache(
+        backend,
+        check_interval=int(os.getenv('CHANGE_CHECK_INTERVAL', '30')),
+        shared=result_store_from_env(),
+        namespace=result_namespace(backend)
+    )
+
+def result_namespace(backend):
+    """Which database shared results belong to - replicas of one deployment share it"""
+    if backend.name == 'local':
+        path = os.getenv('LOCAL_DB_PATH', ':memory:')
+        # Every process seeds its own in-memory database, so it only shares with itself
+        return f"local:{path}:{os.getpid()}" if path == ':memory:' else f"local:{os.path.abspath(path)}"
+    return ':'.join(['snowflake'] + [os.getenv(name, '') for name in
+                                     ('SNOWFLAKE_ACCOUNT', 'SNOWFLAKE_DATABASE', 'SNOWFLAKE_SCHEMA')])
+
+@st.cache_resource
+def get_cache_warmer():
+    """Background refresher of the dashboard queries (None when WARM_INTERVAL=0)
+
+    Paused WARM_IDLE_AFTER seconds after the last script run, so an idle
+    Snowflake warehouse can auto-suspend.
+    """
+    interval = int(os.getenv('WARM_INTERVAL', '20'))
+    if interval <= 0:
+        return None
+    jobs = {
+        'dashboard': load_dashboard_data,
+        'plant_regions': load_plant_regions,
+        'insights': load_insights,
+        'all_time': prewarm_date_preset,
+    }
+    jobs.update({preset: partial(prewarm_date_preset, days=days) for preset, days in DATE_PRESETS.items() if days})
+    return CacheWarmer(
+        get_query_cache(),
+        jobs,
+        interval=interval,
+        max_workers=int(os.getenv('WARM_WORKERS', '4')),
+        instrumentation=get_instrumentation(),
+        idle_after=float(os.getenv('WARM_IDLE_AFTER', '60'))
+    ).start()
+
+def prewarm_date_preset(run_query, days=None):
+    """Load what the dashboard shows for a date preset (all time when days is None)"""
+    bounds = load_date_bounds(run_query)
+    if bounds is None:
+        return
+    date_range = preset_range(bounds, days) if days else None
+    if date_range:
+        load_dashboard_data(run_query, date_range)
+    load_production_trend(run_query, date_range or bounds)
+
+def refresh_query_cache():
+    """Pick up data written by this session now rather than at the next token check"""
+    warmer = get_cache_warmer()
+    if warmer is not None:
+        warmer.refresh()
+    else:
+        get_query_cache().refresh_tokens()
+
+@st.cache_resource
+def get_instrumentation():
+    """Query/LLM timings shared by all sessions (logs, Prometheus text, Performance panel)"""
+    return instrumentation_from_env()
+
+def run_query(query, params=None):
+    """Execute query through the configured backend, cached until its tables change"""
+    backend = get_query_backend()
+    with get_instrumentation().timed('query', name_of(query), cache='hit') as event:
+        def run(query, params=None):
+            event['cache'] = 'miss'
+            result = backend.query(query, params)
+            event['query_id'] = backend.last_query_id
+            return result
+
+        try:
+            result = get_query_cache().get_or_run(query, run=run, params=params)
+        except Exception as e:
+            event['error'] = f"{type(e).__name__}: {e}"
+            # Connection failures are already reported in the sidebar
+            if backend.last_error is None:
+                st.error(f"Query failed: {e}")
+            return pd.DataFrame()
+        event['rows'], event['bytes'] = result_size(result)
+        return result
+
+@st.cache_resource
+def get_llm():
+    """Cortex, or the local stub model when LLM_BACKEND=stub"""
+    return InstrumentedLLM(llm_from_env(run_query, stream_fn=deployment.stream_fn()), get_instrumentation())
+
+@st.cache_resource
+def get_answer_cache():
+    """Persistent AI answer cache shared by all sessions"""
+    return AnswerCache(
+        path=os.getenv('AI_CACHE_PATH', DEFAULT_CACHE_PATH),
+        ttl=int(os.getenv('AI_CACHE_TTL', '86400')),
+        max_entries=int(os.getenv('AI_CACHE_MAX_ENTRIES', '1000')),
+        similarity=float(os.getenv('AI_CACHE_SIMILARITY', '0'))
+    )
+
+@st.cache_resource
+def get_insight_job():
+    """Bulk insight generator for the dashboard"""
+    return InsightJob(get_query_backend(), get_llm(), max_workers=int(os.getenv('AI_INSIGHT_WORKERS', '8')))
+
+@st.cache_resource
+def get_context_index():
+    """Summary snippets used to ground AI Assistant prompts"""
+    return ContextIndex(run_query, max_chars=int(os.getenv('AI_CONTEXT_MAX_CHARS', '1500')))
+
+@st.cache_resource
+def get_figure_cache():
+    """Built Plotly figures shared by all sessions, keyed by data version"""
+    return FigureCache(max_entries=int(os.getenv('CHART_CACHE_ENTRIES', '64')))
+
+@st.cache_resource
+def get_anomaly_engine():
+    """Efficiency-drop and stock-out alerts, updated in process as the data changes"""
+    return AnomalyEngine(
+        run_query,
+        window=int(os.getenv('ANOMALY_WINDOW_DAYS', '28')),
+        threshold=float(os.getenv('ANOMALY_Z_THRESHOLD', '3')),
+        recent_days=int(os.getenv('ANOMALY_RECENT_DAYS', '7')),
+        min_observations=int(os.getenv('REORDER_MIN_OBSERVATIONS', '3')),
+        horizon_days=float(os.getenv('REORDER_HORIZON_DAYS', '14'))
+    )
+
+@st.cache_resource
+def get_question_router():
+    """Answers metric questions from SQL templates (None when AI_ROUTER=off)"""
+    if os.getenv('AI_ROUTER', 'on').lower() != 'on':
+        return None
+    return QuestionRouter(run_query, max_shapes=int(os.getenv('AI_ROUTER_MAX_SHAPES', '512')))
+
+def routed_answer(question):
+    """Answer from a SQL template, or None when the question needs the model"""
+    router = get_question_router()
+    if router is None:
+        return None
+    with get_instrumentation().timed('route', 'question_router') as event:
+        routed = router.answer(question, get_data_version())
+        event['routed'] = routed is not None
+        if routed is not None:
+            event['template'] = name_of(routed['query'])
+        return routed
+
+def build_prompt(question):
+    """Analyst prompt with the data slices relevant to the question"""
+    context = get_context_index().context_for(question, get_data_version())
+    return ANALYST_PROMPT.format(context=context or "- (no data available)", question=question)
+
+def get_data_version():
+    """Data version the cached answers were computed against"""
+    try:
+        return get_query_cache().data_version()
+    except Exception:
+        return 'unknown'
+
+def test_cortex_ai(question):
+    """Answer a question with Cortex AI, reusing cached answers"""
+    try:
+        routed = routed_answer(question)
+        if routed is not None:
+            return routed['answer']
+        llm = get_llm()
+        prompt = build_prompt(question)
+        with get_instrumentation().timed('answer', llm.model, cache='hit') as event:
+            def compute():
+                event['cache'] = 'miss'
+                return llm.complete(prompt)
+
+            response = get_answer_cache().get_or_compute(question, llm.model, get_data_version(), compute)
+        if response is not None:
+            return response
+        return "AI service unavailable"
+    except Exception as e:
+        return f"AI Error: {str(e)}"
+
+def stream_cortex_ai(question):
+    """Stream a Cortex AI answer chunk by chunk, replaying cached answers"""
+    routed = routed_answer(question)
+    if routed is not None:
+        yield routed['answer']
+        return
+    llm = get_llm()
+    prompt = build_prompt(question)
+    with get_instrumentation().timed('answer', llm.model, cache='hit', streamed=True) as event:
+        def stream():
+            event['cache'] = 'miss'
+            return llm.stream(prompt)
+
+        yield from get_answer_cache().stream_or_compute(question, llm.model, get_data_version(), stream)
+
+def render_ai_response(question):
+    """Render the answer as it is generated instead of behind a spinner"""
+    st.write("**AI Response:**")
+    placeholder = st.empty()
+    response = ""
+    try:
+        for chunk in stream_cortex_ai(question):
+            response += chunk
+            placeholder.markdown(response + "▌")
+    except Exception as e:
+        response += f"\n\nAI Error: {str(e)}"
+    placeholder.markdown(response or "AI service unavailable")
+
+def main(app_deployment):
+    global deployment
+    deployment = app_deployment
+
+    # Page config
+    st.set_page_config(
+        page_title="Manufacturing Intelligence Demo",
+        page_icon="🏭",
+        layout="wide"
+    )
+    st.markdown(CSS, unsafe_allow_html=True)
+
+    # Header
+    st.markdown(f"""
+    <div class="main-header">
+        <h1>🏭 Manufacturing Intelligence Platform</h1>
+        <p>Powered by Snowflake + Cortex AI | {deployment.subtitle}</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    # Sidebar
+    with st.sidebar:
+        st.header("🎯 Demo Controls")
+
+        # Connection test
+        backend = get_query_backend()
+        if backend.is_available():
+            st.success(f"✅ Connected to {backend.label}")
+            warmer = get_cache_warmer()
+            if warmer is not None:
+                warmer.touch()
+        else:
+            st.error(f"❌ Connection failed: {backend.last_error}" if backend.last_error else "❌ Connection failed")
+            st.info(deployment.setup_hint)
+
+        # Demo sections
+        demo_section = st.selectbox(
+            "Choose Demo Section:",
+            ["Executive Dashboard", "AI Assistant", "Data Explorer"]
+        )
+
+        date_range = render_date_range_picker() if demo_section != "AI Assistant" else None
+        show_performance = st.checkbox("⏱️ Performance", value=os.getenv('PERF_PANEL', 'off').lower() == 'on')
+
+    # Main content based on selection
+    if demo_section == "Executive Dashboard":
+        render_executive_dashboard(date_range)
+    elif demo_section == "AI Assistant":
+        render_ai_assistant()
+    else:
+        render_data_explorer(date_range)
+
+    # Last, so it includes this run's queries
+    if show_performance:
+        with st.sidebar:
+            render_performance_panel()
+
+def render_performance_panel():
+    """Slowest queries and model calls of this session, plus cache hit rates"""
+    instrumentation = get_instrumentation()
+    st.markdown("### ⏱️ Performance")
+
+    for kind, label in [('query', "Query cache"), ('answer', "Answer cache")]:
+        stats = instrumentation.cache_stats(kind)
+        lookups = sum(stats.values())
+        if lookups:
+            st.caption(f"{label}: {stats.get('hit', 0) / lookups:.0%} hits of {lookups:,} lookups")
+
+    shared = get_query_cache().stats['shared_hits']
+    if shared:
+        st.caption(f"Shared result cache: {shared:,} results from other replicas or earlier runs")
+
+    warmer = get_cache_warmer()
+    if warmer is not None and warmer.stats['last_pass_at']:
+        st.caption(f"Pre-warmed {time.time() - warmer.stats['last_pass_at']:.0f}s ago "
+                   f"in {warmer.stats['last_pass_ms']:,.0f} ms · {warmer.stats['refreshed']:,} refreshes")
+
+    slowest = instrumentation.slowest(10, session=current_session())
+    if not slowest:
+        st.caption("No queries recorded yet")
+        return
+    table = pd.DataFrame(slowest).reindex(columns=['kind', 'name', 'latency_ms', 'rows', 'bytes', 'cache', 'query_id', 'error'])
+    st.dataframe(table.dropna(axis=1, how='all'), use_container_width=True, hide_index=True)
+    st.download_button("⬇️ Prometheus metrics", instrumentation.prometheus(), file_name="metrics.prom",
+                       mime="text/plain")
+
+def render_date_range_picker():
+    """Date range for the dashboard and the dated explorer tables (None = all history)"""
+    bounds = load_date_bounds(run_query)
+    if bounds is None:
+        return None
+    first, last = bounds
+
+    preset = st.selectbox("📅 Date range:", list(DATE_PRESETS))
+    if preset == "Custom":
+        picked = st.date_input(
+            "From / to:",
+            value=(max(first, last - timedelta(days=29)), last),
+            min_value=first,
+            max_value=last
+        )
+        # Only one date comes back while the second is being picked
+        return tuple(picked) if isinstance(picked, (tuple, list)) and len(picked) == 2 else None
+
+    st.caption(f"Data from {first} to {last}")
+    days = DATE_PRESETS[preset]
+    if days is None:
+        return None
+    return preset_range(bounds, days)
+
+def preset_range(bounds, days):
+    """The last `days` days of data, clipped to the first production date"""
+    first, last = bounds
+    return max(first, last - timedelta(days=days - 1)), last
+
+def render_executive_dashboard(date_range=None):
+    """Executive dashboard with key metrics"""
+    st.header("📊 Executive Dashboard")
+    if date_range:
+        st.caption(f"Production and financial figures for {date_range[0]} to {date_range[1]} · inventory is current stock")
+
+    # One batched statement for the KPI cards and both charts
+    dashboard = load_dashboard_data(run_query, date_range)
+
+    render_kpi_cards(dashboard['financial'])
+
+    # Charts - more plants than CHART_MAX_BARS are drawn per region, with drill-down
+    max_bars = int(os.getenv('CHART_MAX_BARS', str(MAX_BARS)))
+    regions = load_plant_regions(run_query)
+    region = None
+    if max(len(dashboard['inventory']), len(dashboard['production'])) > max_bars and not regions.empty:
+        choice = st.selectbox("🌍 Plants by region:", ["All regions"] + sorted(regions.unique()))
+        region = None if choice == "All regions" else choice
+    view = (date_range, region, max_bars)
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        render_inventory_chart(dashboard['inventory'], regions, region, view)
+
+    with col2:
+        render_efficiency_chart(dashboard['production'], regions, region, view)
+
+    trend_range = date_range or load_date_bounds(run_query)
+    if trend_range:
+        render_trend_chart(trend_range)
+
+    render_alerts()
+
+    render_business_insights()
+
+def render_alerts():
+    """Recent efficiency drops and items heading for their reorder point"""
+    engine = get_anomaly_engine()
+    with get_instrumentation().timed('analytics', 'anomalies'):
+        engine.refresh(get_data_version())
+        drops = engine.efficiency_alerts()
+        stock = engine.stock_alerts()
+
+    st.markdown("### 🚨 Alerts")
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.markdown("#### 📉 Efficiency drops")
+        st.caption(f"Last {engine.recent_days} days, {engine.threshold:g}σ below each plant's "
+                   f"{engine.window}-day baseline · {len(drops):,} found")
+        if not drops.empty:
+            st.dataframe(drops.head(10), use_container_width=True, hide_index=True)
+
+    with col2:
+        st.markdown("#### 📦 Reorder soon")
+        st.caption(f"At the reorder point, or projected to reach it within {engine.horizon_days:g} days · "
+                   f"{len(stock):,} items")
+        if not stock.empty:
+            st.dataframe(stock.head(10)[['ITEM_ID', 'ITEM_NAME', 'PLANT_ID', 'CURRENT_STOCK', 'REORDER_POINT',
+                                         'DAYS_TO_REORDER']], use_container_width=True, hide_index=True)
+
+def render_business_insights():
+    """Precomputed AI commentary from AI_INSIGHTS"""
+    st.markdown("### 🎯 Key Business Insights")
+
+    if st.button("🔄 Generate AI insights"):
+        with st.spinner("Generating insights..."):
+            get_insight_job().run(get_data_version())
+            refresh_query_cache()
+
+    insights = load_insights(run_query)
+    if insights.empty:
+        st.info("No AI insights yet - generate them for per-category and per-supplier commentary")
+        return
+
+    caption = f"Generated {insights['GENERATED_AT'].max()} with {insights['MODEL'].iloc[0]}"
+    if (insights['DATA_VERSION'] != get_data_version()).any():
+        caption += " · ⚠️ data has changed since"
+    st.caption(caption)
+
+    columns = st.columns(len(INSIGHT_SPECS))
+    for col, (insight_type, spec) in zip(columns, INSIGHT_SPECS.items()):
+        rows = insights[insights['INSIGHT_TYPE'] == insight_type]
+        with col:
+            st.markdown(f"#### {spec['title']}")
+            for _, row in rows.head(3).iterrows():
+                st.markdown(f"""
+                <div class="insight-box">
+                    <h4>{html.escape(str(row['SUBJECT']))}</h4>
+                    <p>{html.escape(str(row['INSIGHT']))}</p>
+                </div>
+                """, unsafe_allow_html=True)
+            if len(rows) > 3:
+                with st.expander(f"All {len(rows)} insights"):
+                    st.dataframe(rows[['SUBJECT', 'INSIGHT']], use_container_width=True, hide_index=True)
+
+def render_kpi_cards(financial_data):
+    """KPI cards from the FINANCIAL_KPIS totals"""
+    if financial_data.empty:
+        return
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric(
+            "Total Plants",
+            f"{int(financial_data.iloc[0]['TOTAL_PLANTS'])}"
+        )
+
+    with col2:
+        inventory_val = financial_data.iloc[0]['TOTAL_INVENTORY'] / 1000000
+        st.metric(
+            "Inventory Value",
+            f"${inventory_val:.1f}M"
+        )
+
+    with col3:
+        wc_val = financial_data.iloc[0]['TOTAL_WORKING_CAPITAL'] / 1000000
+        st.metric(
+            "Working Capital",
+            f"${wc_val:.1f}M"
+        )
+
+    with col4:
+        savings_val = financial_data.iloc[0]['TOTAL_SAVINGS'] / 1000000
+        st.metric(
+            "Cost Savings",
+            f"${savings_val:.1f}M"
+        )
+
+def render_cached_chart(name, view, build):
+    """Draw a figure built at most once per data version and view"""
+    key = (name, get_data_version(), view)
+    with get_instrumentation().timed('chart', name) as event:
+        figure, event['bytes'], hit = get_figure_cache().get_or_build(key, build)
+        event['cache'] = 'hit' if hit else 'miss'
+        if figure is not None:
+            st.plotly_chart(figure, use_container_width=True)
+
+def chart_title(title, x, region):
+    if region:
+        return f"{title} by Plant ({region})"
+    return f"{title} by {'Region' if x == 'REGION' else 'Plant'}"
+
+def render_inventory_chart(inventory_data, regions, region=None, view=None):
+    """Inventory value by plant, or by region for large plant counts"""
+    if inventory_data.empty:
+        return
+
+    def build():
+        import plotly.express as px  # ~0.3s to import - only pages with charts pay it
+        series, x = chart_series(inventory_data, regions, 'INVENTORY_VALUE',
+                                 max_bars=view[2] if view else MAX_BARS, region=region)
+        return px.bar(
+            series,
+            x=x,
+            y='INVENTORY_VALUE',
+            title=chart_title("Inventory Value", x, region),
+            color='INVENTORY_VALUE',
+            color_continuous_scale='Blues',
+            hover_data=['PLANTS']
+        )
+
+    render_cached_chart('inventory', view, build)
+
+def render_efficiency_chart(production_data, regions, region=None, view=None):
+    """Average production efficiency by plant, or by region for large plant counts"""
+    if production_data.empty:
+        return
+
+    def build():
+        import plotly.express as px
+        series, x = chart_series(production_data, regions, 'AVG_EFFICIENCY', weight='EFFICIENCY_COUNT',
+                                 max_bars=view[2] if view else MAX_BARS, region=region)
+        fig = px.bar(
+            series,
+            x=x,
+            y='AVG_EFFICIENCY',
+            title=chart_title("Average Production Efficiency", x, region),
+            color='AVG_EFFICIENCY',
+            color_continuous_scale='Greens',
+            hover_data=['PLANTS']
+        )
+        fig.add_hline(y=90, line_dash="dash", line_color="red",
+                     annotation_text="Target: 90%")
+        return fig
+
+    render_cached_chart('efficiency', view, build)
+
+def render_trend_chart(date_range):
+    """Total production per day, week or month from PRODUCTION_ROLLUP"""
+    def build():
+        grain, trend = load_production_trend(run_query, date_range)
+        if trend.empty:
+            return None
+        import plotly.express as px
+
+        return px.line(
+            trend,
+            x='PERIOD_START',
+            y='TOTAL_QUANTITY',
+            title=f"Production by {grain.lower()}",
+            hover_data=['AVG_EFFICIENCY'],
+            markers=len(trend) <= 60
+        )
+
+    render_cached_chart('trend', date_range, build)
+
+def render_ai_assistant():
+    """AI Assistant powered by Cortex"""
+    st.header("🤖 AI Assistant")
+    st.write("Ask questions about your manufacturing data using natural language.")
+
+    stats = get_answer_cache().stats
+    caption = f"⚡ Answer cache: {stats['hits'] + stats['similar_hits']} hits · {stats['misses']} misses"
+    router = get_question_router()
+    if router is not None:
+        caption += f" · 🧭 {router.stats['routed']} answered from SQL templates"
+    st.caption(caption)
+
+    # Sample questions
+    with st.expander("💡 Sample Questions"):
+        sample_questions = [
+            "What's our total inventory value across all plants?",
+            "Which plant has the highest production efficiency?",
+            "What suppliers pose the highest risk?",
+            "How can we optimize our inventory levels?"
+        ]
+
+        for question in sample_questions:
+            if st.button(question, key=f"sample_{hash(question)}"):
+                render_ai_response(question)
+
+    # Chat interface
+    user_question = st.text_input("Ask your question:")
+
+    if user_question:
+        render_ai_response(user_question)
+
+def render_data_explorer(date_range=None):
+    """Data explorer with paginated raw data views"""
+    st.header("🔍 Data Explorer")
+
+    # Only the selected table is queried, one page at a time
+    table_name = st.radio(
+        "Table:",
+        list(EXPLORER_TABLES),
+        horizontal=True,
+        label_visibility="collapsed"
+    )
+    spec = EXPLORER_TABLES[table_name]
+    st.subheader(spec['subheader'])
+
+    page_size = st.selectbox("Rows per page:", PAGE_SIZES, key=f"page_size_{spec['table']}")
+
+    # The range only applies to dated tables, filtering on their clustering column
+    date_range = date_range if spec.get('date_column') else None
+    if date_range:
+        st.caption(f"{spec['date_column']} from {date_range[0]} to {date_range[1]}")
+
+    # Stack of keyset cursors - the last one is the start of the current page
+    cursors = st.session_state.setdefault(f"cursors_{spec['table']}_{page_size}_{date_range}", [None])
+
+    page_data = run_query(*page_query(spec, page_size, cursors[-1], date_range))
+    has_next = len(page_data) > page_size
+    page_data = page_data.head(page_size)
+
+    if not page_data.empty:
+        st.dataframe(page_data, use_container_width=True)
+
+    summary = run_query(*summary_query(spec, date_range))
+    total_rows = int(summary.iloc[0]['ROW_COUNT']) if not summary.empty else 0
+
+    col1, col2, col3 = st.columns([1, 1, 4])
+
+    with col1:
+        if st.button("◀ Previous", disabled=len(cursors) == 1, key=f"prev_{spec['table']}"):
+            cursors.pop()
+            st.rerun()
+
+    with col2:
+        if st.button("Next ▶", disabled=not has_next, key=f"next_{spec['table']}"):
+            cursors.append(row_key(spec, page_data.iloc[-1]))
+            st.rerun()
+
+    with col3:
+        st.caption(f"Page {len(cursors)} of {max(1, -(-total_rows // page_size))} · {total_rows:,} rows")
+
+    # Quick stats
+    if spec['metric'] and not summary.empty:
+        label, fmt = spec['metric']
+        st.metric(label, fmt.format(summary.iloc[0]['METRIC_VALUE'] or 0))
+
+    render_export(spec, date_range, total_rows)
+
+def render_export(spec, date_range, total_rows):
+    """Stream the filtered table to a Parquet/CSV file, then offer it for download"""
+    from export import EXPORT_FORMATS  # pyarrow - only the Data Explorer pays for it
+    with st.expander("⬇️ Export"):
+        fmt = st.radio("Format:", list(EXPORT_FORMATS), horizontal=True, key=f"export_format_{spec['table']}")
+        key = f"export_{spec['table']}"
+        if st.button(f"Export {total_rows:,} rows", key=f"export_button_{spec['table']}"):
+            st.session_state[key] = export_table(spec, date_range, fmt, total_rows)
+
+        export = st.session_state.get(key)
+        if not export or not os.path.exists(export['path']):
+            return
+        size_mb = os.path.getsize(export['path']) / 1e6
+        st.caption(f"{export['rows']:,} rows · {size_mb:,.1f} MB · saved to {export['path']}")
+        # Downloads are held in server memory while served - larger exports stay on disk only
+        if size_mb <= float(os.getenv('EXPORT_MAX_DOWNLOAD_MB', '200')):
+            with open(export['path'], 'rb') as f:
+                st.download_button(
+                    f"💾 Download {export['format']}",
+                    f,
+                    file_name=os.path.basename(export['path']),
+                    mime=EXPORT_FORMATS[export['format']]['mime'],
+                    key=f"download_{spec['table']}"
+                )
+        else:
+            st.info("Too large to download through the browser - copy it from the path above")
+
+def export_table(spec, date_range, fmt, total_rows):
+    """Stream a table in batches to a file under EXPORT_DIR, with a progress bar"""
+    from export import DEFAULT_EXPORT_DIR, EXPORT_BATCH_ROWS, export_path, export_query, prune_exports
+    directory = os.getenv('EXPORT_DIR', DEFAULT_EXPORT_DIR)
+    prune_exports(directory, max_age=int(os.getenv('EXPORT_MAX_AGE', '3600')))
+    path = export_path(spec['table'], fmt, directory)
+    progress = st.progress(0.0, text="Exporting...")
+
+    def report(rows):
+        progress.progress(min(rows / total_rows, 1.0) if total_rows else 1.0, text=f"Exported {rows:,} rows")
+
+    backend = get_query_backend()
+    query, params = table_query(spec, date_range)
+    try:
+        with get_instrumentation().timed('export', name_of(query), format=fmt) as event:
+            event['rows'] = export_query(backend, query, path, fmt, params=params,
+                                         batch_size=int(os.getenv('EXPORT_BATCH_ROWS', str(EXPORT_BATCH_ROWS))),
+                                         progress=report)
+            event['bytes'] = os.path.getsize(path)
+    except Exception as e:
+        progress.empty()
+        st.error(f"Export failed: {e}")
+        return None
+    progress.progress(1.0, text=f"Exported {event['rows']:,} rows")
+    return {'path': path, 'rows': event['rows'], 'format': fmt}
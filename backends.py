@@ -0,0 +1,500 @@
+"""
+Query backends for the Manufacturing Intelligence Demo
+run_query dispatches through a backend, so the same dashboard SQL can run
+against Snowflake or against an embedded local engine (DuckDB or SQLite)
+seeded from the demo SQL scripts.
+"""
+import contextlib
+import datetime
+import importlib.util
+import os
+import re
+import sqlite3
+import threading
+import pandas as pd
+
+# pyarrow and duckdb are imported where they are used, so the Streamlit in
+# Snowflake app never loads them at startup. duckdb is optional - the local
+# backend falls back to sqlite3
+HAS_DUCKDB = importlib.util.find_spec('duckdb') is not None
+
+SQL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Scripts replayed into the local engine, in the same order as the README
+SEED_SCRIPTS = ['02_tables.sql', '03_data.sql', '04_cortex.sql', '05_aggregates.sql', '06_insights.sql',
+                '07_ingest.sql']
+
+# Rows per Arrow batch for the local engines (Snowflake sizes its own chunks)
+BATCH_SIZE = 100000
+
+# Metadata-only change tokens - LAST_ALTERED moves on every DML commit
+SNOWFLAKE_CHANGE_TOKEN_QUERY = """
+SELECT TABLE_NAME, TO_VARCHAR(LAST_ALTERED) || '/' || TO_VARCHAR(ROW_COUNT) as TOKEN
+FROM INFORMATION_SCHEMA.TABLES
+WHERE TABLE_SCHEMA = CURRENT_SCHEMA() AND TABLE_NAME IN ({tables})
+"""
+
+# Statements that modify a table, capturing the table name
+WRITE_PATTERN = re.compile(
+    r'(?:INSERT\s+(?:OVERWRITE\s+)?INTO|UPDATE|DELETE\s+FROM|MERGE\s+INTO|TRUNCATE\s+(?:TABLE\s+)?'
+    r'|CREATE\s+(?:OR\s+REPLACE\s+)?TABLE(?:\s+IF\s+NOT\s+EXISTS)?)\s+(\w+)',
+    re.IGNORECASE
+)
+
+# Snowflake types that the local engines spell differently
+LOCAL_TYPES = {
+    'duckdb': {'STRING': 'VARCHAR', 'NUMBER': 'DOUBLE'},
+    'sqlite': {'STRING': 'TEXT', 'NUMBER': 'REAL'},
+}
+
+
+class QueryBackend:
+    """Base class - subclasses implement fetch(), and the Arrow paths where they can"""
+    name = "base"
+    label = "Query backend"
+    last_error = None
+    _query_ids = threading.local()
+
+    @property
+    def last_query_id(self):
+        """Warehouse query ID of the last statement this thread ran (None locally)"""
+        return getattr(self._query_ids, 'value', None)
+
+    def is_available(self):
+        return True
+
+    def fetch(self, query, params=None):
+        """Return (columns, rows) for a query, binding params to its ? placeholders"""
+        raise NotImplementedError
+
+    def query(self, query, params=None):
+        """Return query results as a DataFrame"""
+        columns, rows = self.fetch(query, params)
+        return pd.DataFrame(rows, columns=columns)
+
+    def query_arrow(self, query, params=None):
+        """Return query results as a pyarrow Table"""
+        import pyarrow as pa
+        return pa.Table.from_pandas(self.query(query, params), preserve_index=False)
+
+    def iter_batches(self, query, batch_size=BATCH_SIZE, params=None):
+        """Stream query results as pyarrow RecordBatches"""
+        yield from self.query_arrow(query, params).to_batches(max_chunksize=batch_size)
+
+    def transaction(self, statements):
+        """Run [(sql, params), ...] as one transaction; returns each statement's (columns, rows)"""
+        raise NotImplementedError
+
+    def change_tokens(self, tables):
+        """Cheap per-table token that changes whenever the table's data does"""
+        query = "\nUNION ALL\n".join(
+            f"SELECT '{table}' as TABLE_NAME, COUNT(*) as TOKEN FROM {table}" for table in tables
+        )
+        columns, rows = self.fetch(query)
+        return {name: str(token) for name, token in rows}
+
+
+class SnowflakeMetadataMixin:
+    """Change tokens from INFORMATION_SCHEMA instead of scanning the tables"""
+
+    def change_tokens(self, tables):
+        placeholders = ', '.join('?' for _ in tables)
+        columns, rows = self.fetch(SNOWFLAKE_CHANGE_TOKEN_QUERY.format(tables=placeholders), list(tables))
+        return {name: token for name, token in rows}
+
+
+class SnowflakeBackend(SnowflakeMetadataMixin, QueryBackend):
+    """Snowflake via snowflake.connector (local app.py deployment)"""
+    name = "snowflake"
+    label = "Snowflake"
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    @property
+    def last_error(self):
+        return self.pool.last_error
+
+    def is_available(self):
+        return self.pool.is_available()
+
+    def fetch(self, query, params=None):
+        def execute(conn):
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query, params)
+                self._query_ids.value = cursor.sfqid
+                rows = cursor.fetchall()
+                columns = [desc[0] for desc in cursor.description]
+                return columns, rows
+            finally:
+                cursor.close()
+
+        # Each query gets its own pooled connection, reconnecting if it died
+        return self.pool.run(execute)
+
+    def query(self, query, params=None):
+        def execute(conn):
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query, params)
+                self._query_ids.value = cursor.sfqid
+                from snowflake.connector.errors import NotSupportedError
+                try:
+                    # Typed columns straight from the Arrow result chunks
+                    df = cursor.fetch_pandas_all()
+                except NotSupportedError:
+                    # Non-Arrow results (SHOW, DDL status rows)
+                    return pd.DataFrame(cursor.fetchall(), columns=[d[0] for d in cursor.description])
+                if df is None or (df.empty and len(df.columns) == 0):
+                    return pd.DataFrame(columns=[d[0] for d in cursor.description])
+                return df
+            finally:
+                cursor.close()
+
+        return self.pool.run(execute)
+
+    def query_arrow(self, query, params=None):
+        def execute(conn):
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query, params)
+                self._query_ids.value = cursor.sfqid
+                table = cursor.fetch_arrow_all()
+                if table is None:
+                    import pyarrow as pa
+                    return pa.table({d[0]: pa.array([], pa.null()) for d in cursor.description})
+                return table
+            finally:
+                cursor.close()
+
+        return self.pool.run(execute)
+
+    def transaction(self, statements):
+        # One checked-out connection, so every statement runs in the same open transaction
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("BEGIN")
+                try:
+                    results = []
+                    for query, params in statements:
+                        cursor.execute(query, params)
+                        self._query_ids.value = cursor.sfqid
+                        results.append(([desc[0] for desc in cursor.description], cursor.fetchall()))
+                    cursor.execute("COMMIT")
+                except Exception:
+                    cursor.execute("ROLLBACK")
+                    raise
+                return results
+            finally:
+                cursor.close()
+
+    def iter_batches(self, query, batch_size=BATCH_SIZE, params=None):
+        # Holds one pooled connection until the consumer finishes the stream
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query, params)
+                self._query_ids.value = cursor.sfqid
+                for table in cursor.fetch_arrow_batches():
+                    yield from table.to_batches(max_chunksize=batch_size)
+            finally:
+                cursor.close()
+
+
+class SnowparkBackend(SnowflakeMetadataMixin, QueryBackend):
+    """Snowflake via a Snowpark session (Streamlit in Snowflake)"""
+    name = "snowpark"
+    label = "Snowflake"
+
+    def __init__(self, session):
+        self.session = session
+
+    def fetch(self, query, params=None):
+        df = self.query(query, params)
+        return list(df.columns), list(df.itertuples(index=False, name=None))
+
+    def query(self, query, params=None):
+        return self.session.sql(query, params=params).to_pandas()
+
+    def transaction(self, statements):
+        self.session.sql("BEGIN").collect()
+        try:
+            results = [self.fetch(query, params) for query, params in statements]
+            self.session.sql("COMMIT").collect()
+        except Exception:
+            self.session.sql("ROLLBACK").collect()
+            raise
+        return results
+
+    def iter_batches(self, query, batch_size=BATCH_SIZE, params=None):
+        import pyarrow as pa
+        for df in self.session.sql(query, params=params).to_pandas_batches():
+            yield from pa.Table.from_pandas(df, preserve_index=False).to_batches(max_chunksize=batch_size)
+
+
+class LocalBackend(QueryBackend):
+    """Embedded DuckDB (or SQLite) engine seeded from the demo SQL scripts"""
+    name = "local"
+
+    def __init__(self, engine=None, path=':memory:', seed_scripts=SEED_SCRIPTS):
+        if engine is None:
+            engine = 'duckdb' if HAS_DUCKDB else 'sqlite'
+        if engine == 'duckdb' and not HAS_DUCKDB:
+            raise ImportError("duckdb is not installed - pip install duckdb or use LOCAL_DB_ENGINE=sqlite")
+        if engine not in LOCAL_TYPES:
+            raise ValueError(f"Unknown local engine: {engine}")
+
+        self.engine = engine
+        self.label = f"Local {'DuckDB' if engine == 'duckdb' else 'SQLite'}"
+        # Reentrant, so the writes inside an atomic() block can take it again
+        self._lock = threading.RLock()
+        self._writes = {}
+        self._pending = None
+        if engine == 'duckdb':
+            import duckdb
+            self._conn = duckdb.connect(path)
+        else:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.create_function('DATE_TRUNC', 2, sqlite_date_trunc, deterministic=True)
+
+        if seed_scripts and not self.has_table('PLANTS'):
+            for script in seed_scripts:
+                self.load_script(os.path.join(SQL_DIR, script))
+
+    def has_table(self, table):
+        if self.engine == 'duckdb':
+            query = "SELECT COUNT(*) FROM information_schema.tables WHERE UPPER(table_name) = ?"
+        else:
+            query = "SELECT COUNT(*) FROM sqlite_master WHERE UPPER(name) = ?"
+        with self._lock:
+            return self._conn.execute(query, [table.upper()]).fetchone()[0] > 0
+
+    def load_script(self, path):
+        """Replay a Snowflake SQL script, skipping what only makes sense in Snowflake"""
+        with open(path, 'r') as f:
+            script = f.read()
+        with self._lock:
+            for statement in split_sql(script):
+                for local_statement in translate_statement(statement, self.engine):
+                    self._conn.execute(local_statement)
+                    self._mark_written(local_statement)
+            if self.engine == 'sqlite':
+                self._conn.commit()
+
+    def execute(self, statement, params=None):
+        """Run a DDL/DML statement and record which tables it changed"""
+        with self._lock:
+            self._conn.execute(statement, params or [])
+            self._written(statement)
+
+    def executemany(self, statement, rows):
+        """Run a DML statement once per parameter row"""
+        with self._lock:
+            self._conn.executemany(statement, rows)
+            self._written(statement)
+
+    @contextlib.contextmanager
+    def atomic(self):
+        """Run every execute/executemany/insert_rows in the block as one transaction
+
+        The lock is held until it commits or rolls back, so no other thread
+        reads a half-applied change. Nested blocks join the outer transaction.
+        """
+        with self._lock:
+            if self._pending is not None:
+                yield
+                return
+            self._conn.execute("BEGIN TRANSACTION")
+            self._pending = []
+            try:
+                yield
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+            finally:
+                pending, self._pending = self._pending, None
+            for statement in pending:
+                self._mark_written(statement)
+
+    def transaction(self, statements):
+        results = []
+        with self.atomic():
+            for query, params in statements:
+                cursor = self._conn.execute(query, params or [])
+                description = cursor.description or []
+                results.append(([desc[0].upper() for desc in description], cursor.fetchall() if description else []))
+                self._written(query)
+        return results
+
+    def insert_rows(self, table, df):
+        """Bulk insert a DataFrame into a table, matching columns by name"""
+        columns = ', '.join(df.columns)
+        if self.engine == 'duckdb':
+            # DuckDB scans the DataFrame's columns directly - no per-row binding
+            with self._lock:
+                self._conn.register('_insert_rows', df)
+                try:
+                    self._conn.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM _insert_rows")
+                finally:
+                    self._conn.unregister('_insert_rows')
+                self._written(f"INSERT INTO {table}")
+            return
+        placeholders = ', '.join('?' for _ in df.columns)
+        self.executemany(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", python_rows(df))
+
+    def change_tokens(self, tables):
+        # Row counts miss in-place UPDATEs, so add the local write counter
+        counts = super().change_tokens(tables)
+        with self._lock:
+            return {table: f"{count}.{self._writes.get(table, 0)}" for table, count in counts.items()}
+
+    def _written(self, statement):
+        """Commit a write, or leave it to the enclosing atomic() block"""
+        if self._pending is not None:
+            self._pending.append(statement)
+            return
+        if self.engine == 'sqlite':
+            self._conn.commit()
+        self._mark_written(statement)
+
+    def _mark_written(self, statement):
+        for table in WRITE_PATTERN.findall(statement):
+            self._writes[table.upper()] = self._writes.get(table.upper(), 0) + 1
+
+    def fetch(self, query, params=None):
+        with self._lock:
+            cursor = self._conn.execute(query, params or [])
+            rows = cursor.fetchall()
+            # Snowflake folds unquoted identifiers to upper case - match it
+            columns = [desc[0].upper() for desc in cursor.description]
+        return columns, rows
+
+    def query(self, query, params=None):
+        if self.engine == 'sqlite':
+            return super().query(query, params)
+        with self._lock:
+            df = self._conn.execute(query, params or []).df()
+        df.columns = [column.upper() for column in df.columns]
+        return df
+
+    def query_arrow(self, query, params=None):
+        if self.engine == 'sqlite':
+            return super().query_arrow(query, params)
+        with self._lock:
+            table = read_arrow(self._conn.execute(query, params or []).arrow())
+        return table.rename_columns([name.upper() for name in table.column_names])
+
+    def iter_batches(self, query, batch_size=BATCH_SIZE, params=None):
+        import pyarrow as pa
+        if self.engine == 'duckdb':
+            # A cursor is its own DuckDB connection, so streaming needs no lock
+            cursor = self._conn.cursor()
+            try:
+                for batch in iter_arrow(cursor.execute(query, params or []).arrow(batch_size)):
+                    yield pa.RecordBatch.from_arrays(batch.columns, names=[name.upper() for name in batch.schema.names])
+            finally:
+                cursor.close()
+            return
+
+        with self._lock:
+            cursor = self._conn.execute(query, params or [])
+            columns = [desc[0].upper() for desc in cursor.description]
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield pa.RecordBatch.from_pandas(pd.DataFrame(rows, columns=columns), preserve_index=False)
+
+
+def python_rows(df):
+    """DataFrame rows as plain Python values that any DB-API driver can bind"""
+    df = df.copy()
+    for column in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = df[column].dt.strftime('%Y-%m-%d')
+    return [tuple(None if pd.isna(value) else value for value in row)
+            for row in df.astype(object).itertuples(index=False, name=None)]
+
+
+def read_arrow(result):
+    """DuckDB returns a Table or a RecordBatchReader depending on version"""
+    import pyarrow as pa
+    return result.read_all() if isinstance(result, pa.RecordBatchReader) else result
+
+
+def iter_arrow(result):
+    import pyarrow as pa
+    return result if isinstance(result, pa.RecordBatchReader) else iter(result.to_batches())
+
+
+def split_sql(script):
+    """Split a SQL script into statements, dropping -- comments"""
+    lines = [line.split('--', 1)[0] for line in script.splitlines()]
+    statements = '\n'.join(lines).split(';')
+    return [s.strip() for s in statements if s.strip()]
+
+
+def translate_statement(statement, engine):
+    """Map one Snowflake statement onto the local engine (may return none)"""
+    upper = statement.upper()
+
+    # Session context, status checks and Cortex calls have no local meaning
+    if upper.startswith(('USE ', 'SELECT', 'SHOW ')) or 'SNOWFLAKE.CORTEX' in upper:
+        return []
+    if re.match(r'(CREATE\s+(OR\s+REPLACE\s+)?(DATABASE|SCHEMA|WAREHOUSE|STREAM|TASK|TRANSIENT)|ALTER\s+TASK)\b', upper):
+        return []
+
+    # Reads as of a stream's offset: the local engine keeps its summaries in step itself
+    statement = re.sub(r"\s+AT\s*\(\s*STREAM\s*=>\s*'\w+'\s*\)", '', statement, flags=re.IGNORECASE)
+
+    # Clustering keys: DuckDB prunes row groups by min/max on its own, SQLite gets an index
+    extra = []
+    cluster = re.search(r'\)\s*CLUSTER\s+BY\s*\(([^)]*)\)\s*$', statement, flags=re.IGNORECASE)
+    if cluster:
+        statement = statement[:cluster.start() + 1]
+        if engine == 'sqlite':
+            table = re.match(r'CREATE\s+(?:OR\s+REPLACE\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)',
+                             statement, flags=re.IGNORECASE).group(1)
+            extra.append(f"CREATE INDEX IF NOT EXISTS {table}_CLUSTER ON {table} ({cluster.group(1)})")
+
+    if re.match(r'CREATE\s+(OR\s+REPLACE\s+)?TABLE\b', upper):
+        for snowflake_type, local_type in LOCAL_TYPES[engine].items():
+            statement = re.sub(rf'\b{snowflake_type}\b', local_type, statement, flags=re.IGNORECASE)
+
+    if engine == 'sqlite':
+        match = re.match(r'CREATE\s+OR\s+REPLACE\s+(TABLE|VIEW)\s+(\w+)', statement, flags=re.IGNORECASE)
+        if match:
+            kind, name = match.group(1).upper(), match.group(2)
+            body = statement[match.end():]
+            return [f"DROP {kind} IF EXISTS {name}", f"CREATE {kind} {name}{body}"] + extra
+
+    return [statement] + extra
+
+
+def sqlite_date_trunc(part, value):
+    """DATE_TRUNC for SQLite's ISO date strings (weeks start on Monday, as in Snowflake)"""
+    if value is None:
+        return None
+    day = datetime.date.fromisoformat(str(value)[:10])
+    part = part.upper()
+    if part == 'WEEK':
+        day -= datetime.timedelta(days=day.weekday())
+    elif part == 'MONTH':
+        day = day.replace(day=1)
+    elif part == 'YEAR':
+        day = day.replace(month=1, day=1)
+    return day.isoformat()
+
+
+def backend_from_env(pool=None):
+    """Build the backend selected by QUERY_BACKEND (snowflake or local)"""
+    if os.getenv('QUERY_BACKEND', 'snowflake').lower() == 'local':
+        return LocalBackend(
+            engine=os.getenv('LOCAL_DB_ENGINE') or None,
+            path=os.getenv('LOCAL_DB_PATH', ':memory:')
+        )
+    return SnowflakeBackend(pool)
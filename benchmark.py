@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the Manufacturing Intelligence Demo
+Loads synthetic data (synthetic_data.py) at a chosen scale into a local engine, then drives the
+real app through streamlit's AppTest and reports p50/p95 latency, peak Python
+memory and warehouse queries per run for the dashboard, every Data Explorer
+tab and the AI Assistant (stub model).
+
+    python benchmark.py --plants 1000 --days 365 --lines-per-plant 3
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+from functools import wraps
+import numpy as np
+from backends import QueryBackend, LocalBackend
+from explorer_data import EXPLORER_TABLES
+from synthetic_data import SyntheticData, build_local_database
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+# Open-ended, so it reaches the model; the metric question is answered from a SQL template
+BENCH_QUESTION = "How can we improve production efficiency?"
+BENCH_ROUTED_QUESTION = "Which plant has the highest production efficiency?"
+
+
+def build_database(path, engine='duckdb', **scale):
+    """Create a local database at path holding synthetic data and the derived views/summaries"""
+    return build_local_database(SyntheticData(**scale), path, engine=engine)
+
+
+class QueryCounter:
+    """Counts backend round trips (nested calls, e.g. query -> fetch, count once)"""
+
+    METHODS = ['fetch', 'query', 'query_arrow', 'iter_batches']
+
+    def __init__(self):
+        self.count = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._originals = {}
+
+    def install(self):
+        for cls in (QueryBackend, LocalBackend):
+            for method in self.METHODS:
+                if method in cls.__dict__:
+                    original = cls.__dict__[method]
+                    self._originals[(cls, method)] = original
+                    setattr(cls, method, self._wrap(original))
+
+    def uninstall(self):
+        for (cls, method), original in self._originals.items():
+            setattr(cls, method, original)
+        self._originals.clear()
+
+    def _wrap(self, method):
+        counter = self
+
+        @wraps(method)
+        def counted(*args, **kwargs):
+            depth = getattr(counter._local, 'depth', 0)
+            if depth == 0:
+                with counter._lock:
+                    counter.count += 1
+            counter._local.depth = depth + 1
+            try:
+                return method(*args, **kwargs)
+            finally:
+                counter._local.depth = depth
+        return counted
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else float('nan')
+
+
+def measure(name, run, reset, iterations, counter):
+    """Time `run` over iterations, calling reset() before each one"""
+    timings, queries = [], []
+    tracemalloc.start()
+    try:
+        for _ in range(iterations):
+            reset()
+            before = counter.count
+            started = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - started) * 1000)
+            queries.append(counter.count - before)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'scenario': name,
+        'runs': iterations,
+        'p50_ms': round(percentile(timings, 50), 1),
+        'p95_ms': round(percentile(timings, 95), 1),
+        'peak_mb': round(peak / 1e6, 1),
+        'queries_per_run': round(float(np.mean(queries)), 1),
+    }
+
+
+def run_benchmarks(db_path, engine='duckdb', iterations=10, warm=False):
+    """Drive app.py against db_path and return one result row per scenario"""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+    import app_core
+
+    environment = {
+        'QUERY_BACKEND': 'local',
+        'LOCAL_DB_ENGINE': engine,
+        'LOCAL_DB_PATH': db_path,
+        'LLM_BACKEND': 'stub',
+        # Cold runs measure the query path, not a background warmer refilling the cache
+        'WARM_INTERVAL': '0',
+        'RESULT_CACHE': 'off',
+        'AI_CACHE_PATH': os.path.join(os.path.dirname(db_path), 'bench_ai_cache.sqlite'),
+    }
+    saved = {name: os.environ.get(name) for name in environment}
+    os.environ.update(environment)
+    # Shared resources (backend, caches) must be rebuilt for this database
+    st.cache_resource.clear()
+    counter = QueryCounter()
+    counter.install()
+    try:
+        at = AppTest.from_file(APP_PATH, default_timeout=600).run()
+        if at.exception:
+            raise RuntimeError(f"app failed to start: {at.exception[0].value}")
+
+        def reset():
+            if not warm:
+                app_core.get_query_cache().clear()
+                app_core.get_answer_cache().clear()
+                app_core.get_figure_cache().clear()
+
+        def dashboard():
+            at.sidebar.selectbox[0].select("Executive Dashboard").run()
+
+        results = [measure('executive_dashboard', dashboard, reset, iterations, counter)]
+        # Same page over the last 30 days - rollup periods instead of all-time summaries
+        at.sidebar.selectbox[1].select("Last 30 days").run()
+        results.append(measure('executive_dashboard_30d', dashboard, reset, iterations, counter))
+        at.sidebar.selectbox[1].select("All time").run()
+
+        at.sidebar.selectbox[0].select("Data Explorer").run()
+        for tab in EXPLORER_TABLES:
+            results.append(measure(f"explorer_{tab.lower()}", lambda: at.radio[0].set_value(tab).run(),
+                                   reset, iterations, counter))
+
+        at.sidebar.selectbox[0].select("AI Assistant").run()
+        asked = iter(range(10 ** 9))
+
+        def ask():
+            # A new question each time, so the answer cache never short-circuits the path
+            at.text_input[0].input(f"{BENCH_QUESTION} ({next(asked)})").run()
+        results.append(measure('ai_assistant', ask, reset, iterations, counter))
+
+        def ask_routed():
+            at.text_input[0].input(f"{BENCH_ROUTED_QUESTION} ({next(asked)})").run()
+        results.append(measure('ai_assistant_routed', ask_routed, reset, iterations, counter))
+        return results
+    finally:
+        counter.uninstall()
+        st.cache_resource.clear()
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def print_results(results):
+    columns = ['scenario', 'runs', 'p50_ms', 'p95_ms', 'peak_mb', 'queries_per_run']
+    widths = [max(len(c), *(len(str(r[c])) for r in results)) for c in columns]
+    print('  '.join(c.ljust(w) for c, w in zip(columns, widths)))
+    for row in results:
+        print('  '.join(str(row[c]).ljust(w) for c, w in zip(columns, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--plants', type=int, default=100)
+    parser.add_argument('--items-per-plant', type=int, default=20)
+    parser.add_argument('--suppliers', type=int, default=200)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--lines-per-plant', type=int, default=3)
+    parser.add_argument('--engine', choices=['duckdb', 'sqlite'], default='duckdb')
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--warm', action='store_true', help="keep the query and answer caches between runs")
+    parser.add_argument('--db', help="reuse/keep the generated database at this path")
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='manufacturing_bench_')
+    db_path = args.db or os.path.join(workdir, f"bench.{args.engine}")
+    try:
+        if not (args.db and os.path.exists(args.db)):
+            started = time.perf_counter()
+            scale = dict(plants=args.plants, items_per_plant=args.items_per_plant, suppliers=args.suppliers,
+                         days=args.days, lines_per_plant=args.lines_per_plant)
+            build_database(db_path, engine=args.engine, **scale)
+            print(f"Loaded {SyntheticData(**scale).production_rows:,} production rows for {args.plants:,} plants "
+                  f"in {time.perf_counter() - started:.1f}s")
+        results = run_benchmarks(db_path, engine=args.engine, iterations=args.iterations, warm=args.warm)
+        print_results(results)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump({'scale': vars(args), 'results': results}, f, indent=2)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
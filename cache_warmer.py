@@ -0,0 +1,132 @@
+"""
+Background cache warmer for the Manufacturing Intelligence Demo
+Re-runs the dashboard's loaders on a fixed cadence so no viewer waits on a
+cold query. Each pass reads the change tokens, re-runs whatever changed
+against them and only then publishes the tokens, so every session switches
+to the new data at once. Between passes the query cache serves warm results
+as they are (stale-while-revalidate) and wakes the warmer early.
+Every pass reads the change tokens, which is a warehouse query on Snowflake,
+so the warmer pauses once no session has been active for idle_after seconds
+and lets the warehouse auto-suspend.
+"""
+import logging
+import threading
+import time
+from instrumentation import result_size
+from query_fanout import run_queries_concurrently
+from query_registry import name_of
+
+logger = logging.getLogger('manufacturing.warmer')
+
+
+class CacheWarmer:
+    """Keeps the results read by `jobs` ({name: fn(run_query)}) warm in a QueryCache"""
+
+    def __init__(self, cache, jobs, interval=20, max_workers=4, instrumentation=None, idle_after=None):
+        self.cache = cache
+        self.jobs = jobs
+        self.interval = interval
+        self.max_workers = max_workers
+        self.instrumentation = instrumentation
+        self.idle_after = idle_after
+        self.stats = {'passes': 0, 'refreshed': 0, 'errors': 0, 'last_pass_at': None, 'last_pass_ms': None,
+                      'paused': False}
+        self._active_at = time.monotonic()
+        self.last_error = None
+        self._wake = threading.Event()
+        self._pass_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+
+    def start(self):
+        if self._thread is None:
+            self._stopping = False
+            self.cache.refresher = self
+            self._thread = threading.Thread(target=self._run, name='cache-warmer', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+        self.cache.refresher = None
+
+    def wake(self):
+        """Run the next pass now instead of at the end of the interval"""
+        self._wake.set()
+
+    def touch(self):
+        """Record viewer activity, resuming passes if the warmer had paused"""
+        self._active_at = time.monotonic()
+        if self.stats['paused']:
+            self._wake.set()
+
+    def idle(self):
+        return self.idle_after is not None and time.monotonic() - self._active_at > self.idle_after
+
+    def refresh(self):
+        """One pass: re-run outdated results against fresh tokens, then publish the tokens"""
+        with self._pass_lock:
+            started = time.perf_counter()
+            tokens = self.cache.backend.change_tokens(self.cache.tables)
+
+            def warm_query(query, params=None):
+                return self.cache.get_or_run(query, run=self._run_query, params=params, tokens=tokens,
+                                             keep_warm=True)
+
+            def run_job(job):
+                try:
+                    job(warm_query)
+                    return None
+                except Exception as e:  # one failing loader must not hold back the others
+                    return e
+
+            failed = [(name, error) for name, error in run_queries_concurrently(
+                run_job, self.jobs, max_workers=min(self.max_workers, len(self.jobs))) if error is not None]
+            for name, error in failed:
+                logger.warning("Warming %s failed: %s", name, error)
+            # Outdated warm results of failed jobs keep being served until a later pass succeeds
+            self.cache.publish_tokens(tokens)
+
+            with self._stats_lock:
+                self.stats['passes'] += 1
+                self.stats['errors'] += len(failed)
+                self.stats['last_pass_at'] = time.time()
+                self.stats['last_pass_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            if failed:
+                self.last_error = failed[-1][1]
+
+    def _run_query(self, query, params=None):
+        with self._stats_lock:
+            self.stats['refreshed'] += 1
+        if self.instrumentation is None:
+            return self.cache.backend.query(query, params)
+        with self.instrumentation.timed('warm', name_of(query)) as event:
+            result = self.cache.backend.query(query, params)
+            event['query_id'] = self.cache.backend.last_query_id
+            event['rows'], event['bytes'] = result_size(result)
+            return result
+
+    def _run(self):
+        while not self._stopping:
+            if self.idle():
+                # No viewers - no warehouse queries until touch() or stop()
+                self.stats['paused'] = True
+                self._wake.wait()
+                self._wake.clear()
+                self.stats['paused'] = False
+                continue
+            try:
+                self.refresh()
+            except Exception as e:  # e.g. the warehouse is unreachable - try again next interval
+                self.last_error = e
+                with self._stats_lock:
+                    self.stats['errors'] += 1
+                logger.warning("Cache warming pass failed: %s", e)
+            self._wake.wait(self.interval)
+            self._wake.clear()
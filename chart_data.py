@@ -0,0 +1,108 @@
+"""
+Chart data layer for the Manufacturing Intelligence Demo
+Per-plant series are capped before they reach Plotly. Up to max_bars plants
+are drawn as they are; beyond that a chart shows one bar per PLANTS.REGION,
+and drilling into a region shows its top plants plus one "Other" bar. Built
+figures are cached by data version and view, so a rerun re-sends a small,
+ready-made figure instead of rebuilding it.
+"""
+import threading
+from collections import OrderedDict
+import pandas as pd
+from query_registry import register
+
+MAX_BARS = 20
+
+PLANT_REGIONS_QUERY = register('plant_regions', "SELECT PLANT_ID, REGION FROM PLANTS")
+
+UNKNOWN_REGION = 'Unknown'
+
+
+def load_plant_regions(run_query):
+    """PLANT_ID -> REGION"""
+    plants = run_query(PLANT_REGIONS_QUERY)
+    if plants.empty:
+        return pd.Series(dtype=object)
+    return plants.set_index('PLANT_ID')['REGION']
+
+
+def aggregate(frame, value, weight=None):
+    """One row from many: a sum, or a weighted mean when weight is given"""
+    if weight is None:
+        return frame[value].sum()
+    total = frame[weight].sum()
+    return (frame[value] * frame[weight]).sum() / total if total else float('nan')
+
+
+def rollup(frame, by, value, weight=None):
+    """Per-group value (sum or weighted mean) and plant count, largest first"""
+    rows = [
+        {by: group, value: aggregate(rows, value, weight), 'PLANTS': len(rows)}
+        for group, rows in frame.groupby(by)
+    ]
+    return pd.DataFrame(rows, columns=[by, value, 'PLANTS']).sort_values(value, ascending=False, ignore_index=True)
+
+
+def top_n_with_other(frame, value, n, weight=None, label='PLANT_ID'):
+    """The n largest rows by value, then one 'Other (k plants)' row for the rest"""
+    ranked = frame.sort_values(value, ascending=False, ignore_index=True)
+    top = ranked.head(n)[[label, value]].assign(PLANTS=1)
+    rest = ranked.iloc[n:]
+    if rest.empty:
+        return top
+    other = pd.DataFrame([{label: f"Other ({len(rest)} plants)", value: aggregate(rest, value, weight),
+                           'PLANTS': len(rest)}])
+    return pd.concat([top, other], ignore_index=True)
+
+
+def chart_series(frame, regions, value, weight=None, max_bars=MAX_BARS, region=None):
+    """(series, x column) for a per-plant bar chart, never more than max_bars + 1 bars"""
+    frame = frame.assign(REGION=frame['PLANT_ID'].map(regions).fillna(UNKNOWN_REGION))
+    if region is not None:
+        return top_n_with_other(frame[frame['REGION'] == region], value, max_bars, weight), 'PLANT_ID'
+    if len(frame) <= max_bars:
+        return frame[['PLANT_ID', value]].assign(PLANTS=1), 'PLANT_ID'
+    series = rollup(frame, 'REGION', value, weight)
+    if len(series) > max_bars:
+        return top_n_with_other(series, value, max_bars, weight=None if weight is None else 'PLANTS',
+                                label='REGION'), 'REGION'
+    return series, 'REGION'
+
+
+class FigureCache:
+    """LRU of built figures, keyed by chart name, data version and view parameters
+
+    st.plotly_chart serialises a ready Figure in a few milliseconds, while
+    building one with plotly.express costs tens to hundreds, so reruns and
+    other sessions reuse the built figure. Figures are never mutated after
+    they are cached.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'misses': 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        """(figure, payload bytes, hit) for key; build() returns a Figure or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry + (True,)
+            self.stats['misses'] += 1
+
+        figure = build()
+        size = len(figure.to_json()) if figure is not None else 0
+        with self._lock:
+            self._entries[key] = (figure, size)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return figure, size, False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
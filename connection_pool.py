@@ -0,0 +1,136 @@
+"""
+Bounded connection pool for the Manufacturing Intelligence Demo
+Each query checks out its own connection, so concurrent dashboard viewers
+run in parallel instead of queueing on one shared socket.
+"""
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the checkout timeout"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of DB-API connections created on demand by a factory"""
+
+    def __init__(self, factory, size=4, timeout=30, health_check_interval=300):
+        self.factory = factory
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.last_error = None
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def acquire(self):
+        """Check out a healthy connection - pair with release()"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"No free connection after {self.timeout}s (pool size {self.size})")
+        try:
+            return self._checkout()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn, broken=False):
+        """Return a connection to the pool, or drop it if broken"""
+        try:
+            if broken:
+                self._discard(conn)
+            else:
+                self._idle.put((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of the block"""
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except Exception:
+            # Broken connections are dropped so the next checkout reconnects
+            broken = not self.is_healthy(conn, ping=True)
+            raise
+        finally:
+            self.release(conn, broken)
+
+    def run(self, work, retries=1):
+        """Call work(conn), retrying on a fresh connection if the old one died"""
+        for attempt in range(retries + 1):
+            conn = self.acquire()
+            try:
+                result = work(conn)
+            except Exception:
+                broken = not self.is_healthy(conn, ping=True)
+                self.release(conn, broken)
+                if broken and attempt < retries:
+                    continue
+                raise
+            self.release(conn)
+            return result
+
+    def is_available(self):
+        """True if a connection can be checked out right now"""
+        try:
+            with self.connection():
+                return True
+        except Exception:
+            return False
+
+    def is_healthy(self, conn, ping=False):
+        """Closed connections fail; ping=True also round-trips a SELECT 1"""
+        is_closed = getattr(conn, 'is_closed', None)
+        if is_closed is not None and is_closed():
+            return False
+        if not ping:
+            return True
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def close(self):
+        """Close all idle connections"""
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(conn)
+
+    def _checkout(self):
+        while True:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            stale = time.monotonic() - last_used > self.health_check_interval
+            if self.is_healthy(conn, ping=stale):
+                self.last_error = None
+                return conn
+            self._discard(conn)
+
+        try:
+            conn = self.factory()
+        except Exception as e:
+            self.last_error = e
+            raise
+        self.last_error = None
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
@@ -0,0 +1,186 @@
+"""
+Retrieval context for the AI Assistant
+A compact index of per-plant, per-category and per-supplier summary lines is
+built from the summary tables once per data version. Each question gets the
+few lines that mention its plants, categories or suppliers (or are closest to
+it by embedding) within a fixed character budget, so prompts stay small.
+"""
+import re
+import threading
+import numpy as np
+import pandas as pd
+from ai_cache import hashed_embedding, normalize_question
+from query_registry import register
+
+CONTEXT_QUERIES = {
+    'plant': """
+    SELECT
+        p.PLANT_ID, p.PLANT_NAME, p.REGION, p.COUNTRY,
+        i.INVENTORY_VALUE, pr.AVG_EFFICIENCY, pr.TOTAL_QUANTITY,
+        f.WORKING_CAPITAL, f.COST_SAVINGS
+    FROM PLANTS p
+    LEFT JOIN (
+        SELECT PLANT_ID, SUM(TOTAL_VALUE) as INVENTORY_VALUE
+        FROM INVENTORY_SUMMARY
+        GROUP BY PLANT_ID
+    ) i ON i.PLANT_ID = p.PLANT_ID
+    LEFT JOIN (
+        SELECT PLANT_ID, TOTAL_QUANTITY,
+               EFFICIENCY_SUM / NULLIF(EFFICIENCY_COUNT, 0) as AVG_EFFICIENCY
+        FROM PRODUCTION_SUMMARY
+    ) pr ON pr.PLANT_ID = p.PLANT_ID
+    LEFT JOIN (
+        SELECT PLANT_ID, SUM(WORKING_CAPITAL) as WORKING_CAPITAL, SUM(COST_SAVINGS) as COST_SAVINGS
+        FROM FINANCIAL_KPIS
+        GROUP BY PLANT_ID
+    ) f ON f.PLANT_ID = p.PLANT_ID
+    ORDER BY p.PLANT_ID
+    """,
+    'category': """
+    SELECT i.PLANT_ID, p.PLANT_NAME, i.CATEGORY, i.TOTAL_STOCK, i.TOTAL_VALUE, i.ITEM_COUNT, i.STOCK_STATUS
+    FROM INVENTORY_INSIGHTS i
+    LEFT JOIN PLANTS p ON p.PLANT_ID = i.PLANT_ID
+    ORDER BY i.PLANT_ID, i.CATEGORY
+    """,
+    'supplier': """
+    SELECT SUPPLIER_NAME, COUNTRY, PERFORMANCE_SCORE, RISK_SCORE, RISK_CATEGORY
+    FROM SUPPLIER_RISK
+    """,
+}
+CONTEXT_QUERIES = {kind: register(f'context_{kind}', sql) for kind, sql in CONTEXT_QUERIES.items()}
+
+# Words that make a whole kind of snippet relevant when no entity is named
+TOPIC_TERMS = {
+    'plant': ['plant', 'plants', 'site', 'efficiency', 'efficient', 'production', 'output',
+              'quantity', 'working capital', 'savings', 'region'],
+    'category': ['inventory', 'stock', 'reorder', 'category', 'categories', 'excess', 'low stock',
+                 'materials', 'components', 'goods'],
+    'supplier': ['supplier', 'suppliers', 'vendor', 'vendors', 'risk', 'risky', 'performance'],
+}
+
+ENTITY_WEIGHT = 3.0
+TOPIC_WEIGHT = 1.0
+# Snippets matching neither an entity nor a topic need at least this similarity
+MIN_SIMILARITY = 0.3
+
+
+def _money(value):
+    return 'n/a' if pd.isna(value) else f"${float(value):,.0f}"
+
+
+def _number(value, fmt='{:,.0f}'):
+    return 'n/a' if pd.isna(value) else fmt.format(float(value))
+
+
+def _mentions(text, term):
+    """Whole-word match of a normalised term in normalised text"""
+    return term and re.search(rf'\b{re.escape(term)}\b', text) is not None
+
+
+class ContextIndex:
+    """Summary snippets for prompt grounding, rebuilt when the data version changes"""
+
+    def __init__(self, run_query, max_chars=1500, embed=hashed_embedding):
+        self.run_query = run_query
+        self.max_chars = max_chars
+        self.embed = embed
+        self.version = None
+        self.overview = ''
+        self.snippets = []
+        self._vectors = None
+        self._lock = threading.Lock()
+
+    def refresh(self, data_version):
+        """Rebuild the index if the data changed since it was last built"""
+        with self._lock:
+            if self.version != data_version or self._vectors is None:
+                self.build()
+                self.version = data_version
+
+    def build(self):
+        frames = {kind: self.run_query(query) for kind, query in CONTEXT_QUERIES.items()}
+        snippets = []
+        for _, row in frames['plant'].iterrows():
+            snippets.append(self._snippet('plant', (
+                f"{row['PLANT_NAME']} ({row['PLANT_ID']}, {row['REGION']}, {row['COUNTRY']}): "
+                f"inventory {_money(row['INVENTORY_VALUE'])}, "
+                f"avg efficiency {_number(row['AVG_EFFICIENCY'], '{:.1f}%')}, "
+                f"units produced {_number(row['TOTAL_QUANTITY'])}, "
+                f"working capital {_money(row['WORKING_CAPITAL'])}, "
+                f"cost savings {_money(row['COST_SAVINGS'])}"
+            ), [row['PLANT_ID'], row['PLANT_NAME'], row['REGION'], row['COUNTRY']]))
+        for _, row in frames['category'].iterrows():
+            snippets.append(self._snippet('category', (
+                f"{row['CATEGORY']} at {row['PLANT_NAME'] or row['PLANT_ID']}: "
+                f"{_number(row['TOTAL_STOCK'])} units across {_number(row['ITEM_COUNT'])} items, "
+                f"value {_money(row['TOTAL_VALUE'])}, status {row['STOCK_STATUS']}"
+            ), [row['CATEGORY'], row['PLANT_ID'], row['PLANT_NAME']]))
+        for _, row in frames['supplier'].iterrows():
+            snippets.append(self._snippet('supplier', (
+                f"Supplier {row['SUPPLIER_NAME']} ({row['COUNTRY']}): "
+                f"performance {_number(row['PERFORMANCE_SCORE'], '{:.1f}')}, "
+                f"risk {_number(row['RISK_SCORE'], '{:.1f}')} ({row['RISK_CATEGORY']})"
+            ), [row['SUPPLIER_NAME'], row['COUNTRY']]))
+
+        self.overview = self._overview(frames)
+        self.snippets = snippets
+        self._vectors = (np.vstack([self.embed(s['text']) for s in snippets])
+                         if snippets else np.zeros((0, 1), dtype=np.float32))
+
+    def _snippet(self, kind, text, terms):
+        terms = {normalize_question(str(term)) for term in terms if isinstance(term, str) and term}
+        return {'kind': kind, 'text': text, 'terms': sorted(terms)}
+
+    def _overview(self, frames):
+        plants = frames['plant']
+        suppliers = frames['supplier']
+        if plants.empty:
+            return ''
+        efficiency = pd.to_numeric(plants['AVG_EFFICIENCY'])
+        best = plants.loc[efficiency.idxmax()] if efficiency.notna().any() else None
+        parts = [
+            f"{len(plants)} plants",
+            f"total inventory {_money(pd.to_numeric(plants['INVENTORY_VALUE']).sum())}",
+            f"total cost savings {_money(pd.to_numeric(plants['COST_SAVINGS']).sum())}",
+        ]
+        if best is not None:
+            parts.append(f"most efficient plant {best['PLANT_NAME']} ({float(best['AVG_EFFICIENCY']):.1f}%)")
+        if not suppliers.empty:
+            high_risk = int((suppliers['RISK_CATEGORY'] == 'HIGH_RISK').sum())
+            parts.append(f"{len(suppliers)} suppliers, {high_risk} high risk")
+        return "Overview: " + ', '.join(parts)
+
+    def scores(self, question):
+        """Relevance of every snippet: named entities, then topic words, then embedding similarity"""
+        text = normalize_question(question)
+        similarity = self._vectors @ self.embed(question) if self.snippets else np.zeros(0)
+        topics = {kind for kind, words in TOPIC_TERMS.items() if any(_mentions(text, w) for w in words)}
+        scores = []
+        for snippet, similar in zip(self.snippets, similarity):
+            score = float(similar) if similar >= MIN_SIMILARITY else 0.0
+            score += ENTITY_WEIGHT * sum(1 for term in snippet['terms'] if _mentions(text, term))
+            if snippet['kind'] in topics:
+                score += TOPIC_WEIGHT
+            scores.append(score)
+        return scores
+
+    def select(self, question, max_chars=None):
+        """Most relevant snippet lines that fit in max_chars as a bullet list, overview first"""
+        budget = max_chars or self.max_chars
+        lines = [self.overview] if self.overview and len(self.overview) <= budget else []
+        used = sum(len(line) + 3 for line in lines)
+        scores = self.scores(question)
+        for i in sorted(range(len(scores)), key=lambda i: -scores[i]):
+            if scores[i] <= 0:
+                break
+            text = self.snippets[i]['text']
+            if used + len(text) + 3 > budget:
+                continue
+            lines.append(text)
+            used += len(text) + 3
+        return lines
+
+    def context_for(self, question, data_version):
+        """Context block for a question against the given data version"""
+        self.refresh(data_version)
+        return '\n'.join(f"- {line}" for line in self.select(question))
@@ -0,0 +1,212 @@
+"""
+Executive dashboard data layer for the Manufacturing Intelligence Demo
+All dashboard figures come back from one statement as tagged rows, which are
+split into the KPI cards and the two chart frames on the Python side. The
+per-plant figures read the 05_aggregates.sql summary tables, or for a date
+range the PRODUCTION_ROLLUP periods covering it.
+"""
+import datetime
+import pandas as pd
+from query_registry import bind_params, register
+
+# Tagged-row layout: SECTION, PLANT_ID, VALUE_1..VALUE_4
+DASHBOARD_QUERY = register('dashboard', """
+WITH FINANCIAL AS (
+    SELECT
+        SUM(INVENTORY_VALUE) as TOTAL_INVENTORY,
+        SUM(WORKING_CAPITAL) as TOTAL_WORKING_CAPITAL,
+        SUM(COST_SAVINGS) as TOTAL_SAVINGS,
+        COUNT(DISTINCT PLANT_ID) as TOTAL_PLANTS
+    FROM FINANCIAL_KPIS
+),
+INVENTORY_BY_PLANT AS (
+    SELECT
+        PLANT_ID,
+        SUM(TOTAL_VALUE) as INVENTORY_VALUE
+    FROM INVENTORY_SUMMARY
+    GROUP BY PLANT_ID
+    HAVING SUM(ITEM_COUNT) > 0
+),
+EFFICIENCY_BY_PLANT AS (
+    SELECT
+        PLANT_ID,
+        EFFICIENCY_SUM / EFFICIENCY_COUNT as AVG_EFFICIENCY,
+        EFFICIENCY_COUNT
+    FROM PRODUCTION_SUMMARY
+    WHERE EFFICIENCY_COUNT > 0
+)
+SELECT 'FINANCIAL' as SECTION, NULL as PLANT_ID,
+       TOTAL_INVENTORY as VALUE_1, TOTAL_WORKING_CAPITAL as VALUE_2,
+       TOTAL_SAVINGS as VALUE_3, TOTAL_PLANTS as VALUE_4
+FROM FINANCIAL
+UNION ALL
+SELECT 'INVENTORY', PLANT_ID, INVENTORY_VALUE, NULL, NULL, NULL
+FROM INVENTORY_BY_PLANT
+UNION ALL
+SELECT 'PRODUCTION', PLANT_ID, AVG_EFFICIENCY, EFFICIENCY_COUNT, NULL, NULL
+FROM EFFICIENCY_BY_PLANT
+""")
+
+# Same layout over a date range: whole months come from MONTH rows, the partial
+# months at either end from DAY rows, so a year costs ~12 + 60 rows per plant
+DASHBOARD_RANGE_QUERY = register('dashboard_range', """
+WITH FINANCIAL AS (
+    SELECT
+        COALESCE(SUM(INVENTORY_VALUE), 0) as TOTAL_INVENTORY,
+        COALESCE(SUM(WORKING_CAPITAL), 0) as TOTAL_WORKING_CAPITAL,
+        COALESCE(SUM(COST_SAVINGS), 0) as TOTAL_SAVINGS,
+        COUNT(DISTINCT PLANT_ID) as TOTAL_PLANTS
+    FROM FINANCIAL_KPIS
+    WHERE KPI_DATE BETWEEN ? AND ?
+),
+INVENTORY_BY_PLANT AS (
+    SELECT
+        PLANT_ID,
+        SUM(TOTAL_VALUE) as INVENTORY_VALUE
+    FROM INVENTORY_SUMMARY
+    GROUP BY PLANT_ID
+    HAVING SUM(ITEM_COUNT) > 0
+),
+PRODUCTION_IN_RANGE AS (
+    SELECT
+        PLANT_ID,
+        SUM(EFFICIENCY_SUM) as EFFICIENCY_SUM,
+        SUM(EFFICIENCY_COUNT) as EFFICIENCY_COUNT
+    FROM PRODUCTION_ROLLUP
+    WHERE (GRAIN = 'DAY' AND (PERIOD_START BETWEEN ? AND ? OR PERIOD_START BETWEEN ? AND ?))
+       OR (GRAIN = 'MONTH' AND PERIOD_START BETWEEN ? AND ?)
+    GROUP BY PLANT_ID
+),
+EFFICIENCY_BY_PLANT AS (
+    SELECT
+        PLANT_ID,
+        EFFICIENCY_SUM / EFFICIENCY_COUNT as AVG_EFFICIENCY,
+        EFFICIENCY_COUNT
+    FROM PRODUCTION_IN_RANGE
+    WHERE EFFICIENCY_COUNT > 0
+)
+SELECT 'FINANCIAL' as SECTION, NULL as PLANT_ID,
+       TOTAL_INVENTORY as VALUE_1, TOTAL_WORKING_CAPITAL as VALUE_2,
+       TOTAL_SAVINGS as VALUE_3, TOTAL_PLANTS as VALUE_4
+FROM FINANCIAL
+UNION ALL
+SELECT 'INVENTORY', PLANT_ID, INVENTORY_VALUE, NULL, NULL, NULL
+FROM INVENTORY_BY_PLANT
+UNION ALL
+SELECT 'PRODUCTION', PLANT_ID, AVG_EFFICIENCY, EFFICIENCY_COUNT, NULL, NULL
+FROM EFFICIENCY_BY_PLANT
+""")
+
+# Quantity and efficiency per period across all plants, for the trend chart
+PRODUCTION_TREND_QUERY = register('production_trend', """
+SELECT
+    PERIOD_START,
+    SUM(TOTAL_QUANTITY) as TOTAL_QUANTITY,
+    SUM(EFFICIENCY_SUM) / NULLIF(SUM(EFFICIENCY_COUNT), 0) as AVG_EFFICIENCY
+FROM PRODUCTION_ROLLUP
+WHERE GRAIN = ? AND PERIOD_START BETWEEN ? AND ?
+GROUP BY PERIOD_START
+ORDER BY PERIOD_START
+""")
+
+# MIN/MAX of a clustered column are answered from partition metadata in Snowflake
+DATE_BOUNDS_QUERY = register(
+    'production_date_bounds',
+    "SELECT MIN(PRODUCTION_DATE) as FIRST_DATE, MAX(PRODUCTION_DATE) as LAST_DATE FROM PRODUCTION",
+)
+
+# Which VALUE_n columns each section uses, and what they are called
+DASHBOARD_SECTIONS = {
+    'financial': ('FINANCIAL', ['TOTAL_INVENTORY', 'TOTAL_WORKING_CAPITAL', 'TOTAL_SAVINGS', 'TOTAL_PLANTS']),
+    'inventory': ('INVENTORY', ['INVENTORY_VALUE']),
+    'production': ('PRODUCTION', ['AVG_EFFICIENCY', 'EFFICIENCY_COUNT']),
+}
+
+
+def split_dashboard_result(result):
+    """Split the tagged DASHBOARD_QUERY rows into one frame per panel"""
+    frames = {}
+    for name, (section, columns) in DASHBOARD_SECTIONS.items():
+        value_columns = [f"VALUE_{i + 1}" for i in range(len(columns))]
+        if result.empty:
+            frames[name] = pd.DataFrame(columns=columns)
+            continue
+
+        rows = result[result['SECTION'] == section]
+        frame = rows[value_columns].apply(pd.to_numeric)
+        frame.columns = columns
+        if name != 'financial':
+            frame.insert(0, 'PLANT_ID', rows['PLANT_ID'].values)
+            frame = frame.sort_values(columns[0], ascending=False)
+        frames[name] = frame.reset_index(drop=True)
+    return frames
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (day.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+
+
+def rollup_segments(start, end):
+    """(head days, whole months, tail days) tiling start..end; unused segments are (None, None)"""
+    first_month = start if start.day == 1 else next_month(start)
+    after_last_month = month_start(end) if next_month(end) - datetime.timedelta(days=1) != end else next_month(end)
+    if first_month >= after_last_month:
+        return (start, end), (None, None), (None, None)
+    one_day = datetime.timedelta(days=1)
+    head = (start, first_month - one_day) if start < first_month else (None, None)
+    tail = (after_last_month, end) if after_last_month <= end else (None, None)
+    months = (first_month, month_start(after_last_month - one_day))
+    return head, months, tail
+
+
+def trend_grain(start, end):
+    """Coarsest grain that still draws a useful line for the range"""
+    days = (end - start).days + 1
+    if days <= 62:
+        return 'DAY'
+    if days <= 366:
+        return 'WEEK'
+    return 'MONTH'
+
+
+def period_start(day, grain):
+    if grain == 'WEEK':
+        return day - datetime.timedelta(days=day.weekday())
+    if grain == 'MONTH':
+        return month_start(day)
+    return day
+
+
+def as_date(value):
+    return pd.Timestamp(value).date()
+
+
+def load_date_bounds(run_query):
+    """(first, last) production date, or None when there is no production data"""
+    bounds = run_query(DATE_BOUNDS_QUERY)
+    if bounds.empty or pd.isna(bounds.iloc[0]['FIRST_DATE']):
+        return None
+    return as_date(bounds.iloc[0]['FIRST_DATE']), as_date(bounds.iloc[0]['LAST_DATE'])
+
+
+def load_dashboard_data(run_query, date_range=None):
+    """Fetch every dashboard figure with a single warehouse call, optionally for a date range"""
+    if date_range is None:
+        return split_dashboard_result(run_query(DASHBOARD_QUERY))
+    start, end = date_range
+    head, months, tail = rollup_segments(start, end)
+    # FINANCIAL_KPIS rows are dated on the first of the month they cover
+    params = [month_start(start), end, *head, *tail, *months]
+    return split_dashboard_result(run_query(DASHBOARD_RANGE_QUERY, bind_params(params)))
+
+
+def load_production_trend(run_query, date_range):
+    """Production per period over the range (edge periods are counted whole)"""
+    start, end = date_range
+    grain = trend_grain(start, end)
+    trend = run_query(PRODUCTION_TREND_QUERY, bind_params([grain, period_start(start, grain), end]))
+    return grain, trend
@@ -0,0 +1,132 @@
+"""
+Data Explorer query layer for the Manufacturing Intelligence Demo
+Tables are read one page at a time with keyset pagination, and the summary
+metrics are SQL aggregates, so no tab ever materialises a whole table. Dated
+tables take an optional date range on their clustering column. Exports read
+the same filtered table as a stream of batches.
+"""
+from query_registry import bind_params, register
+
+PAGE_SIZES = [25, 50, 100, 250, 1000]
+
+# order_by must end in a unique column so every page boundary is unambiguous.
+# NULLs sort last in both directions, on every engine.
+EXPLORER_TABLES = {
+    'Inventory': {
+        'table': 'INVENTORY',
+        'subheader': 'Inventory Data',
+        'order_by': [('PLANT_ID', 'ASC'), ('CATEGORY', 'ASC'), ('ITEM_ID', 'ASC')],
+        'summary': "SUM(CURRENT_STOCK * UNIT_COST) as METRIC_VALUE",
+        'metric': ("Total Inventory Value", "${:,.2f}"),
+    },
+    'Production': {
+        'table': 'PRODUCTION',
+        'subheader': 'Production Data',
+        'order_by': [('PRODUCTION_DATE', 'DESC'), ('PRODUCTION_ID', 'ASC')],
+        'date_column': 'PRODUCTION_DATE',
+        'summary': "AVG(EFFICIENCY_PERCENT) as METRIC_VALUE",
+        'metric': ("Average Efficiency", "{:.1f}%"),
+    },
+    'Suppliers': {
+        'table': 'SUPPLIERS',
+        'subheader': 'Supplier Data',
+        'order_by': [('RISK_SCORE', 'DESC'), ('SUPPLIER_ID', 'ASC')],
+        'summary': "SUM(CASE WHEN RISK_SCORE >= 4 THEN 1 ELSE 0 END) as METRIC_VALUE",
+        'metric': ("High Risk Suppliers", "{:,.0f}"),
+    },
+    'Financial': {
+        'table': 'FINANCIAL_KPIS',
+        'subheader': 'Financial KPIs',
+        'order_by': [('KPI_DATE', 'DESC'), ('PLANT_ID', 'ASC')],
+        'date_column': 'KPI_DATE',
+        'summary': None,
+        'metric': None,
+    },
+}
+
+
+def order_clause(order_by):
+    return ', '.join(f"{column} {direction} NULLS LAST" for column, direction in order_by)
+
+
+def keyset_predicate(order_by, after):
+    """WHERE clause selecting rows that sort after the key tuple `after`, and its binds
+
+    NULLs sort last, so rows with a NULL key follow every value in its column,
+    and a NULL cursor value ties only with IS NULL and has nothing after it.
+    """
+    after = bind_params(after)
+    clauses, params, ties, tie_params = [], [], [], []
+    for (column, direction), value in zip(order_by, after):
+        if value is None:
+            ties.append(f"{column} IS NULL")
+            continue
+        op = '<' if direction == 'DESC' else '>'
+        after_value = f"({column} {op} ? OR {column} IS NULL)"
+        clauses.append(f"({' AND '.join(ties + [after_value])})" if ties else after_value)
+        params.extend(tie_params + [value])
+        ties.append(f"{column} = ?")
+        tie_params.append(value)
+    if not clauses:
+        return '1 = 0', None
+    return ' OR '.join(clauses), params
+
+
+def null_pattern(after):
+    """Statement name suffix for a cursor with NULL values (they change the predicate text)"""
+    nulls = ''.join('1' if value is None else '0' for value in bind_params(after))
+    return f"_nulls{nulls}" if '1' in nulls else ''
+
+
+def date_predicate(spec, date_range):
+    """BETWEEN filter on the table's date column (a pruning predicate), and its binds"""
+    if not date_range or not spec.get('date_column'):
+        return '', []
+    return f"{spec['date_column']} BETWEEN ? AND ?", bind_params(date_range)
+
+
+def page_query(spec, page_size, after=None, date_range=None):
+    """One page of a table, plus one extra row to tell if a next page exists
+
+    Returns (sql, params). The cursor values and date range are bound, so each
+    table has a handful of statements per page size.
+    """
+    order = order_clause(spec['order_by'])
+    date_where, params = date_predicate(spec, date_range)
+    clauses = [date_where] if date_where else []
+    if after:
+        keyset_where, keyset_params = keyset_predicate(spec['order_by'], after)
+        clauses.append(f"({keyset_where})" if date_where else keyset_where)
+        params = params + (keyset_params or [])
+    where = f"WHERE {' AND '.join(clauses)}\n" if clauses else ""
+    sql = f"SELECT * FROM {spec['table']}\n{where}ORDER BY {order}\nLIMIT {int(page_size) + 1}"
+    name = f"explorer_{spec['table'].lower()}_{'next' if after else 'first'}_{int(page_size)}"
+    if date_where:
+        name += "_range"
+    if after:
+        name += null_pattern(after)
+    return register(name, sql), params or None
+
+
+def table_query(spec, date_range=None):
+    """The whole table in explorer order, with the date range applied; returns (sql, params)"""
+    order = order_clause(spec['order_by'])
+    date_where, params = date_predicate(spec, date_range)
+    where = f"WHERE {date_where}\n" if date_where else ""
+    sql = f"SELECT * FROM {spec['table']}\n{where}ORDER BY {order}"
+    name = f"explorer_{spec['table'].lower()}_export" + ("_range" if date_where else "")
+    return register(name, sql), params or None
+
+
+def summary_query(spec, date_range=None):
+    """Row count and the tab's summary metric, aggregated in the warehouse; returns (sql, params)"""
+    metric = f", {spec['summary']}" if spec['summary'] else ""
+    date_where, params = date_predicate(spec, date_range)
+    sql = f"SELECT COUNT(*) as ROW_COUNT{metric} FROM {spec['table']}" + (f" WHERE {date_where}" if date_where else "")
+    name = f"explorer_{spec['table'].lower()}_summary" + ("_range" if date_where else "")
+    return register(name, sql), params or None
+
+
+def row_key(spec, row):
+    """Keyset cursor for the page that starts after this row"""
+    return tuple(row[column] for column, _ in spec['order_by'])
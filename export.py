@@ -0,0 +1,131 @@
+"""
+Streaming table export for the Manufacturing Intelligence Demo
+Explorer tables are read with backend.iter_batches and written batch by
+batch to a Parquet or CSV file on disk, so memory stays bounded by the
+batch size however many rows the table has.
+"""
+import os
+import tempfile
+import time
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+EXPORT_FORMATS = {
+    'Parquet': {'extension': 'parquet', 'mime': 'application/vnd.apache.parquet'},
+    'CSV': {'extension': 'csv', 'mime': 'text/csv'},
+}
+
+DEFAULT_EXPORT_DIR = os.path.join(tempfile.gettempdir(), 'manufacturing_exports')
+
+EXPORT_BATCH_ROWS = 50000
+
+# Rows held back while a column has only been NULL so far, before settling on strings for it
+SCHEMA_BUFFER_ROWS = 200000
+
+
+def conform(batch, schema):
+    """Cast a batch to the export schema (later batches can infer different types)"""
+    if batch.schema.equals(schema):
+        return batch
+    return pa.Table.from_batches([batch]).cast(schema).combine_chunks().to_batches()[0]
+
+
+def unify(schema, batch):
+    """schema with its null-typed columns typed from batch where batch has values"""
+    if schema is None:
+        return batch.schema
+    return pa.schema([batch.schema.field(field.name) if pa.types.is_null(field.type) else field for field in schema])
+
+
+def untyped(schema):
+    return any(pa.types.is_null(field.type) for field in schema)
+
+
+def write_batches(batches, path, fmt='Parquet', progress=None):
+    """Stream record batches into a Parquet or CSV file; returns rows written
+
+    progress(rows) is called after every batch written. A column that is all
+    NULL in the first batches (typed null) takes its type from the first batch
+    with values: batches are held back until then, for up to
+    SCHEMA_BUFFER_ROWS rows, after which it is written as strings. The file
+    is written under a temporary name and renamed when complete, so a failed
+    export never leaves a truncated file behind.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    writer = None
+    schema = None
+    pending = []
+    rows = 0
+
+    def open_writer(schema):
+        return pq.ParquetWriter(tmp, schema) if fmt == 'Parquet' else pacsv.CSVWriter(tmp, schema)
+
+    def write(batch):
+        nonlocal rows
+        writer.write_batch(conform(batch, schema))
+        rows += batch.num_rows
+        if progress is not None:
+            progress(rows)
+
+    try:
+        for batch in batches:
+            if writer is None:
+                schema = unify(schema, batch)
+                pending.append(batch)
+                if untyped(schema) and sum(held.num_rows for held in pending) < SCHEMA_BUFFER_ROWS:
+                    continue
+                schema = pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                                    for field in schema])
+                writer = open_writer(schema)
+                batches_to_write, pending = pending, []
+            else:
+                batches_to_write = [batch]
+            for held in batches_to_write:
+                write(held)
+        if pending:
+            # The result ended with columns that were NULL throughout - they stay typed null
+            writer = open_writer(schema)
+            for held in pending:
+                write(held)
+        if writer is None:
+            # Empty result - no schema to write, so an empty file
+            open(tmp, 'wb').close()
+        else:
+            writer.close()
+            writer = None
+        os.replace(tmp, path)
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return rows
+
+
+def export_path(table, fmt, directory=DEFAULT_EXPORT_DIR):
+    """Fresh file name for an export of table in the given format"""
+    os.makedirs(directory, exist_ok=True)
+    stamp = time.strftime('%Y%m%d_%H%M%S')
+    return os.path.join(directory, f"{table.lower()}_{stamp}_{os.urandom(3).hex()}.{EXPORT_FORMATS[fmt]['extension']}")
+
+
+def prune_exports(directory=DEFAULT_EXPORT_DIR, max_age=3600):
+    """Delete exports older than max_age seconds; returns how many were removed"""
+    if not os.path.isdir(directory):
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+            os.remove(path)
+            removed += 1
+    return removed
+
+
+def export_query(backend, query, path, fmt='Parquet', params=None, batch_size=EXPORT_BATCH_ROWS, progress=None):
+    """Run query and stream its result to path; returns rows written"""
+    return write_batches(backend.iter_batches(query, batch_size=batch_size, params=params), path, fmt, progress)
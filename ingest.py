@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+"""
+Bulk ingestion for the Manufacturing Intelligence Demo
+Plant telemetry - production counts and inventory stock levels - arrives as
+records from files or a local queue. IngestPipeline validates them against
+02_tables.sql, coalesces them into micro-batches and bulk-loads each one:
+write_pandas (staged Parquet + COPY INTO) in Snowflake, a DataFrame scan on
+the local engine. Loaded batch IDs are kept in INGEST_BATCHES (07_ingest.sql),
+committed together with the rows in Snowflake, so replaying a file or a
+queue is harmless.
+
+    python ingest.py PRODUCTION telemetry/*.parquet --batch-rows 50000
+"""
+import argparse
+import hashlib
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+import pandas as pd
+from aggregates import AggregateRefresher
+from backends import SQL_DIR
+from query_registry import register
+
+# Upserted tables and their key; everything else is append-only
+MERGE_KEYS = {'INVENTORY': 'ITEM_ID'}
+
+# Keys per IN (...) lookup; short lists are padded with NULLs so the text never changes
+KEY_CHUNK = 500
+
+DEFAULT_BATCH_ROWS = 50000
+
+BATCH_COLUMNS = ['BATCH_ID', 'TABLE_NAME', 'ROW_COUNT', 'LOADED_AT']
+
+_FLUSH = object()
+
+CREATE_TABLE = re.compile(
+    r'CREATE\s+(?:OR\s+REPLACE\s+)?TABLE\s+(\w+)\s*\((.*?)\)\s*(?:CLUSTER\s+BY\s*\([^)]*\)\s*)?;', re.S | re.I
+)
+
+
+def load_schema(path=os.path.join(SQL_DIR, '02_tables.sql')):
+    """{table: {column: type}} from the CREATE TABLE statements in 02_tables.sql"""
+    with open(path, 'r') as f:
+        script = f.read()
+    schema = {}
+    for table, body in CREATE_TABLE.findall(script):
+        schema[table.upper()] = {
+            column.upper(): column_type.upper()
+            for column, column_type in re.findall(r'^\s*(\w+)\s+(\w+)', body, re.M)
+        }
+    return schema
+
+
+TABLE_SCHEMAS = load_schema()
+
+BATCH_RECORD = register(
+    'ingest_batch_record',
+    f"INSERT INTO INGEST_BATCHES ({', '.join(BATCH_COLUMNS)}) VALUES (?, ?, ?, ?)",
+)
+
+BATCHES_LOADED_QUERY = register(
+    'ingest_batches_loaded',
+    f"SELECT BATCH_ID FROM INGEST_BATCHES WHERE BATCH_ID IN ({', '.join('?' * KEY_CHUNK)})",
+)
+
+
+def padded(keys):
+    """Chunks of KEY_CHUNK bind values, the last one padded with NULLs"""
+    keys = list(keys)
+    for start in range(0, len(keys), KEY_CHUNK):
+        chunk = keys[start:start + KEY_CHUNK]
+        yield chunk + [None] * (KEY_CHUNK - len(chunk))
+
+
+def batch_id_for(table, frame):
+    """Content-derived batch ID - the same records always get the same ID"""
+    digest = hashlib.sha1(table.encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=False).values.tobytes())
+    return f"{table}:{digest.hexdigest()}"
+
+
+def validate(table, frame):
+    """Coerce records to the table's schema; returns (valid, rejected with a REJECT_REASON)"""
+    schema = TABLE_SCHEMAS[table]
+    missing = [column for column in schema if column not in frame.columns]
+    if missing:
+        raise ValueError(f"{table} records are missing columns: {', '.join(missing)}")
+
+    frame = frame[list(schema)].reset_index(drop=True)
+    coerced = {}
+    reasons = pd.Series(None, index=frame.index, dtype=object)
+    for column, column_type in schema.items():
+        raw = frame[column]
+        if column_type == 'NUMBER':
+            value = pd.to_numeric(raw, errors='coerce')
+        elif column_type == 'DATE':
+            value = pd.to_datetime(raw, errors='coerce').dt.normalize()
+        else:
+            value = raw.where(raw.isna(), raw.astype(str))
+        reasons = reasons.mask(reasons.isna() & value.isna() & raw.notna(), f"{column}: not a valid {column_type}")
+        coerced[column] = value
+    frame = pd.DataFrame(coerced)
+
+    key = next(iter(schema))
+    reasons = reasons.mask(reasons.isna() & frame[key].isna(), f"{key}: required")
+    if table in MERGE_KEYS:
+        # Latest reading wins within a batch
+        reasons = reasons.mask(reasons.isna() & frame[key].duplicated(keep='last'), f"{key}: superseded in batch")
+    else:
+        reasons = reasons.mask(reasons.isna() & frame[key].duplicated(), f"{key}: duplicate in batch")
+
+    bad = reasons.notna()
+    return frame[~bad].reset_index(drop=True), frame[bad].assign(REJECT_REASON=reasons[bad]).reset_index(drop=True)
+
+
+def snowflake_frame(frame):
+    """write_pandas sends datetime64 as TIMESTAMP_NTZ; DATE columns need date objects"""
+    frame = frame.copy()
+    for column in frame.columns:
+        if pd.api.types.is_datetime64_any_dtype(frame[column]):
+            frame[column] = frame[column].dt.date
+    return frame
+
+
+def write_pandas_frame(conn, table, frame):
+    """One staged bulk load (PUT + COPY INTO) through the connector; returns rows written"""
+    from snowflake.connector.pandas_tools import write_pandas
+
+    success, _, rows, _ = write_pandas(conn, snowflake_frame(frame), table)
+    if not success:
+        raise RuntimeError(f"write_pandas failed for {table}")
+    return rows
+
+
+class Loader:
+    """Writes validated micro-batches and records their batch IDs"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def loaded(self, batch_ids):
+        """The subset of batch_ids already in INGEST_BATCHES"""
+        found = set()
+        for chunk in padded(batch_ids):
+            columns, rows = self.backend.fetch(BATCHES_LOADED_QUERY, chunk)
+            found.update(row[0] for row in rows)
+        return found
+
+    def load(self, table, frame, batch_counts):
+        key = MERGE_KEYS.get(table)
+        if key:
+            self.merge(table, key, frame)
+        else:
+            self.append(table, frame)
+        loaded_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.write('INGEST_BATCHES', pd.DataFrame(
+            [(batch_id, table, rows, loaded_at) for batch_id, rows in batch_counts.items()], columns=BATCH_COLUMNS
+        ))
+
+    def append(self, table, frame):
+        self.write(table, frame)
+
+
+class LocalLoader(Loader):
+    """DataFrame bulk inserts, folded into the summary tables as they land
+
+    The base-table write, the summary upserts and the batch record commit
+    together, so a failed load leaves none of them behind.
+    """
+
+    def __init__(self, backend):
+        super().__init__(backend)
+        self.refresher = AggregateRefresher(backend) if backend.has_table('PRODUCTION_SUMMARY') else None
+
+    def load(self, table, frame, batch_counts):
+        with self.backend.atomic():
+            super().load(table, frame, batch_counts)
+
+    def write(self, table, frame):
+        self.backend.insert_rows(table, frame)
+
+    def append(self, table, frame):
+        self.write(table, frame)
+        if self.refresher is not None:
+            self.refresher.apply_changes(table, inserted=frame)
+
+    def merge(self, table, key, frame):
+        existing_query = register(
+            f"ingest_{table.lower()}_existing",
+            f"SELECT * FROM {table} WHERE {key} IN ({', '.join('?' * KEY_CHUNK)})",
+        )
+        delete = register(
+            f"ingest_{table.lower()}_delete", f"DELETE FROM {table} WHERE {key} IN ({', '.join('?' * KEY_CHUNK)})"
+        )
+        chunks = list(padded(frame[key]))
+        existing = [self.backend.query(existing_query, chunk) for chunk in chunks]
+        for chunk in chunks:
+            self.backend.execute(delete, chunk)
+        self.write(table, frame)
+        if self.refresher is not None:
+            self.refresher.apply_changes(table, inserted=frame, deleted=pd.concat(existing, ignore_index=True))
+
+
+class WarehouseLoader(Loader):
+    """write_pandas into Snowflake through a staging table per base table
+
+    write_pandas commits on its own (it creates a stage), so each micro-batch
+    is first written to <TABLE>_INGEST under a LOAD_ID. Moving it into the
+    base table - an INSERT ... SELECT, or a MERGE for upserts - recording its
+    batch IDs in INGEST_BATCHES and clearing the staging rows then happen in
+    one transaction. A crash before the commit leaves only staging rows,
+    which the retried load clears, so a batch is never loaded twice.
+    """
+
+    def __init__(self, backend):
+        super().__init__(backend)
+        self._staged = set()
+
+    def write(self, table, frame):
+        if self.backend.name == 'snowpark':
+            self.backend.session.write_pandas(snowflake_frame(frame), table, auto_create_table=False)
+            return
+        with self.backend.pool.connection() as conn:
+            write_pandas_frame(conn, table, frame)
+
+    def ensure_staging(self, table, columns):
+        if table not in self._staged:
+            self.backend.fetch(register(f"ingest_{table.lower()}_staging", f"""
+            CREATE TRANSIENT TABLE IF NOT EXISTS {table}_INGEST AS
+            SELECT CAST(NULL AS STRING) AS LOAD_ID, {', '.join(columns)} FROM {table} WHERE 1 = 0
+            """))
+            self._staged.add(table)
+
+    def load(self, table, frame, batch_counts):
+        columns = list(TABLE_SCHEMAS[table])
+        key = MERGE_KEYS.get(table)
+        staged = f"SELECT * FROM {table}_INGEST WHERE LOAD_ID = ?"
+        if key:
+            move = register(f"ingest_{table.lower()}_merge", f"""
+            MERGE INTO {table} t
+            USING ({staged}) s
+            ON t.{key} = s.{key}
+            WHEN MATCHED THEN UPDATE SET {', '.join(f't.{c} = s.{c}' for c in columns if c != key)}
+            WHEN NOT MATCHED THEN INSERT ({', '.join(columns)}) VALUES ({', '.join(f's.{c}' for c in columns)})
+            """)
+        else:
+            move = register(f"ingest_{table.lower()}_insert", f"""
+            INSERT INTO {table} ({', '.join(columns)})
+            SELECT {', '.join(columns)} FROM {table}_INGEST WHERE LOAD_ID = ?
+            """)
+        cleanup = register(f"ingest_{table.lower()}_cleanup", f"DELETE FROM {table}_INGEST WHERE LOAD_ID = ?")
+
+        load_id = batch_id_for(table, frame)
+        self.ensure_staging(table, columns)
+        # Rows left by an attempt that failed before its commit
+        self.backend.transaction([(cleanup, [load_id])])
+        self.write(f"{table}_INGEST", frame.assign(LOAD_ID=load_id)[['LOAD_ID'] + columns])
+        loaded_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        # Table streams on the base tables keep the Snowflake summaries current
+        self.backend.transaction(
+            [(move, [load_id])]
+            + [(BATCH_RECORD, [batch_id, table, rows, loaded_at]) for batch_id, rows in batch_counts.items()]
+            + [(cleanup, [load_id])]
+        )
+
+
+def loader_for(backend):
+    return LocalLoader(backend) if backend.name == 'local' else WarehouseLoader(backend)
+
+
+class IngestMetrics:
+    """Thread-safe counters for the pipeline"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.records_received = 0
+        self.rows_loaded = 0
+        self.rows_rejected = 0
+        self.batches_loaded = 0
+        self.batches_skipped = 0
+        self.loads = 0
+        self.load_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.errors = 0
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self):
+        with self._lock:
+            elapsed = time.perf_counter() - self.started
+            return {
+                'records_received': self.records_received,
+                'rows_loaded': self.rows_loaded,
+                'rows_rejected': self.rows_rejected,
+                'batches_loaded': self.batches_loaded,
+                'batches_skipped': self.batches_skipped,
+                'loads': self.loads,
+                'errors': self.errors,
+                'rows_per_second': round(self.rows_loaded / elapsed, 1) if elapsed else 0.0,
+                'load_rows_per_second': round(self.rows_loaded / self.load_seconds, 1) if self.load_seconds else 0.0,
+                'avg_load_ms': round(1000 * self.load_seconds / self.loads, 1) if self.loads else 0.0,
+                'blocked_seconds': round(self.blocked_seconds, 3),
+            }
+
+
+class IngestPipeline:
+    """Bounded queue of record batches drained by one loader thread
+
+    submit() blocks once max_pending batches are waiting, so producers slow
+    down to the rate the warehouse absorbs. Pending batches for a table are
+    loaded together once they reach batch_rows or have waited flush_interval
+    seconds.
+    """
+
+    def __init__(self, backend, batch_rows=DEFAULT_BATCH_ROWS, max_pending=64, flush_interval=1.0, loader=None):
+        self.loader = loader or loader_for(backend)
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval
+        self.metrics = IngestMetrics()
+        self.rejected = []
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._pending = {}
+        self._first_pending = {}
+        self._thread = None
+        self._stopping = False
+        self.error = None
+
+    def start(self):
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='ingest-loader', daemon=True)
+            self._thread.start()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def submit(self, table, records, batch_id=None, timeout=None):
+        """Queue records (a DataFrame or list of dicts) for table; returns the batch ID
+
+        Raises queue.Full if timeout passes while the pipeline is saturated.
+        """
+        table = table.upper()
+        if table not in TABLE_SCHEMAS:
+            raise ValueError(f"Unknown table: {table}")
+        if self.error is not None:
+            raise RuntimeError("ingest loader stopped") from self.error
+        frame = records if isinstance(records, pd.DataFrame) else pd.DataFrame(records)
+        batch_id = batch_id or batch_id_for(table, frame)
+        started = time.perf_counter()
+        self._queue.put((table, frame, batch_id), timeout=timeout)
+        self.metrics.add(records_received=len(frame), blocked_seconds=time.perf_counter() - started)
+        return batch_id
+
+    def drain(self):
+        """Block until everything submitted so far is loaded"""
+        self._queue.put(_FLUSH)
+        self._queue.join()
+        if self.error is not None:
+            raise RuntimeError("ingest loader stopped") from self.error
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self.drain()
+        self._stopping = True
+        self._queue.put(_FLUSH)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stopping:
+            try:
+                item = self._queue.get(timeout=self.flush_interval / 4)
+            except queue.Empty:
+                item = None
+            try:
+                if item is _FLUSH:
+                    for table in list(self._pending):
+                        self._flush(table)
+                    self._queue.task_done()
+                    continue
+                if item is not None:
+                    table = item[0]
+                    self._pending.setdefault(table, []).append(item)
+                    self._first_pending.setdefault(table, time.perf_counter())
+                for table, items in list(self._pending.items()):
+                    rows = sum(len(frame) for _, frame, _ in items)
+                    if rows >= self.batch_rows or time.perf_counter() - self._first_pending[table] >= self.flush_interval:
+                        self._flush(table)
+            except Exception as e:  # keep the queue moving so drain() can report it
+                self.error = e
+                self.metrics.add(errors=1)
+                for table in list(self._pending):
+                    self._release(table)
+                if item is _FLUSH:
+                    self._queue.task_done()
+
+    def _release(self, table):
+        items = self._pending.pop(table, [])
+        self._first_pending.pop(table, None)
+        for _ in items:
+            self._queue.task_done()
+        return items
+
+    def _flush(self, table):
+        items = self._release(table)
+        already = self.loader.loaded({batch_id for _, _, batch_id in items})
+        fresh, frames, counts = set(), [], {}
+        for _, frame, batch_id in items:
+            if batch_id in already or batch_id in fresh:
+                self.metrics.add(batches_skipped=1)
+                continue
+            fresh.add(batch_id)
+            frames.append(frame)
+            counts[batch_id] = len(frame)
+        if not frames:
+            return
+
+        valid, rejected = validate(table, pd.concat(frames, ignore_index=True))
+        if not rejected.empty:
+            self.rejected.append(rejected.assign(TABLE_NAME=table))
+        started = time.perf_counter()
+        if not valid.empty:
+            self.loader.load(table, valid, counts)
+        self.metrics.add(rows_loaded=len(valid), rows_rejected=len(rejected), batches_loaded=len(counts),
+                         loads=1, load_seconds=time.perf_counter() - started)
+
+
+def file_batches(path, chunk_rows=DEFAULT_BATCH_ROWS):
+    """DataFrames of up to chunk_rows records from a Parquet or CSV file"""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+
+
+def ingest_files(pipeline, table, paths, chunk_rows=DEFAULT_BATCH_ROWS):
+    """Feed files through the pipeline; batch IDs follow content, so re-running is a no-op"""
+    for path in paths:
+        for frame in file_batches(path, chunk_rows):
+            pipeline.submit(table, frame)
+    pipeline.drain()
+    return pipeline.metrics.snapshot()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('table', choices=sorted(TABLE_SCHEMAS))
+    parser.add_argument('paths', nargs='+', help="Parquet or CSV files")
+    parser.add_argument('--batch-rows', type=int, default=DEFAULT_BATCH_ROWS)
+    parser.add_argument('--max-pending', type=int, default=64)
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from backends import backend_from_env
+    load_dotenv()
+    if os.getenv('QUERY_BACKEND', 'snowflake').lower() == 'local':
+        backend = backend_from_env()
+    else:
+        # A pool of its own - app_core's cached pool only exists inside a Streamlit run
+        from app_core import get_snowflake_connection
+        from connection_pool import ConnectionPool
+        pool = ConnectionPool(get_snowflake_connection, size=int(os.getenv('SNOWFLAKE_POOL_SIZE', '4')),
+                              timeout=int(os.getenv('SNOWFLAKE_POOL_TIMEOUT', '30')))
+        backend = backend_from_env(pool)
+
+    with IngestPipeline(backend, batch_rows=args.batch_rows, max_pending=args.max_pending) as pipeline:
+        metrics = ingest_files(pipeline, args.table, args.paths, chunk_rows=args.batch_rows)
+    for name, value in metrics.items():
+        print(f"{name}: {value:,}" if isinstance(value, int) else f"{name}: {value}")
+    if pipeline.rejected:
+        print(pd.concat(pipeline.rejected)['REJECT_REASON'].value_counts().to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Bulk AI insight generation for the Manufacturing Intelligence Demo
+Every INVENTORY_INSIGHTS and SUPPLIER_RISK row gets a short Cortex commentary,
+stored in AI_INSIGHTS (06_insights.sql) with the data version it describes.
+In Snowflake each insight type is one set-based INSERT ... SELECT COMPLETE;
+the local engine has no Cortex, so rows go through a bounded worker pool.
+"""
+import re
+from datetime import datetime
+import pandas as pd
+from query_fanout import run_queries_concurrently
+from query_registry import register
+
+# Prompt templates use {COLUMN} placeholders from the source view
+INSIGHT_SPECS = {
+    'INVENTORY': {
+        'title': "📦 Inventory & Reorder",
+        'source': 'INVENTORY_INSIGHTS',
+        'key': ['PLANT_ID', 'CATEGORY'],
+        'subject': "{CATEGORY} at {PLANT_ID}",
+        'prompt': ("In one or two sentences, give a reorder recommendation for {CATEGORY} inventory "
+                   "at plant {PLANT_ID}: {TOTAL_STOCK} units across {ITEM_COUNT} items, "
+                   "value ${TOTAL_VALUE}, stock status {STOCK_STATUS}."),
+    },
+    'SUPPLIER': {
+        'title': "⚠️ Supply Chain Risk",
+        'source': 'SUPPLIER_RISK',
+        'key': ['SUPPLIER_NAME'],
+        'subject': "{SUPPLIER_NAME}",
+        'prompt': ("In one or two sentences, explain the supply risk of supplier {SUPPLIER_NAME} "
+                   "({COUNTRY}): performance score {PERFORMANCE_SCORE}, risk score {RISK_SCORE}, "
+                   "classified {RISK_CATEGORY}."),
+    },
+}
+
+INSIGHTS_QUERY = register('insights', """
+SELECT INSIGHT_TYPE, SUBJECT_KEY, SUBJECT, INSIGHT, MODEL, DATA_VERSION, GENERATED_AT
+FROM AI_INSIGHTS
+ORDER BY INSIGHT_TYPE, SUBJECT_KEY
+""")
+
+INSIGHTS_CURRENT_QUERY = register(
+    'insights_current', "SELECT COUNT(*) FROM AI_INSIGHTS WHERE INSIGHT_TYPE = ? AND DATA_VERSION = ?"
+)
+
+INSIGHTS_DELETE = register('insights_delete', "DELETE FROM AI_INSIGHTS WHERE INSIGHT_TYPE = ?")
+
+PLACEHOLDER = re.compile(r'\{(\w+)\}')
+
+
+def sql_string(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def template_sql(template):
+    """SQL expression concatenating a {COLUMN} template, e.g. 'plant ' || PLANT_ID"""
+    parts = []
+    position = 0
+    for match in PLACEHOLDER.finditer(template):
+        if match.start() > position:
+            parts.append(sql_string(template[position:match.start()]))
+        parts.append(f"COALESCE(TO_VARCHAR({match.group(1)}), 'n/a')")
+        position = match.end()
+    if position < len(template):
+        parts.append(sql_string(template[position:]))
+    return ' || '.join(parts)
+
+
+def format_row(template, row):
+    """Fill a {COLUMN} template from a result row, matching the SQL rendering"""
+    def value(match):
+        item = row[match.group(1)]
+        if pd.isna(item):
+            return 'n/a'
+        if isinstance(item, float) and item.is_integer():
+            return str(int(item))
+        return str(item)
+    return PLACEHOLDER.sub(value, template)
+
+
+def bulk_insight_sql(insight_type, model, data_version, limit=None):
+    """INSERT ... SELECT running COMPLETE over every source row in one statement
+
+    Returns (sql, params) - the model and data version are bind variables.
+    """
+    spec = INSIGHT_SPECS[insight_type]
+    key = " || '/' || ".join(spec['key'])
+    sql = f"""
+    INSERT INTO AI_INSIGHTS (INSIGHT_TYPE, SUBJECT_KEY, SUBJECT, INSIGHT, MODEL, DATA_VERSION, GENERATED_AT)
+    SELECT
+        ?,
+        {key},
+        {template_sql(spec['subject'])},
+        SNOWFLAKE.CORTEX.COMPLETE(?, {template_sql(spec['prompt'])}),
+        ?,
+        ?,
+        CURRENT_TIMESTAMP()
+    FROM {spec['source']}
+    {f'LIMIT {int(limit)}' if limit else ''}
+    """
+    name = f"insights_bulk_{insight_type.lower()}" + (f"_{int(limit)}" if limit else "")
+    return register(name, sql), [insight_type, model, model, data_version]
+
+
+def load_insights(run_query):
+    """Stored insights, one frame row per subject"""
+    return run_query(INSIGHTS_QUERY)
+
+
+class InsightJob:
+    """Regenerates AI_INSIGHTS for a data version"""
+
+    def __init__(self, backend, llm, max_workers=8, limit=None):
+        self.backend = backend
+        self.llm = llm
+        self.max_workers = max_workers
+        self.limit = limit
+
+    def is_current(self, insight_type, data_version):
+        columns, rows = self.backend.fetch(INSIGHTS_CURRENT_QUERY, [insight_type, data_version])
+        return rows[0][0] > 0
+
+    def run(self, data_version, force=False):
+        """Generate every insight type not already at data_version; returns rows written"""
+        written = {}
+        for insight_type in INSIGHT_SPECS:
+            if not force and self.is_current(insight_type, data_version):
+                continue
+            if self.backend.name == 'local':
+                written[insight_type] = self._run_concurrent(insight_type, data_version)
+            else:
+                written[insight_type] = self._run_set_based(insight_type, data_version)
+        return written
+
+    def _run_set_based(self, insight_type, data_version):
+        # One transaction: readers see the old insights until the new ones commit,
+        # and a failed or timed-out COMPLETE leaves them in place
+        results = self.backend.transaction([
+            (INSIGHTS_DELETE, [insight_type]),
+            bulk_insight_sql(insight_type, self.llm.model, data_version, self.limit),
+        ])
+        columns, rows = results[-1]
+        return int(rows[0][0]) if rows else 0
+
+    def _run_concurrent(self, insight_type, data_version):
+        spec = INSIGHT_SPECS[insight_type]
+        source = self.backend.query(
+            f"SELECT * FROM {spec['source']}" + (f" LIMIT {int(self.limit)}" if self.limit else "")
+        )
+        rows = {'/'.join(str(row[column]) for column in spec['key']): row for _, row in source.iterrows()}
+        prompts = {key: format_row(spec['prompt'], row) for key, row in rows.items()}
+        answers = dict(run_queries_concurrently(self.llm.complete, prompts, max_workers=self.max_workers)) if prompts else {}
+
+        generated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        insights = pd.DataFrame([{
+            'INSIGHT_TYPE': insight_type,
+            'SUBJECT_KEY': key,
+            'SUBJECT': format_row(spec['subject'], row),
+            'INSIGHT': answers.get(key),
+            'MODEL': self.llm.model,
+            'DATA_VERSION': data_version,
+            'GENERATED_AT': generated_at,
+        } for key, row in rows.items()], columns=[
+            'INSIGHT_TYPE', 'SUBJECT_KEY', 'SUBJECT', 'INSIGHT', 'MODEL', 'DATA_VERSION', 'GENERATED_AT'
+        ])
+        # One transaction, as on the set-based path
+        with self.backend.atomic():
+            self.backend.execute(INSIGHTS_DELETE, [insight_type])
+            if not insights.empty:
+                self.backend.insert_rows('AI_INSIGHTS', insights)
+        return len(insights)
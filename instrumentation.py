@@ -0,0 +1,206 @@
+"""
+Query and LLM instrumentation for the Manufacturing Intelligence Demo
+Every warehouse query and model call is timed and recorded with its rows,
+bytes, cache outcome and Snowflake query ID. Events go to the
+'manufacturing.perf' logger as one JSON object per line, feed Prometheus
+counters and histograms (text exposition format, optionally written for the
+node_exporter textfile collector) and stay in a bounded buffer that the
+sidebar Performance panel reads.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import pandas as pd
+
+try:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+except ImportError:  # outside Streamlit, or a layout without it - events have no session
+    get_script_run_ctx = None
+
+logger = logging.getLogger('manufacturing.perf')
+
+# Histogram buckets, in seconds as Prometheus expects
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+METRIC_PREFIX = 'manufacturing'
+
+
+def current_session():
+    """Streamlit session ID of the running script, if any"""
+    ctx = get_script_run_ctx(suppress_warning=True) if get_script_run_ctx else None
+    return ctx.session_id if ctx is not None else None
+
+
+def result_size(result):
+    """(rows, bytes) of a DataFrame, Arrow table or (columns, rows) result"""
+    if isinstance(result, pd.DataFrame):
+        return len(result), int(result.memory_usage(index=False, deep=True).sum())
+    if hasattr(result, 'num_rows') and hasattr(result, 'nbytes'):  # Arrow, without importing pyarrow
+        return result.num_rows, result.nbytes
+    if isinstance(result, tuple) and len(result) == 2:
+        return len(result[1]), None
+    return None, None
+
+
+def label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Instrumentation:
+    """Thread-safe event recorder shared by every session"""
+
+    def __init__(self, max_events=2000, metrics_path=None, metrics_interval=15):
+        self.events = deque(maxlen=max_events)
+        self.metrics_path = metrics_path
+        self.metrics_interval = metrics_interval
+        self._series = {}
+        self._cache = {}
+        self._written_at = 0.0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def timed(self, kind, name, **fields):
+        """Time the block; the caller fills rows/bytes/cache/query_id on the yielded event"""
+        event = {'kind': kind, 'name': name, 'session': current_session(), **fields}
+        started = time.perf_counter()
+        try:
+            yield event
+        except Exception as e:
+            event['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            event['latency_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            self.record(event)
+
+    def record(self, event):
+        event.setdefault('ts', time.time())
+        seconds = event.get('latency_ms', 0) / 1000
+        with self._lock:
+            self.events.append(event)
+            series = self._series.setdefault((event['kind'], event['name']), {
+                'count': 0, 'sum': 0.0, 'rows': 0, 'bytes': 0, 'errors': 0,
+                'buckets': [0] * len(LATENCY_BUCKETS),
+            })
+            series['count'] += 1
+            series['sum'] += seconds
+            series['rows'] += event.get('rows') or 0
+            series['bytes'] += event.get('bytes') or 0
+            series['errors'] += 1 if event.get('error') else 0
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    series['buckets'][i] += 1
+            if event.get('cache'):
+                key = (event['kind'], event['cache'])
+                self._cache[key] = self._cache.get(key, 0) + 1
+            write_metrics = self.metrics_path and time.monotonic() - self._written_at >= self.metrics_interval
+            if write_metrics:
+                self._written_at = time.monotonic()
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(event, default=str))
+        if write_metrics:
+            self.write_metrics()
+
+    def session_events(self, session=None):
+        with self._lock:
+            return [event for event in self.events if session is None or event.get('session') == session]
+
+    def slowest(self, n=10, session=None):
+        """Slowest recorded events, optionally for one session"""
+        return sorted(self.session_events(session), key=lambda event: event['latency_ms'], reverse=True)[:n]
+
+    def cache_stats(self, kind=None):
+        """{outcome: count} for one event kind (or all)"""
+        with self._lock:
+            stats = {}
+            for (event_kind, outcome), count in self._cache.items():
+                if kind is None or event_kind == kind:
+                    stats[outcome] = stats.get(outcome, 0) + count
+            return stats
+
+    def prometheus(self):
+        """All series in the Prometheus text exposition format"""
+        p = METRIC_PREFIX
+        lines = [
+            f"# HELP {p}_call_duration_seconds Query and LLM call latency",
+            f"# TYPE {p}_call_duration_seconds histogram",
+        ]
+        with self._lock:
+            series = sorted(self._series.items())
+            cache = sorted(self._cache.items())
+        for (kind, name), s in series:
+            labels = f'kind="{label_value(kind)}",name="{label_value(name)}"'
+            for bound, count in zip(LATENCY_BUCKETS, s['buckets']):
+                lines.append(f'{p}_call_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{p}_call_duration_seconds_bucket{{{labels},le="+Inf"}} {s["count"]}')
+            lines.append(f'{p}_call_duration_seconds_sum{{{labels}}} {s["sum"]:.6f}')
+            lines.append(f'{p}_call_duration_seconds_count{{{labels}}} {s["count"]}')
+        for metric, field, help_text in [('rows_total', 'rows', 'Rows returned'),
+                                         ('bytes_total', 'bytes', 'Result bytes returned'),
+                                         ('errors_total', 'errors', 'Failed calls')]:
+            lines += [f"# HELP {p}_{metric} {help_text}", f"# TYPE {p}_{metric} counter"]
+            for (kind, name), s in series:
+                lines.append(f'{p}_{metric}{{kind="{label_value(kind)}",name="{label_value(name)}"}} {s[field]}')
+        lines += [f"# HELP {p}_cache_requests_total Cache lookups by outcome",
+                  f"# TYPE {p}_cache_requests_total counter"]
+        for (kind, outcome), count in cache:
+            lines.append(f'{p}_cache_requests_total{{kind="{label_value(kind)}",result="{label_value(outcome)}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_metrics(self, path=None):
+        """Write prometheus() atomically, e.g. for the node_exporter textfile collector"""
+        path = path or self.metrics_path
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+
+class InstrumentedLLM:
+    """Wraps a model so complete() and stream() are recorded as 'llm' events"""
+
+    def __init__(self, llm, instrumentation):
+        self.llm = llm
+        self.instrumentation = instrumentation
+
+    @property
+    def model(self):
+        return self.llm.model
+
+    def complete(self, prompt):
+        with self.instrumentation.timed('llm', self.model, prompt_chars=len(prompt)) as event:
+            response = self.llm.complete(prompt)
+            event['response_chars'] = len(response or '')
+            return response
+
+    def stream(self, prompt):
+        with self.instrumentation.timed('llm', self.model, prompt_chars=len(prompt), streamed=True) as event:
+            started = time.perf_counter()
+            chars = 0
+            for chunk in self.llm.stream(prompt):
+                if not chars:
+                    event['first_token_ms'] = round((time.perf_counter() - started) * 1000, 2)
+                chars += len(chunk)
+                yield chunk
+            event['response_chars'] = chars
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+
+def instrumentation_from_env():
+    """PERF_LOG_PATH adds a JSON-lines log file, PERF_METRICS_PATH a Prometheus textfile"""
+    log_path = os.getenv('PERF_LOG_PATH')
+    if log_path and not any(getattr(h, 'baseFilename', None) == os.path.abspath(log_path) for h in logger.handlers):
+        handler = logging.FileHandler(log_path)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+    return Instrumentation(
+        max_events=int(os.getenv('PERF_MAX_EVENTS', '2000')),
+        metrics_path=os.getenv('PERF_METRICS_PATH') or None,
+        metrics_interval=int(os.getenv('PERF_METRICS_INTERVAL', '15'))
+    )
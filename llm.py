@@ -0,0 +1,130 @@
+"""
+LLM clients for the Manufacturing Intelligence Demo
+CortexLLM runs SNOWFLAKE.CORTEX.COMPLETE through the query backend; StubLLM
+answers locally so the AI paths work offline and in tests. Both expose
+complete() for a whole answer and stream() for a generator of text chunks.
+"""
+import json
+import os
+import time
+from query_registry import register
+
+CORTEX_MODEL = 'mixtral-8x7b'
+
+ANALYST_PROMPT = """You are a manufacturing analyst. Answer the question using the data below. If the data does not cover it, say so.
+
+Data:
+{context}
+
+Question: {question}"""
+
+CORTEX_REST_PATH = "/api/v2/cortex/inference:complete"
+
+# Model and prompt are bind variables - one statement for every question
+CORTEX_COMPLETE_QUERY = register('cortex_complete', "SELECT SNOWFLAKE.CORTEX.COMPLETE(?, ?) as RESPONSE")
+
+
+class CortexLLM:
+    """Snowflake Cortex COMPLETE - SQL for whole answers, a stream_fn for tokens"""
+
+    def __init__(self, run_query, model=CORTEX_MODEL, stream_fn=None):
+        self.run_query = run_query
+        self.model = model
+        self.stream_fn = stream_fn
+
+    def complete(self, prompt):
+        """Return the model's answer, or None if Cortex returned nothing"""
+        result = self.run_query(CORTEX_COMPLETE_QUERY, [self.model, prompt])
+        if result.empty:
+            return None
+        return result.iloc[0]['RESPONSE']
+
+    def stream(self, prompt):
+        """Yield the answer in chunks as Cortex generates it"""
+        if self.stream_fn is not None:
+            started = False
+            try:
+                for chunk in self.stream_fn(self.model, prompt):
+                    started = True
+                    yield chunk
+                return
+            except Exception:
+                # Streaming endpoint unavailable - fall back to the SQL path
+                if started:
+                    raise
+        answer = self.complete(prompt)
+        if answer is not None:
+            yield answer
+
+
+class StubLLM:
+    """Deterministic local model - echoes the question word by word"""
+
+    def __init__(self, model='stub', delay=0.0, token_delay=0.0):
+        self.model = model
+        self.delay = delay
+        self.token_delay = token_delay
+        self.calls = 0
+
+    def complete(self, prompt):
+        return ''.join(self.stream(prompt))
+
+    def stream(self, prompt):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        answer = f"Stub answer ({self.model}): {prompt.splitlines()[-1].strip()}"
+        for i, word in enumerate(answer.split(' ')):
+            if i and self.token_delay:
+                time.sleep(self.token_delay)
+            yield word if i == 0 else ' ' + word
+
+
+def cortex_rest_stream(auth):
+    """stream_fn for the Cortex REST endpoint; auth() returns (host, session token)"""
+    def stream(model, prompt):
+        import requests
+        host, token = auth()
+        response = requests.post(
+            f"https://{host}{CORTEX_REST_PATH}",
+            headers={
+                'Authorization': f'Snowflake Token="{token}"',
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream',
+            },
+            json={'model': model, 'messages': [{'content': prompt}], 'stream': True},
+            stream=True,
+            timeout=60
+        )
+        response.raise_for_status()
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith('data:'):
+                continue
+            event = json.loads(line[len('data:'):].strip())
+            for choice in event.get('choices', []):
+                delta = choice.get('delta', {})
+                text = delta.get('content') or delta.get('text')
+                if text:
+                    yield text
+    return stream
+
+
+def snowpark_stream(session):
+    """stream_fn for Streamlit in Snowflake via snowflake.cortex.Complete"""
+    def stream(model, prompt):
+        from snowflake.cortex import Complete  # snowflake-ml-python, optional
+        yield from Complete(model, prompt, session=session, stream=True)
+    return stream
+
+
+def llm_from_env(run_query, stream_fn=None):
+    """LLM_BACKEND selects cortex or stub; the local query backend defaults to stub"""
+    default = 'stub' if os.getenv('QUERY_BACKEND', 'snowflake').lower() == 'local' else 'cortex'
+    if os.getenv('LLM_BACKEND', default).lower() == 'stub':
+        return StubLLM(
+            delay=float(os.getenv('STUB_LLM_DELAY', '0')),
+            token_delay=float(os.getenv('STUB_LLM_TOKEN_DELAY', '0'))
+        )
+    if os.getenv('CORTEX_STREAMING', 'on').lower() == 'off':
+        stream_fn = None
+    return CortexLLM(run_query, model=os.getenv('CORTEX_MODEL', CORTEX_MODEL), stream_fn=stream_fn)
@@ -0,0 +1,27 @@
+"""
+Concurrent query fan-out for the Manufacturing Intelligence Demo
+Independent dashboard queries are submitted together, so page latency is
+bounded by the slowest query instead of the sum of all of them.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+except ImportError:  # older/newer Streamlit layouts - run without the script context
+    add_script_run_ctx = get_script_run_ctx = None
+
+
+def run_queries_concurrently(run_query, queries, max_workers=None):
+    """Run named queries in parallel, yielding (name, result) as each finishes"""
+    # Worker threads need the script context so st.cache_data / st.error work
+    ctx = get_script_run_ctx(suppress_warning=True) if get_script_run_ctx else None
+
+    def attach_context():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(queries), initializer=attach_context) as executor:
+        futures = {executor.submit(run_query, query): name for name, query in queries.items()}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
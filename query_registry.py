@@ -0,0 +1,66 @@
+"""
+Named statement registry for the Manufacturing Intelligence Demo
+Every statement the apps send is registered under a name, with ? bind
+variables for values. Statement text never contains user input, so the
+warehouse reuses compiled plans and its result cache across users.
+"""
+import datetime
+import numbers
+import pandas as pd
+
+QUERIES = {}
+NAMES = {}
+
+
+def register(name, sql):
+    """Register a statement under a name and return its text"""
+    existing = QUERIES.get(name)
+    if existing is not None and existing != sql:
+        raise ValueError(f"Query {name!r} is already registered with different text")
+    QUERIES[name] = sql
+    NAMES.setdefault(sql, name)
+    return sql
+
+
+def statement(name):
+    """Text of a registered statement"""
+    try:
+        return QUERIES[name]
+    except KeyError:
+        raise KeyError(f"Unknown query: {name}") from None
+
+
+def name_of(sql, default='adhoc'):
+    """Registered name of a statement's text, for logs and metrics"""
+    return NAMES.get(sql, default)
+
+
+def bind_value(value):
+    """Plain Python value any DB-API driver can bind (dates as ISO strings)"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, datetime.datetime) and value.time() == datetime.time(0):
+        value = value.date()
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, numbers.Real):
+        return float(value)
+    return value
+
+
+def bind_params(params):
+    """Normalise a parameter sequence for binding (None when there is nothing to bind)"""
+    if not params:
+        return None
+    return [bind_value(value) for value in params]
+
+
+def run_named(run_query, name, params=None):
+    """Run a registered statement through run_query(query, params)"""
+    if params:
+        return run_query(statement(name), bind_params(params))
+    return run_query(statement(name))
@@ -0,0 +1,360 @@
+"""
+Question router for the AI Assistant
+Factual and metric questions ("total inventory value", "which plant has the
+highest efficiency") are answered from parameterised SQL templates on the
+normal query path instead of a Cortex call. The metric, ranking or breakdown,
+plant, region, category and date range are read from the question;
+open-ended questions ("how can we ...") go to the LLM. How each question
+shape resolves is cached, so repeated phrasings skip the parsing as well.
+"""
+import re
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+import pandas as pd
+from ai_cache import normalize_question
+from dashboard_data import load_date_bounds, month_start
+from query_registry import bind_params, register
+
+# Checked in order - more specific metrics first ("production efficiency" before "production")
+METRICS = OrderedDict([
+    ('below_reorder', {
+        'label': "items at or below their reorder point",
+        'terms': ['below reorder', 'reorder point', 'low stock', 'need reordering', 'to reorder'],
+        'table': 'INVENTORY', 'value': 'SUM(CASE WHEN t.CURRENT_STOCK <= t.REORDER_POINT THEN 1 ELSE 0 END)',
+        'format': '{:,.0f}', 'dimensions': ['plant', 'region', 'category'],
+    }),
+    ('stock_units', {
+        'label': "units in stock",
+        'terms': ['units in stock', 'stock level', 'stock levels', 'current stock', 'units of stock'],
+        'table': 'INVENTORY', 'value': 'SUM(t.CURRENT_STOCK)',
+        'format': '{:,.0f}', 'dimensions': ['plant', 'region', 'category'],
+    }),
+    ('inventory_value', {
+        'label': "inventory value",
+        'terms': ['inventory value', 'value of inventory', 'value of our inventory', 'stock value', 'inventory worth'],
+        'table': 'INVENTORY', 'value': 'SUM(t.CURRENT_STOCK * t.UNIT_COST)',
+        'format': '${:,.0f}', 'dimensions': ['plant', 'region', 'category'],
+    }),
+    ('efficiency', {
+        'label': "average production efficiency",
+        'terms': ['efficiency', 'efficient'],
+        'table': 'PRODUCTION', 'value': 'AVG(t.EFFICIENCY_PERCENT)', 'date_column': 'PRODUCTION_DATE',
+        'format': '{:.1f}%', 'dimensions': ['plant', 'region'],
+    }),
+    ('production', {
+        'label': "units produced",
+        'terms': ['units produced', 'production volume', 'production output', 'produced', 'output', 'production'],
+        'table': 'PRODUCTION', 'value': 'SUM(t.QUANTITY)', 'date_column': 'PRODUCTION_DATE',
+        'format': '{:,.0f}', 'dimensions': ['plant', 'region'],
+    }),
+    ('working_capital', {
+        'label': "working capital",
+        'terms': ['working capital'],
+        'table': 'FINANCIAL_KPIS', 'value': 'SUM(t.WORKING_CAPITAL)', 'date_column': 'KPI_DATE', 'monthly': True,
+        'format': '${:,.0f}', 'dimensions': ['plant', 'region'],
+    }),
+    ('cost_savings', {
+        'label': "cost savings",
+        'terms': ['cost savings', 'savings', 'saved'],
+        'table': 'FINANCIAL_KPIS', 'value': 'SUM(t.COST_SAVINGS)', 'date_column': 'KPI_DATE', 'monthly': True,
+        'format': '${:,.0f}', 'dimensions': ['plant', 'region'],
+    }),
+    ('supplier_risk', {
+        'label': "supplier risk score",
+        'terms': ['risk', 'risky', 'riskiest'],
+        'table': 'SUPPLIERS', 'value': 'AVG(t.RISK_SCORE)', 'lower_is_better': True,
+        'format': '{:.1f}', 'dimensions': ['supplier'], 'scope': 'suppliers',
+    }),
+    ('supplier_performance', {
+        'label': "supplier performance score",
+        'terms': ['performance', 'performing', 'performer', 'performers', 'reliable', 'reliability'],
+        'table': 'SUPPLIERS', 'value': 'AVG(t.PERFORMANCE_SCORE)',
+        'format': '{:.1f}', 'dimensions': ['supplier'], 'scope': 'suppliers',
+    }),
+])
+
+DIMENSIONS = {
+    'plant': {'terms': ['plant', 'plants', 'site', 'sites', 'factory', 'factories'],
+              'columns': ['p.PLANT_ID', 'p.PLANT_NAME'], 'join': True},
+    'region': {'terms': ['region', 'regions'], 'columns': ['p.REGION'], 'join': True},
+    'category': {'terms': ['category', 'categories'], 'columns': ['t.CATEGORY']},
+    'supplier': {'terms': ['supplier', 'suppliers', 'vendor', 'vendors'], 'columns': ['t.SUPPLIER_NAME', 't.COUNTRY']},
+}
+DIMENSION_OF = {term: name for name, spec in DIMENSIONS.items() for term in spec['terms']}
+DIMENSION_TERMS = '|'.join(sorted(DIMENSION_OF, key=len, reverse=True))
+
+HIGHEST = ['highest', 'most', 'best', 'top', 'largest', 'biggest', 'greatest', 'maximum', 'riskiest']
+LOWEST = ['lowest', 'least', 'worst', 'bottom', 'smallest', 'fewest', 'minimum']
+
+KNOWN_WORDS = {word for terms in [spec['terms'] for spec in METRICS.values()] + [list(DIMENSION_OF), HIGHEST, LOWEST]
+               for term in terms for word in term.split()}
+
+# Advice, causes and what-ifs need the model
+OPEN_ENDED = re.compile(
+    r'^(?:why|how (?:can|could|should|do|would|might|to)|should|what (?:should|can|could|would|if))\b'
+    r'|\b(?:recommend\w*|suggest\w*|optimi[sz]\w*|improv\w*|strateg\w*|explain\w*|forecast\w*|predict\w*|'
+    r'reduce|increase|plan|advice|advise)\b'
+)
+
+# Words a routed question may contain besides metric, dimension and ranking terms;
+# anything else ("turnover", "trend", "compare", "vs") is a qualifier only the model can handle
+FILLER_WORDS = set('''
+    a an the what which who whose is are was were be has have had do does our their its we us me show list give tell
+    total overall current currently now across all in at for of on by per each every how many much there
+    items item pose one ones with from last past previous this during
+    day days week weeks month months quarter quarters year years
+'''.split())
+PLACEHOLDER = re.compile(r'^<[A-Z]+>$')
+
+PERIOD_DAYS = {'day': 1, 'week': 7, 'month': 30, 'quarter': 91, 'year': 365}
+PERIOD = re.compile(r'\b(?:last|past|previous|this)\s+(?:(\d+)\s+)?(day|week|month|quarter|year)s?\b')
+YEAR = re.compile(r'\b(?:in|during|for)\s+(20\d\d)\b')
+
+VOCABULARY_QUERIES = {
+    'plants': register('router_plants', "SELECT PLANT_ID, PLANT_NAME, REGION FROM PLANTS"),
+    'categories': register('router_categories', "SELECT DISTINCT CATEGORY FROM INVENTORY"),
+}
+
+
+def _mention(text, term):
+    """Span of a whole-word match of a normalised term in normalised text"""
+    match = re.search(rf'\b{re.escape(term)}\b', text) if term else None
+    return match.span() if match else None
+
+
+def compile_template(metric, dimension=None, filters=()):
+    """Registered statement for a metric, optionally grouped by a dimension and filtered"""
+    spec = METRICS[metric]
+    columns = DIMENSIONS[dimension]['columns'] if dimension else []
+    join = (dimension and DIMENSIONS[dimension].get('join')) or 'region' in filters
+    where = []
+    if 'plant' in filters:
+        where.append("t.PLANT_ID = ?")
+    if 'region' in filters:
+        where.append("p.REGION = ?")
+    if 'category' in filters:
+        where.append("t.CATEGORY = ?")
+    if 'dates' in filters:
+        where.append(f"t.{spec['date_column']} BETWEEN ? AND ?")
+    sql = f"SELECT {''.join(c + ', ' for c in columns)}{spec['value']} as VALUE FROM {spec['table']} t"
+    if join:
+        sql += " JOIN PLANTS p ON p.PLANT_ID = t.PLANT_ID"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if columns:
+        sql += " GROUP BY " + ", ".join(columns)
+    name = '_'.join(['route', metric] + ([f'by_{dimension}'] if dimension else []) + sorted(filters))
+    return register(name, sql)
+
+
+class QuestionRouter:
+    """Resolves metric questions to SQL templates and answers them from the query path"""
+
+    def __init__(self, run_query, max_shapes=512):
+        self.run_query = run_query
+        self.max_shapes = max_shapes
+        self.stats = {'routed': 0, 'llm': 0, 'shape_hits': 0, 'shape_misses': 0}
+        self.version = None
+        self.names = []
+        self.plant_names = {}
+        self.bounds = None
+        self._shapes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def refresh(self, data_version):
+        """Reload the plant, region and category names when the data version changes"""
+        with self._lock:
+            if self.version == data_version and self.version is not None:
+                return
+            plants = self.run_query(VOCABULARY_QUERIES['plants'])
+            categories = self.run_query(VOCABULARY_QUERIES['categories'])
+            names = []
+            if not plants.empty:
+                names += [('plant', plant_id, plant_id) for plant_id in plants['PLANT_ID']]
+                names += [('plant', name, plant_id) for name, plant_id in zip(plants['PLANT_NAME'], plants['PLANT_ID'])]
+                names += [('region', region, region) for region in plants['REGION'].dropna().unique()]
+            if not categories.empty:
+                names += [('category', category, category) for category in categories['CATEGORY'].dropna()]
+            # Longest names first, so "asia plant 12" wins over "asia plant 1" and a plant name over its region
+            self.names = sorted(((kind, normalize_question(str(name)), value) for kind, name, value in names
+                                 if isinstance(name, str) and name), key=lambda n: -len(n[1]))
+            self.plant_names = dict(zip(plants['PLANT_ID'], plants['PLANT_NAME'])) if not plants.empty else {}
+            self.bounds = load_date_bounds(self.run_query)
+            self.version = data_version
+
+    def entities(self, text):
+        """(filters, shape): named plants/regions/categories, and the text with them replaced
+
+        filters is None when the question names two different entities of one
+        kind ("compare Europe Center and Asia Pacific") - a single template
+        can't answer that.
+        """
+        filters = {}
+        ambiguous = False
+        for kind, term, value in self.names:
+            # Every mention is replaced, so a region never matches inside a plant name already found
+            span = _mention(text, term) if term in text else None
+            while span is not None:
+                ambiguous = ambiguous or filters.get(kind, value) != value
+                filters[kind] = value
+                # Upper case, so placeholders never match the lower-case metric and dimension words
+                text = f"{text[:span[0]]}<{kind.upper()}>{text[span[1]:]}"
+                span = _mention(text, term)
+        return None if ambiguous else filters, re.sub(r'\d+', '<N>', text)
+
+    def date_range(self, text):
+        """Date range named in the question, relative to the latest production date"""
+        if self.bounds is None:
+            return None
+        first, last = self.bounds
+        match = PERIOD.search(text)
+        if match:
+            days = int(match.group(1) or 1) * PERIOD_DAYS[match.group(2)]
+            return max(first, last - timedelta(days=days - 1)), last
+        match = YEAR.search(text)
+        if match:
+            year = int(match.group(1))
+            return date(year, 1, 1), date(year, 12, 31)
+        return None
+
+    def resolve_shape(self, shape):
+        """{metric, kind, dimension, descending, plural} for a question shape, or None for the LLM"""
+        if OPEN_ENDED.search(shape):
+            return None
+        # Only route when every word is understood - an unknown qualifier changes the question
+        if any(word not in KNOWN_WORDS and word not in FILLER_WORDS and not PLACEHOLDER.match(word)
+               for word in shape.split()):
+            return None
+        metric = next((name for name, spec in METRICS.items()
+                       if any(_mention(shape, term) for term in spec['terms'])), None)
+        if metric is None:
+            return None
+        spec = METRICS[metric]
+
+        highest = any(_mention(shape, word) for word in HIGHEST)
+        lowest = any(_mention(shape, word) for word in LOWEST)
+        descending = highest or not lowest
+        if spec.get('lower_is_better') and (_mention(shape, 'best') or _mention(shape, 'worst')):
+            descending = bool(_mention(shape, 'worst'))
+
+        by = re.search(rf'\b(?:by|per|each|for each|for every|every)\s+({DIMENSION_TERMS})\b', shape)
+        which = re.search(rf'\b(?:which|what)\s+(?:\w+\s+)?({DIMENSION_TERMS})\b', shape)
+        named = re.search(rf'\b({DIMENSION_TERMS})\b', shape)
+        if by:
+            kind, term = 'breakdown', by.group(1)
+        elif (highest or lowest) and named and not re.search(rf'\b(?:all|across)\s+(?:\w+\s+)?{named.group(1)}\b', shape):
+            kind, term = 'rank', named.group(1)
+        elif which:
+            kind, term = 'breakdown', which.group(1)
+        else:
+            kind, term = 'total', None
+        dimension = DIMENSION_OF.get(term)
+        if dimension is not None and dimension not in spec['dimensions']:
+            return None
+        return {'metric': metric, 'kind': kind, 'dimension': dimension, 'descending': descending,
+                'plural': term is not None and term.endswith('s')}
+
+    def resolve(self, question, data_version=None):
+        """Query, params and presentation for a question, or None when it needs the LLM"""
+        self.refresh(data_version)
+        text = normalize_question(question)
+        filters, shape = self.entities(text)
+        if filters is None:
+            return None
+        with self._lock:
+            if shape in self._shapes:
+                self._shapes.move_to_end(shape)
+                self.stats['shape_hits'] += 1
+                resolution = self._shapes[shape]
+            else:
+                self.stats['shape_misses'] += 1
+                resolution = self._shapes[shape] = self.resolve_shape(shape)
+                while len(self._shapes) > self.max_shapes:
+                    self._shapes.popitem(last=False)
+        if resolution is None:
+            return None
+
+        spec = METRICS[resolution['metric']]
+        dates = self.date_range(text)
+        # Inventory and supplier figures are current - a period or a missing column needs the model
+        if dates and not spec.get('date_column'):
+            return None
+        if any(kind not in spec['dimensions'] for kind in filters):
+            return None
+        params = [filters[kind] for kind in ['plant', 'region', 'category'] if kind in filters]
+        if dates:
+            filters['dates'] = dates
+            start, end = dates
+            params += [month_start(start) if spec.get('monthly') else start, end]
+
+        top = re.search(r'\b(?:top|bottom|best|worst)\s+(\d+)\b', text)
+        limit = int(top.group(1)) if top else (5 if resolution['plural'] else 1)
+        labels = dict(filters)
+        if 'plant' in filters:
+            labels['plant'] = f"{self.plant_names.get(filters['plant'], filters['plant'])} ({filters['plant']})"
+        return dict(resolution, filters=filters, labels=labels, params=params,
+                    query=compile_template(resolution['metric'], resolution['dimension'], filters),
+                    limit=limit if resolution['kind'] == 'rank' else 10)
+
+    def answer(self, question, data_version=None):
+        """Routed answer for a question as {'answer', 'query', ...}, or None when it needs the LLM"""
+        route = self.resolve(question, data_version)
+        with self._lock:
+            self.stats['routed' if route else 'llm'] += 1
+        if route is None:
+            return None
+        result = self.run_query(route['query'], bind_params(route['params']))
+        return dict(route, result=result, answer=format_answer(route, result))
+
+
+def entity_label(row, dimension):
+    if dimension == 'plant':
+        return f"{row['PLANT_NAME']} ({row['PLANT_ID']})"
+    if dimension == 'supplier':
+        return f"{row['SUPPLIER_NAME']} ({row['COUNTRY']})"
+    return str(row[DIMENSIONS[dimension]['columns'][0].split('.')[1]])
+
+
+def scope_text(route):
+    labels = route['labels']
+    parts = []
+    if 'plant' in labels:
+        parts.append(f"at {labels['plant']}")
+    if 'region' in labels:
+        parts.append(f"in {labels['region']}")
+    if 'category' in labels:
+        parts.append(f"for {labels['category']}")
+    if 'dates' in labels:
+        parts.append(f"from {labels['dates'][0]} to {labels['dates'][1]}")
+    if not parts and route['kind'] == 'total':
+        parts.append(f"across all {METRICS[route['metric']].get('scope', 'plants')}")
+    return (' ' + ' '.join(parts)) if parts else ''
+
+
+def format_answer(route, result):
+    """Markdown answer for a routed question and its result"""
+    spec = METRICS[route['metric']]
+    scope = scope_text(route)
+    values = pd.to_numeric(result['VALUE'], errors='coerce') if not result.empty else pd.Series(dtype=float)
+    if values.dropna().empty:
+        answer = f"No matching data for {spec['label']}{scope}."
+    elif route['kind'] == 'total':
+        answer = f"{spec['label'][0].upper()}{spec['label'][1:]}{scope}: **{spec['format'].format(values.iloc[0])}**."
+    else:
+        ranked = result.assign(VALUE=values).dropna(subset=['VALUE']).sort_values(
+            'VALUE', ascending=not route['descending'], ignore_index=True)
+        direction = 'highest' if route['descending'] else 'lowest'
+        shown = ranked.head(route['limit'])
+        if route['kind'] == 'rank' and len(shown) == 1:
+            row = shown.iloc[0]
+            answer = (f"{entity_label(row, route['dimension'])} has the {direction} {spec['label']}{scope}: "
+                      f"**{spec['format'].format(row['VALUE'])}**.")
+        else:
+            heading = f"{spec['label'][0].upper()}{spec['label'][1:]} by {route['dimension']}{scope}, {direction} first:"
+            lines = [f"{i}. {entity_label(row, route['dimension'])}: {spec['format'].format(row['VALUE'])}"
+                     for i, row in enumerate(shown.to_dict('records'), 1)]
+            if len(ranked) > len(shown):
+                lines.append(f"… and {len(ranked) - len(shown)} more")
+            answer = '\n'.join([heading, ''] + lines)
+    return f"{answer}\n\n_Answered from {spec['table']} with a SQL template - no model call._"
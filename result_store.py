@@ -0,0 +1,181 @@
+"""
+Shared result store for the Manufacturing Intelligence Demo
+A second cache level behind QueryCache that every Streamlit replica (and the
+next restart) can read. Results are Arrow IPC: memory-mapped files in a
+local or shared directory, or values in Redis. Keys hash the statement, its
+binds and the change tokens of the tables it reads, so a result is only ever
+shared for the data it was computed from. pyarrow is imported on first use,
+so a deployment with the store off never loads it.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger('manufacturing.result_store')
+
+
+def result_key(namespace, query, params, version):
+    """Content hash for a statement, its binds and the table tokens it was run against"""
+    raw = json.dumps([namespace, query, list(params or []), sorted(version.items())], default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def to_arrow(result):
+    import pyarrow as pa
+    return result if isinstance(result, pa.Table) else pa.Table.from_pandas(result, preserve_index=False)
+
+
+class ArrowFileStore:
+    """Arrow IPC files under a directory, LRU-evicted by modification time
+
+    Writers go through a temporary file and an atomic rename, so concurrent
+    writers (threads, processes or replicas sharing the directory) never
+    expose a partial file. Reads touch the file, which is what LRU eviction
+    goes by. Eviction trims the directory to 90% of max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes=1 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+        self._written = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.arrow")
+
+    def get(self, key):
+        """Table for key backed by the mapped file (no read into memory yet), or None"""
+        import pyarrow as pa
+        path = self.path(key)
+        try:
+            table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        except FileNotFoundError:
+            self.stats['misses'] += 1
+            return None
+        except (pa.ArrowInvalid, OSError):
+            # Truncated by a crashed writer on a filesystem without atomic rename
+            self._remove(path)
+            self.stats['misses'] += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.stats['hits'] += 1
+        return table
+
+    def put(self, key, result):
+        import pyarrow as pa
+        table = to_arrow(result)
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            size = os.path.getsize(tmp)
+            os.replace(tmp, path)
+        finally:
+            self._remove(tmp)
+        with self._lock:
+            self.stats['writes'] += 1
+            self._written += size
+            # Scanning the directory is amortised over a tenth of the budget
+            evict = self._written >= self.max_bytes / 10
+            if evict:
+                self._written = 0
+        if evict:
+            self.evict()
+
+    def files(self):
+        """(mtime, size, path) of every stored result"""
+        entries = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith('.arrow'):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:  # evicted by another process meanwhile
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def size(self):
+        return sum(size for _, size, _ in self.files())
+
+    def evict(self):
+        """Delete least recently used results until the store is under 90% of max_bytes"""
+        entries = sorted(self.files())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            if self._remove(path):
+                self.stats['evictions'] += 1
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.files():
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+
+class RedisStore:
+    """Arrow IPC streams as Redis values - any client with get(key) and set(key, value, ex=)
+
+    Size is bounded on the server (maxmemory with an allkeys-lru policy);
+    ttl keeps results from outliving a forgotten deployment.
+    """
+
+    def __init__(self, client, prefix='manufacturing:result:', ttl=86400):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+
+    def get(self, key):
+        import pyarrow as pa
+        data = self.client.get(self.prefix + key)
+        if data is None:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return pa.ipc.open_stream(pa.py_buffer(data)).read_all()
+
+    def put(self, key, result):
+        import pyarrow as pa
+        table = to_arrow(result)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        self.client.set(self.prefix + key, sink.getvalue().to_pybytes(), ex=self.ttl)
+        self.stats['writes'] += 1
+
+
+def result_store_from_env():
+    """RESULT_CACHE=dir (RESULT_CACHE_DIR) or redis (RESULT_CACHE_URL); None when off"""
+    kind = os.getenv('RESULT_CACHE', 'off').lower()
+    if kind == 'dir':
+        import tempfile
+        return ArrowFileStore(
+            os.getenv('RESULT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'manufacturing_results')),
+            max_bytes=int(float(os.getenv('RESULT_CACHE_MAX_MB', '1024')) * 1e6)
+        )
+    if kind == 'redis':
+        import redis
+        return RedisStore(redis.Redis.from_url(os.getenv('RESULT_CACHE_URL', 'redis://localhost:6379/0')),
+                          ttl=int(os.getenv('RESULT_CACHE_TTL', '86400')))
+    return None
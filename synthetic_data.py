@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator for the Manufacturing Intelligence Demo
+Scales 03_data.sql up to production-sized volumes with NumPy: plants with
+their own capacity and efficiency profile, inventory around reorder points,
+suppliers whose risk tracks their performance, daily production with
+weekday seasonality and monthly financial KPIs. Tables are produced in
+chunks and written as Parquet/CSV files or bulk-loaded - never row by row.
+
+    python synthetic_data.py --plants 1000 --days 365 --format parquet --out data/
+    python synthetic_data.py --plants 100 --load local --db demo.duckdb
+    python synthetic_data.py --plants 100 --load snowflake
+"""
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from backends import SQL_DIR, LocalBackend
+
+REGIONS = [
+    ('North America', ['USA', 'Canada']),
+    ('Europe', ['Germany', 'France', 'Sweden']),
+    ('Asia', ['Singapore', 'Japan', 'Taiwan']),
+    ('LATAM', ['Mexico', 'Brazil']),
+]
+
+# Category: (share of items, log-normal median unit cost)
+CATEGORIES = {
+    'Raw Materials': (0.30, 12.0),
+    'Components': (0.30, 60.0),
+    'Electronics': (0.15, 120.0),
+    'Finished Goods': (0.15, 250.0),
+    'Materials': (0.10, 3.0),
+}
+
+ITEMS = ['Steel Components', 'Electronic Parts', 'Motor Assembly', 'Precision Bearings',
+         'Control Systems', 'Sensor Arrays', 'Packaging Materials', 'Hydraulic Pumps']
+PRODUCTS = ['Motor Assembly', 'Control Unit', 'Precision Parts', 'Bearing Sets',
+            'Sensor Modules', 'Electronic Boards']
+
+# Output relative to a weekday, Monday..Sunday
+WEEKDAY_FACTOR = np.array([1.0, 1.02, 1.03, 1.02, 0.97, 0.55, 0.35])
+
+TABLE_ORDER = ['PLANTS', 'SUPPLIERS', 'INVENTORY', 'FINANCIAL_KPIS', 'PRODUCTION']
+
+DEFAULT_CHUNK_ROWS = 500000
+END_DATE = '2024-09-01'
+
+
+def ids(prefix, start, count, width):
+    """Vectorised 'PREFIX_000123' identifiers"""
+    numbers = np.arange(start, start + count).astype(str)
+    return np.char.add(prefix, np.char.zfill(numbers, width))
+
+
+class SyntheticData:
+    """Deterministic (per seed) manufacturing data at a chosen scale"""
+
+    def __init__(self, plants=100, items_per_plant=20, suppliers=200, days=365,
+                 lines_per_plant=3, seed=0, end_date=END_DATE):
+        self.plants = plants
+        self.items_per_plant = items_per_plant
+        self.suppliers = suppliers
+        self.days = days
+        self.lines_per_plant = lines_per_plant
+        self.seed = seed
+        self.end_date = np.datetime64(end_date, 'D')
+
+        # Per-plant profile shared by every table, so the figures are consistent
+        rng = np.random.default_rng(seed)
+        self.plant_ids = ids('PLANT_', 1, plants, 5)
+        self.region = rng.integers(0, len(REGIONS), plants)
+        self.capacity = rng.lognormal(np.log(200), 0.4, plants)         # units per line per day
+        self.base_efficiency = 100 * rng.beta(18, 2, plants)            # ~90% with a long low tail
+        self.products = rng.integers(0, len(PRODUCTS), (plants, lines_per_plant))
+
+    @property
+    def production_rows(self):
+        return self.plants * self.lines_per_plant * self.days
+
+    def row_counts(self):
+        return {
+            'PLANTS': self.plants,
+            'SUPPLIERS': self.suppliers,
+            'INVENTORY': self.plants * self.items_per_plant,
+            'FINANCIAL_KPIS': self.plants * len(self._kpi_dates()),
+            'PRODUCTION': self.production_rows,
+        }
+
+    def _rng(self, table, chunk=0):
+        # Independent stream per table and chunk - chunks can be generated in any order
+        return np.random.default_rng([self.seed, TABLE_ORDER.index(table), chunk])
+
+    def _kpi_dates(self):
+        first = (self.end_date - np.timedelta64(self.days - 1, 'D')).astype('datetime64[M]')
+        return np.arange(first, self.end_date.astype('datetime64[M]') + 1).astype('datetime64[D]')
+
+    def plants_frame(self):
+        rng = self._rng('PLANTS')
+        countries = [REGIONS[r][1][rng.integers(0, len(REGIONS[r][1]))] for r in self.region]
+        return pd.DataFrame({
+            'PLANT_ID': self.plant_ids,
+            'PLANT_NAME': [f"{REGIONS[r][0]} Plant {i}" for i, r in enumerate(self.region, 1)],
+            'REGION': [REGIONS[r][0] for r in self.region],
+            'COUNTRY': countries,
+        })
+
+    def suppliers_frame(self):
+        rng = self._rng('SUPPLIERS')
+        n = self.suppliers
+        performance = (100 * rng.beta(20, 2, n)).clip(60, 100)
+        # Weaker performers carry more risk
+        risk = (1 + (100 - performance) / 8 + rng.normal(0, 0.6, n)).clip(1, 5)
+        countries = [country for _, country_list in REGIONS for country in country_list]
+        return pd.DataFrame({
+            'SUPPLIER_ID': ids('SUP_', 1, n, 6),
+            'SUPPLIER_NAME': np.char.add('Supplier ', (np.arange(n) + 1).astype(str)),
+            'COUNTRY': np.array(countries)[rng.integers(0, len(countries), n)],
+            'PERFORMANCE_SCORE': performance.round(1),
+            'RISK_SCORE': risk.round(1),
+        })
+
+    def inventory_frame(self):
+        rng = self._rng('INVENTORY')
+        n = self.plants * self.items_per_plant
+        names = list(CATEGORIES)
+        shares = np.array([share for share, _ in CATEGORIES.values()])
+        category = rng.choice(len(names), n, p=shares / shares.sum())
+        median_cost = np.array([cost for _, cost in CATEGORIES.values()])[category]
+        reorder = rng.lognormal(np.log(300), 0.6, n).round()
+        # Most items sit 1-3x above reorder point, some run low, a few are overstocked
+        cover = rng.lognormal(np.log(1.8), 0.55, n)
+        return pd.DataFrame({
+            'ITEM_ID': ids('INV_', 1, n, 8),
+            'ITEM_NAME': np.array(ITEMS)[rng.integers(0, len(ITEMS), n)],
+            'PLANT_ID': np.repeat(self.plant_ids, self.items_per_plant),
+            'CATEGORY': np.array(names)[category],
+            'CURRENT_STOCK': (reorder * cover).round(),
+            'REORDER_POINT': reorder,
+            'UNIT_COST': rng.lognormal(np.log(median_cost), 0.35).round(2),
+        })
+
+    def financial_frame(self):
+        rng = self._rng('FINANCIAL_KPIS')
+        dates = self._kpi_dates()
+        months = len(dates)
+        base_inventory = self.capacity * self.lines_per_plant * rng.uniform(30000, 60000, self.plants)
+        # Monthly random walk around each plant's level
+        drift = np.cumprod(rng.normal(1.0, 0.03, (self.plants, months)), axis=1)
+        inventory_value = base_inventory[:, None] * drift
+        working_capital = inventory_value * rng.uniform(2.0, 3.5, (self.plants, 1))
+        savings = inventory_value * np.clip(self.base_efficiency[:, None] - 80, 0, None) / 400
+        return pd.DataFrame({
+            'KPI_DATE': pd.to_datetime(np.tile(dates, self.plants)),
+            'PLANT_ID': np.repeat(self.plant_ids, months),
+            'INVENTORY_VALUE': inventory_value.ravel().round(),
+            'WORKING_CAPITAL': working_capital.ravel().round(),
+            'COST_SAVINGS': savings.ravel().round(),
+        })
+
+    def production_chunks(self, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """Daily production per plant line, in day-major chunks of about chunk_rows"""
+        per_day = self.plants * self.lines_per_plant
+        days_per_chunk = max(1, chunk_rows // per_day)
+        start = self.end_date - np.timedelta64(self.days - 1, 'D')
+        plant_index = np.repeat(np.arange(self.plants), self.lines_per_plant)
+        products = np.array(PRODUCTS)[self.products.ravel()]
+
+        for chunk, first_day in enumerate(range(0, self.days, days_per_chunk)):
+            rng = self._rng('PRODUCTION', chunk)
+            day_count = min(days_per_chunk, self.days - first_day)
+            dates = start + np.arange(first_day, first_day + day_count).astype('timedelta64[D]')
+            weekday = (dates.astype('datetime64[D]').view('int64') - 4) % 7   # 1970-01-01 was a Thursday
+            n = day_count * per_day
+
+            plant = np.tile(plant_index, day_count)
+            efficiency = (self.base_efficiency[plant] + rng.normal(0, 2.5, n)).clip(40, 100)
+            # Occasional breakdown days
+            efficiency[rng.random(n) < 0.01] *= rng.uniform(0.4, 0.8)
+            quantity = (self.capacity[plant] * np.repeat(WEEKDAY_FACTOR[weekday], per_day)
+                        * efficiency / 100 * rng.lognormal(0, 0.1, n)).round()
+            offset = first_day * per_day
+            yield pd.DataFrame({
+                'PRODUCTION_ID': ids('PROD_', offset + 1, n, 10),
+                'PLANT_ID': self.plant_ids[plant],
+                'PRODUCT_NAME': np.tile(products, day_count),
+                'PRODUCTION_DATE': pd.to_datetime(np.repeat(dates, per_day)),
+                'QUANTITY': quantity,
+                'EFFICIENCY_PERCENT': efficiency.round(1),
+            })
+
+    def tables(self, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """(table, DataFrame) pairs in load order; PRODUCTION arrives in several chunks"""
+        yield 'PLANTS', self.plants_frame()
+        yield 'SUPPLIERS', self.suppliers_frame()
+        yield 'INVENTORY', self.inventory_frame()
+        yield 'FINANCIAL_KPIS', self.financial_frame()
+        for frame in self.production_chunks(chunk_rows):
+            yield 'PRODUCTION', frame
+
+
+def write_files(data, out_dir, fmt='parquet', chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Write each table as numbered chunk files under out_dir/<TABLE>/; returns the paths"""
+    paths = []
+    parts = {}
+    for table, frame in data.tables(chunk_rows):
+        part = parts.get(table, 0)
+        parts[table] = part + 1
+        table_dir = os.path.join(out_dir, table)
+        os.makedirs(table_dir, exist_ok=True)
+        path = os.path.join(table_dir, f"part-{part:05d}.{fmt}")
+        if fmt == 'parquet':
+            frame.to_parquet(path, index=False)
+        elif fmt == 'csv':
+            frame.to_csv(path, index=False, date_format='%Y-%m-%d')
+        else:
+            raise ValueError(f"Unknown format: {fmt}")
+        paths.append(path)
+    return paths
+
+
+def load_local(data, backend, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Bulk insert every chunk into a LocalBackend; returns rows loaded per table"""
+    loaded = {}
+    for table, frame in data.tables(chunk_rows):
+        backend.insert_rows(table, frame)
+        loaded[table] = loaded.get(table, 0) + len(frame)
+    return loaded
+
+
+def build_local_database(data, path, engine=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Fresh local database at path: tables, synthetic data, then the views and summaries"""
+    if os.path.exists(path):
+        os.remove(path)
+    backend = LocalBackend(engine=engine, path=path, seed_scripts=['02_tables.sql'])
+    load_local(data, backend, chunk_rows)
+    # 05_aggregates.sql builds the summaries from whatever the base tables hold
+    for script in ['04_cortex.sql', '05_aggregates.sql', '06_insights.sql', '07_ingest.sql']:
+        backend.load_script(os.path.join(SQL_DIR, script))
+    return backend
+
+
+def load_snowflake(data, conn, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Bulk load with write_pandas (staged Parquet + COPY INTO); returns rows loaded per table"""
+    from ingest import write_pandas_frame
+
+    loaded = {}
+    for table, frame in data.tables(chunk_rows):
+        loaded[table] = loaded.get(table, 0) + write_pandas_frame(conn, table, frame)
+    return loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--plants', type=int, default=100)
+    parser.add_argument('--items-per-plant', type=int, default=20)
+    parser.add_argument('--suppliers', type=int, default=200)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--lines-per-plant', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument('--format', choices=['parquet', 'csv'], default='parquet')
+    parser.add_argument('--out', help="write chunked files to this directory")
+    parser.add_argument('--load', choices=['local', 'snowflake'], help="bulk load into a database instead")
+    parser.add_argument('--engine', choices=['duckdb', 'sqlite'], help="local engine for --load local")
+    parser.add_argument('--db', default='demo.duckdb', help="local database path for --load local (replaced)")
+    args = parser.parse_args()
+
+    data = SyntheticData(plants=args.plants, items_per_plant=args.items_per_plant, suppliers=args.suppliers,
+                         days=args.days, lines_per_plant=args.lines_per_plant, seed=args.seed)
+    started = time.perf_counter()
+    if args.load == 'local':
+        build_local_database(data, args.db, args.engine, args.chunk_rows)
+        loaded = data.row_counts()
+    elif args.load == 'snowflake':
+        from dotenv import load_dotenv
+        from app_core import get_snowflake_connection
+        load_dotenv()
+        conn = get_snowflake_connection()
+        try:
+            loaded = load_snowflake(data, conn, args.chunk_rows)
+        finally:
+            conn.close()
+    elif args.out:
+        paths = write_files(data, args.out, args.format, args.chunk_rows)
+        loaded = data.row_counts()
+        print(f"Wrote {len(paths)} files to {args.out}")
+    else:
+        parser.error("choose --out or --load")
+
+    total = sum(loaded.values())
+    elapsed = time.perf_counter() - started
+    print(', '.join(f"{table} {rows:,}" for table, rows in loaded.items()))
+    print(f"{total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
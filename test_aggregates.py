@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Tests for the incrementally maintained summary tables
+"""
+import pandas as pd
+import pytest
+from aggregates import AggregateRefresher
+from backends import HAS_DUCKDB, LocalBackend
+
+ENGINES = ['sqlite'] + (['duckdb'] if HAS_DUCKDB else [])
+
+# The original 04_cortex.sql view logic, computed from the base table
+INSIGHTS_FROM_BASE = """
+SELECT PLANT_ID, CATEGORY, SUM(CURRENT_STOCK) as TOTAL_STOCK,
+       SUM(CURRENT_STOCK * UNIT_COST) as TOTAL_VALUE, COUNT(*) as ITEM_COUNT,
+       CASE
+           WHEN SUM(CURRENT_STOCK) < SUM(REORDER_POINT) THEN 'LOW_STOCK'
+           WHEN SUM(CURRENT_STOCK) > SUM(REORDER_POINT) * 3 THEN 'EXCESS_STOCK'
+           ELSE 'NORMAL'
+       END as STOCK_STATUS
+FROM INVENTORY GROUP BY PLANT_ID, CATEGORY ORDER BY PLANT_ID, CATEGORY
+"""
+
+NEW_INVENTORY = pd.DataFrame({
+    'ITEM_ID': ['INV_101', 'INV_102'],
+    'ITEM_NAME': ['Copper Wire', 'Hydraulic Pumps'],
+    'PLANT_ID': ['PLANT_001', 'PLANT_005'],
+    'CATEGORY': ['Raw Materials', 'Components'],
+    'CURRENT_STOCK': [10, 40],
+    'REORDER_POINT': [400, 20],
+    'UNIT_COST': [3.5, 120.0],
+})
+
+
+def insights(backend):
+    return backend.query("SELECT * FROM INVENTORY_INSIGHTS ORDER BY PLANT_ID, CATEGORY")
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_appended_inventory_matches_full_recompute(engine):
+    backend = LocalBackend(engine=engine)
+    AggregateRefresher(backend).append('INVENTORY', NEW_INVENTORY)
+
+    expected = backend.query(INSIGHTS_FROM_BASE)
+    pd.testing.assert_frame_equal(insights(backend), expected, check_dtype=False)
+    assert expected.set_index(['PLANT_ID', 'CATEGORY']).loc[('PLANT_001', 'Raw Materials'), 'STOCK_STATUS'] == 'NORMAL'
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_updates_and_deletes_fold_into_summaries(engine):
+    backend = LocalBackend(engine=engine)
+    refresher = AggregateRefresher(backend)
+
+    old = backend.query("SELECT * FROM PRODUCTION WHERE PRODUCTION_ID = 'PROD_001'")
+    new = old.assign(EFFICIENCY_PERCENT=99.0)
+    backend.execute("UPDATE PRODUCTION SET EFFICIENCY_PERCENT = 99 WHERE PRODUCTION_ID = 'PROD_001'")
+    refresher.apply_changes('PRODUCTION', inserted=new, deleted=old)
+
+    old_supplier = backend.query("SELECT * FROM SUPPLIERS WHERE SUPPLIER_ID = 'SUP_003'")
+    backend.execute("DELETE FROM SUPPLIERS WHERE SUPPLIER_ID = 'SUP_003'")
+    refresher.apply_changes('SUPPLIERS', deleted=old_supplier)
+
+    efficiency = backend.query(
+        "SELECT PLANT_ID, EFFICIENCY_SUM / EFFICIENCY_COUNT as AVG_EFFICIENCY FROM PRODUCTION_SUMMARY ORDER BY PLANT_ID"
+    )
+    assert efficiency.iloc[0]['AVG_EFFICIENCY'] == pytest.approx((99 + 92.1) / 2)
+    assert 'HIGH_RISK' not in set(backend.query("SELECT * FROM SUPPLIER_RISK")['RISK_CATEGORY'])
+
+
+class FailingRollupRefresher(AggregateRefresher):
+    """Fails after the base insert and the plant summary upsert ran"""
+
+    def _apply_production(self, changes, inserted, deleted):
+        super()._apply_production(changes, inserted, deleted)
+        raise RuntimeError("rollup upsert failed")
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_failed_summary_upsert_rolls_back_the_base_write(engine):
+    backend = LocalBackend(engine=engine)
+    tables = ['PRODUCTION', 'PRODUCTION_SUMMARY', 'PRODUCTION_ROLLUP']
+    before = {table: backend.query(f"SELECT * FROM {table} ORDER BY 1, 2, 3") for table in tables}
+    row = backend.query("SELECT * FROM PRODUCTION WHERE PRODUCTION_ID = 'PROD_001'").assign(PRODUCTION_ID='PROD_101')
+
+    with pytest.raises(RuntimeError):
+        FailingRollupRefresher(backend).append('PRODUCTION', row)
+    for table in tables:
+        pd.testing.assert_frame_equal(backend.query(f"SELECT * FROM {table} ORDER BY 1, 2, 3"), before[table])
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_rebuild_recovers_from_base_tables(engine):
+    backend = LocalBackend(engine=engine)
+    backend.insert_rows('INVENTORY', NEW_INVENTORY)
+    AggregateRefresher(backend).rebuild()
+
+    pd.testing.assert_frame_equal(insights(backend), backend.query(INSIGHTS_FROM_BASE), check_dtype=False)
+
+
+ROLLUP = "SELECT * FROM PRODUCTION_ROLLUP ORDER BY GRAIN, PERIOD_START, PLANT_ID"
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_rollup_folds_appends_into_every_grain(engine):
+    backend = LocalBackend(engine=engine)
+    AggregateRefresher(backend).append('PRODUCTION', pd.DataFrame({
+        'PRODUCTION_ID': ['PROD_101', 'PROD_102'],
+        'PLANT_ID': ['PLANT_001', 'PLANT_002'],
+        'PRODUCT_NAME': ['Motor Assembly', 'Control Unit'],
+        'PRODUCTION_DATE': pd.to_datetime(['2024-09-01', '2024-10-02']),   # a Sunday and a new month
+        'QUANTITY': [50, 70],
+        'EFFICIENCY_PERCENT': [80.0, 90.0],
+    }))
+    maintained = backend.query(ROLLUP)
+    AggregateRefresher(backend).rebuild()
+    rebuilt = backend.query(ROLLUP)
+
+    pd.testing.assert_frame_equal(maintained, rebuilt, check_dtype=False)
+    weeks = rebuilt[rebuilt['GRAIN'] == 'WEEK']['PERIOD_START'].astype(str).str[:10]
+    assert '2024-08-26' in set(weeks) and '2024-09-30' in set(weeks)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_unscored_supplier_is_low_risk_like_the_view(engine):
+    backend = LocalBackend(engine=engine)
+    supplier = pd.DataFrame({'SUPPLIER_ID': ['SUP_101'], 'SUPPLIER_NAME': ['New Supplier Co'], 'COUNTRY': ['Mexico'],
+                             'PERFORMANCE_SCORE': [4.0], 'RISK_SCORE': [None]})
+    AggregateRefresher(backend).append('SUPPLIERS', supplier)
+    risk = backend.query("SELECT RISK_CATEGORY FROM SUPPLIER_RISK WHERE SUPPLIER_NAME = 'New Supplier Co'")
+    assert list(risk['RISK_CATEGORY']) == ['LOW_RISK']
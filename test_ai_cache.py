@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for the AI Assistant answer cache
+"""
+from ai_cache import AnswerCache, normalize_question
+from llm import StubLLM
+
+
+def test_normalized_phrasings_share_an_entry(tmp_path):
+    cache = AnswerCache(path=str(tmp_path / 'cache.sqlite'))
+    llm = StubLLM()
+
+    for question in ["What's our total inventory value?", "what is our total  inventory value"]:
+        cache.get_or_compute(question, llm.model, 'v1', lambda: llm.complete(question))
+
+    assert llm.calls == 1
+    assert cache.stats == {'hits': 1, 'similar_hits': 0, 'misses': 1}
+
+
+def test_data_version_and_model_are_part_of_the_key(tmp_path):
+    cache = AnswerCache(path=str(tmp_path / 'cache.sqlite'))
+    cache.put("Which plant is best?", 'stub', 'v1', "PLANT_002")
+
+    assert cache.get("Which plant is best?", 'stub', 'v2') is None
+    assert cache.get("Which plant is best?", 'other', 'v1') is None
+    assert cache.get("Which plant is best?", 'stub', 'v1') == "PLANT_002"
+
+
+def test_similar_questions_hit_when_enabled(tmp_path):
+    cache = AnswerCache(path=str(tmp_path / 'cache.sqlite'), similarity=0.6)
+    cache.put("Which plant has the highest production efficiency?", 'stub', 'v1', "PLANT_002")
+
+    assert cache.get("Which plant has highest production efficiency", 'stub', 'v1') == "PLANT_002"
+    assert cache.get("What suppliers pose the highest risk?", 'stub', 'v1') is None
+    assert cache.stats['similar_hits'] == 1
+
+
+def test_ttl_and_lru_eviction(tmp_path):
+    cache = AnswerCache(path=str(tmp_path / 'cache.sqlite'), max_entries=2)
+    cache.put("q1", 'stub', 'v1', "a1")
+    cache.put("q2", 'stub', 'v1', "a2")
+    cache.get("q1", 'stub', 'v1')
+    cache.put("q3", 'stub', 'v1', "a3")
+
+    assert cache.get("q2", 'stub', 'v1') is None
+    assert cache.get("q1", 'stub', 'v1') == "a1"
+
+    expired = AnswerCache(path=str(tmp_path / 'cache.sqlite'), ttl=-1)
+    assert expired.get("q1", 'stub', 'v1') is None
+
+
+def test_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    AnswerCache(path=path).put("q1", 'stub', 'v1', "a1")
+    assert AnswerCache(path=path).get("q1", 'stub', 'v1') == "a1"
+    assert normalize_question("  Q1? ") == "q1"
+
+
+def test_streamed_answers_are_cached_whole(tmp_path):
+    cache = AnswerCache(path=str(tmp_path / 'cache.sqlite'))
+    llm = StubLLM()
+    question = "Which plant is most efficient?"
+
+    first = list(cache.stream_or_compute(question, llm.model, 'v1', lambda: llm.stream(question)))
+    second = list(cache.stream_or_compute(question, llm.model, 'v1', lambda: llm.stream(question)))
+
+    assert len(first) > 1
+    assert second == [''.join(first)]
+    assert llm.calls == 1
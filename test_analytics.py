@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests for the vectorised efficiency and stock-out analytics
+"""
+import numpy as np
+import pandas as pd
+from aggregates import AggregateRefresher
+from analytics import AnomalyEngine, EfficiencyHistory, StockProjection
+from backends import LocalBackend
+
+
+def daily_rows(plants=3, days=40, drop=None):
+    rng = np.random.default_rng(0)
+    dates = pd.date_range('2024-01-01', periods=days)
+    rows = pd.DataFrame([(d, f"PLANT_{p:03d}") for d in dates for p in range(plants)],
+                        columns=['PERIOD_START', 'PLANT_ID'])
+    rows['EFFICIENCY_COUNT'] = 4
+    rows['EFFICIENCY_SUM'] = (90 + rng.normal(0, 1, len(rows))) * 4
+    rows['TOTAL_QUANTITY'] = 100
+    if drop:
+        plant, day = drop
+        hit = (rows['PLANT_ID'] == plant) & (rows['PERIOD_START'] == dates[day])
+        rows.loc[hit, 'EFFICIENCY_SUM'] = 70 * 4
+    return rows
+
+
+def test_zscores_match_a_rolling_window():
+    history = EfficiencyHistory()
+    rows = daily_rows()
+    history.set_days(rows)
+    efficiency, mean, std, z = history.zscores(window=10, min_periods=5)
+
+    series = rows[rows['PLANT_ID'] == 'PLANT_001'].set_index('PERIOD_START')
+    series = series['EFFICIENCY_SUM'] / series['EFFICIENCY_COUNT']
+    baseline = series.shift(1).rolling(10, min_periods=5)
+    row = history.plants.get_loc('PLANT_001')
+    np.testing.assert_allclose(mean[row, 5:], baseline.mean().to_numpy()[5:])
+    np.testing.assert_allclose(std[row, 5:], baseline.std().to_numpy()[5:])
+    assert np.isnan(z[row, :5]).all()
+
+
+def test_drop_is_flagged_only_for_its_plant():
+    history = EfficiencyHistory()
+    history.set_days(daily_rows(drop=('PLANT_002', 38)))
+    alerts = history.anomalies(window=28, threshold=3, recent_days=7)
+    assert list(alerts['PLANT_ID']) == ['PLANT_002']
+    assert alerts.iloc[0]['DATE'] == np.datetime64('2024-02-08')
+    assert alerts.iloc[0]['EFFICIENCY'] == 70.0
+
+
+def test_incremental_rows_extend_the_history():
+    history = EfficiencyHistory(max_days=30)
+    history.set_days(daily_rows(days=40))
+    assert history.days == 30 and history.last_day == np.datetime64('2024-02-09')
+
+    history.add_production(pd.DataFrame({
+        'PRODUCTION_DATE': ['2024-02-10', '2024-02-10', '2024-02-10'],
+        'PLANT_ID': ['PLANT_000', 'PLANT_000', 'PLANT_009'],
+        'EFFICIENCY_PERCENT': [80.0, 90.0, 95.0],
+        'QUANTITY': [10, 20, 5],
+    }))
+    assert history.days == 30 and history.last_day == np.datetime64('2024-02-10')
+    assert len(history.plants) == 4
+    row = history.plants.get_loc('PLANT_000')
+    assert history.efficiency_sum[row, -1] == 170.0 and history.efficiency_count[row, -1] == 2
+
+
+def test_items_are_projected_only_after_enough_stock_drops():
+    projection = StockProjection(smoothing=0.5, min_observations=2)
+    snapshot = pd.DataFrame({
+        'ITEM_ID': ['A', 'B', 'C'], 'ITEM_NAME': ['Bolts', 'Nuts', 'Washers'], 'PLANT_ID': ['P1', 'P1', 'P1'],
+        'CATEGORY': ['Components'] * 3, 'CURRENT_STOCK': [300, 50, 150], 'REORDER_POINT': [100, 100, 100],
+    })
+    projection.update(snapshot, as_of=0)
+    # No usage seen yet: only B, already below its reorder point, is flagged
+    assert list(projection.alerts(horizon_days=14)['ITEM_ID']) == ['B']
+
+    # A used 40 units a day over two days - one drop is not enough to project
+    projection.update(snapshot.assign(CURRENT_STOCK=[220, 500, 150]), as_of=2 * 86400)
+    np.testing.assert_allclose(projection.usage[0], 40)
+    assert projection.alerts(horizon_days=14).empty
+
+    # 20 a day over the next two days: usage moves half way, 180 - 100 left at 30 a day
+    projection.update(snapshot.assign(CURRENT_STOCK=[180, 500, 150]), as_of=4 * 86400)
+    np.testing.assert_allclose(projection.usage[0], 30)
+    np.testing.assert_allclose(projection.days_to_reorder(), [80 / 30, np.nan, np.nan])
+    alerts = projection.alerts(horizon_days=14)
+    assert list(alerts['ITEM_ID']) == ['A'] and alerts.iloc[0]['DAYS_TO_REORDER'] == 2.7
+
+
+def test_engine_refreshes_once_per_data_version():
+    backend = LocalBackend()
+    queries = []
+
+    def run_query(query, params=None):
+        queries.append(query)
+        return backend.query(query, params)
+
+    engine = AnomalyEngine(run_query)
+    engine.refresh('v1')
+    engine.refresh('v1')
+    assert engine.efficiency.days > 0 and len(engine.stock.items) > 0
+    assert len(queries) == 3
+    assert engine.efficiency_alerts().empty
+
+
+def production(production_id, day, efficiency):
+    return pd.DataFrame({'PRODUCTION_ID': [production_id], 'PLANT_ID': ['PLANT_001'], 'PRODUCT_NAME': ['Motor Assembly'],
+                         'PRODUCTION_DATE': pd.to_datetime([day]), 'QUANTITY': [100],
+                         'EFFICIENCY_PERCENT': [efficiency]})
+
+
+def test_late_rows_before_the_lookback_are_picked_up():
+    backend = LocalBackend()
+    refresher = AggregateRefresher(backend)
+    engine = AnomalyEngine(backend.query, lookback_days=3)
+    engine.refresh('v1')
+
+    refresher.append('PRODUCTION', production('PROD_101', '2024-09-10', 90.0))
+    engine.refresh('v2')
+    assert engine.efficiency.last_day == np.datetime64('2024-09-10')
+
+    # Eight days before the last day held - outside the refetched lookback
+    refresher.append('PRODUCTION', production('PROD_102', '2024-09-02', 50.0))
+    engine.refresh('v3')
+    row = engine.efficiency.plants.get_loc('PLANT_001')
+    column = (np.datetime64('2024-09-02') - np.datetime64('2024-09-01')).astype(int)
+    assert engine.efficiency.efficiency_count[row, column] == 2
+    assert engine.efficiency.efficiency_sum[row, column] == 92.1 + 50.0
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Tests for the local query backend
+"""
+import pytest
+from backends import HAS_DUCKDB, LocalBackend, translate_statement
+
+ENGINES = ['sqlite'] + (['duckdb'] if HAS_DUCKDB else [])
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_local_backend_answers_dashboard_queries(engine):
+    """Seed data from 03_data.sql is queryable with the dashboard SQL"""
+    backend = LocalBackend(engine=engine)
+
+    financial = backend.query("""
+    SELECT
+        SUM(INVENTORY_VALUE) as TOTAL_INVENTORY,
+        COUNT(DISTINCT PLANT_ID) as TOTAL_PLANTS
+    FROM FINANCIAL_KPIS
+    """)
+    assert list(financial.columns) == ['TOTAL_INVENTORY', 'TOTAL_PLANTS']
+    assert financial.iloc[0]['TOTAL_PLANTS'] == 4
+    assert financial.iloc[0]['TOTAL_INVENTORY'] == 56300000
+
+    efficiency = backend.query("""
+    SELECT PLANT_ID, AVG(EFFICIENCY_PERCENT) as AVG_EFFICIENCY
+    FROM PRODUCTION
+    GROUP BY PLANT_ID
+    ORDER BY AVG_EFFICIENCY DESC
+    """)
+    assert efficiency.iloc[0]['PLANT_ID'] == 'PLANT_002'
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_local_backend_loads_cortex_views(engine):
+    """04_cortex.sql views load, the Cortex smoke test is skipped"""
+    backend = LocalBackend(engine=engine)
+    risk = backend.query("SELECT * FROM SUPPLIER_RISK")
+    assert risk.iloc[0]['RISK_CATEGORY'] == 'HIGH_RISK'
+
+
+def test_translate_statement_skips_snowflake_only_statements():
+    assert translate_statement("USE WAREHOUSE DEMO_WH", 'sqlite') == []
+    assert translate_statement("CREATE WAREHOUSE IF NOT EXISTS DEMO_WH", 'duckdb') == []
+    assert translate_statement("CREATE OR REPLACE TABLE T (A STRING)", 'sqlite') == [
+        "DROP TABLE IF EXISTS T",
+        "CREATE TABLE T (A TEXT)",
+    ]
+    assert translate_statement("INSERT INTO S SELECT * FROM T AT(STREAM => 'T_CHANGES') t", 'duckdb') == [
+        "INSERT INTO S SELECT * FROM T t"
+    ]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_iter_batches_streams_arrow(engine):
+    """Batches are Arrow record batches with Snowflake-style column names"""
+    backend = LocalBackend(engine=engine)
+    batches = list(backend.iter_batches("SELECT * FROM inventory", batch_size=3))
+
+    assert [batch.num_rows for batch in batches] == [3, 3, 2]
+    assert batches[0].schema.names[:3] == ['ITEM_ID', 'ITEM_NAME', 'PLANT_ID']
+    assert backend.query_arrow("SELECT * FROM inventory").num_rows == 8
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_atomic_block_rolls_back_every_write(engine):
+    """A failed block leaves the tables and their change tokens as they were"""
+    backend = LocalBackend(engine=engine)
+    before = backend.change_tokens(['INVENTORY'])
+    rows = backend.query("SELECT * FROM INVENTORY WHERE ITEM_ID = 'INV_001'")
+    with pytest.raises(RuntimeError):
+        with backend.atomic():
+            backend.execute("DELETE FROM INVENTORY WHERE ITEM_ID = ?", ['INV_001'])
+            with backend.atomic():
+                backend.insert_rows('INVENTORY', rows.assign(ITEM_ID='INV_100'))
+            raise RuntimeError("failed after the writes")
+
+    assert backend.query("SELECT ITEM_ID FROM INVENTORY WHERE ITEM_ID IN ('INV_001', 'INV_100')")['ITEM_ID'].tolist() == ['INV_001']
+    assert backend.change_tokens(['INVENTORY']) == before
+
+    with backend.atomic():
+        backend.insert_rows('INVENTORY', rows.assign(ITEM_ID='INV_100'))
+    assert backend.change_tokens(['INVENTORY']) != before
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+Smoke test for the benchmark suite at a tiny scale
+"""
+from benchmark import build_database, run_benchmarks
+
+
+def test_benchmark_reports_every_scenario(tmp_path):
+    db_path = str(tmp_path / 'bench.sqlite')
+    backend = build_database(db_path, engine='sqlite', plants=5, days=20, suppliers=10)
+    assert backend.query("SELECT COUNT(*) as N FROM PRODUCTION_SUMMARY").iloc[0]['N'] == 5
+
+    results = run_benchmarks(db_path, engine='sqlite', iterations=1)
+    assert [r['scenario'] for r in results] == [
+        'executive_dashboard', 'executive_dashboard_30d', 'explorer_inventory', 'explorer_production',
+        'explorer_suppliers', 'explorer_financial', 'ai_assistant', 'ai_assistant_routed',
+    ]
+    assert all(r['p50_ms'] > 0 and r['queries_per_run'] >= 0 for r in results)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests for background cache warming
+"""
+import time
+from backends import LocalBackend
+from cache_warmer import CacheWarmer
+from query_cache import QueryCache
+
+PRODUCTION_QUERY = "SELECT SUM(QUANTITY) AS TOTAL FROM PRODUCTION"
+
+
+def warm_setup(jobs=None):
+    backend = LocalBackend()
+    cache = QueryCache(backend, check_interval=0)
+    warmer = CacheWarmer(cache, jobs or {'production': lambda run_query: run_query(PRODUCTION_QUERY)})
+    cache.refresher = warmer
+    return backend, cache, warmer
+
+
+def total(result):
+    return int(result.iloc[0]['TOTAL'])
+
+
+def test_warm_results_are_served_stale_until_the_next_pass():
+    backend, cache, warmer = warm_setup()
+    warmer.refresh()
+    before = total(cache.get_or_run(PRODUCTION_QUERY))
+    assert warmer.stats['refreshed'] == 1
+
+    backend.execute("UPDATE PRODUCTION SET QUANTITY = QUANTITY + 10")
+    cache.refresh_tokens()
+    # A reader never runs the warm query itself - it gets the old result and wakes the warmer
+    assert total(cache.get_or_run(PRODUCTION_QUERY, run=None)) == before
+    assert cache.stats['stale'] == 1
+    assert warmer._wake.is_set()
+
+    warmer.refresh()
+    assert total(cache.get_or_run(PRODUCTION_QUERY)) > before
+    assert warmer.stats['refreshed'] == 2
+
+
+def test_tokens_are_published_after_the_pass():
+    backend, cache, warmer = warm_setup()
+    warmer.refresh()
+    version = cache.data_version()
+
+    backend.execute("DELETE FROM PRODUCTION WHERE PRODUCTION_ID = 'PROD_001'")
+    # Readers keep the published version even though the check interval has passed
+    assert cache.data_version() == version
+    warmer.refresh()
+    assert cache.data_version() != version
+
+    # Nothing changed since - the pass re-runs nothing
+    warmer.refresh()
+    assert warmer.stats['refreshed'] == 2
+
+
+def test_failing_job_keeps_others_warm():
+    def broken(run_query):
+        raise RuntimeError("warehouse suspended")
+
+    _, cache, warmer = warm_setup({'broken': broken,
+                                   'production': lambda run_query: run_query(PRODUCTION_QUERY)})
+    warmer.refresh()
+    assert warmer.stats['errors'] == 1
+    assert isinstance(warmer.last_error, RuntimeError)
+    cache.get_or_run(PRODUCTION_QUERY, run=None)
+    assert cache.stats['hits'] == 1
+
+
+def test_thread_runs_passes_until_stopped():
+    _, cache, warmer = warm_setup()
+    warmer.interval = 3600
+    warmer.start()
+    try:
+        assert cache.refresher is warmer
+        warmer.wake()
+        for _ in range(200):
+            if warmer.stats['passes'] >= 2:
+                break
+            time.sleep(0.01)
+        assert warmer.stats['passes'] >= 2
+    finally:
+        warmer.stop()
+    assert cache.refresher is None
+
+
+def test_idle_warmer_pauses_until_touched():
+    _, cache, warmer = warm_setup()
+    warmer.interval = 0.01
+    warmer.idle_after = 0.05
+    warmer.start()
+    try:
+        for _ in range(200):
+            if warmer.stats['paused']:
+                break
+            time.sleep(0.01)
+        assert warmer.stats['paused']
+        # No token reads while nobody is looking
+        passes = warmer.stats['passes']
+        time.sleep(0.1)
+        assert warmer.stats['passes'] == passes
+
+        warmer.touch()
+        for _ in range(200):
+            if warmer.stats['passes'] > passes:
+                break
+            time.sleep(0.01)
+        assert warmer.stats['passes'] > passes
+    finally:
+        warmer.stop()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for chart downsampling and the figure cache
+"""
+import pandas as pd
+import pytest
+from chart_data import FigureCache, chart_series, top_n_with_other
+
+REGIONS = pd.Series({f"P{i:03d}": ('North' if i % 2 else 'South') for i in range(50)})
+
+
+def plants(value, weight=None):
+    frame = pd.DataFrame({'PLANT_ID': REGIONS.index, value: [float(i) for i in range(50)]})
+    if weight:
+        frame[weight] = [1 + i % 3 for i in range(50)]
+    return frame
+
+
+def test_top_n_keeps_largest_and_sums_the_rest():
+    series = top_n_with_other(plants('INVENTORY_VALUE'), 'INVENTORY_VALUE', 5)
+    assert list(series['PLANT_ID'][:5]) == ['P049', 'P048', 'P047', 'P046', 'P045']
+    assert series.iloc[-1]['PLANT_ID'] == 'Other (45 plants)'
+    assert series.iloc[-1]['INVENTORY_VALUE'] == sum(range(45))
+    assert series['INVENTORY_VALUE'].sum() == sum(range(50))
+
+
+def test_small_plant_counts_are_drawn_as_is():
+    frame = plants('INVENTORY_VALUE').head(8)
+    series, x = chart_series(frame, REGIONS, 'INVENTORY_VALUE', max_bars=20)
+    assert x == 'PLANT_ID'
+    assert len(series) == 8
+
+
+def test_large_plant_counts_roll_up_to_regions_with_weighted_means():
+    frame = plants('AVG_EFFICIENCY', weight='EFFICIENCY_COUNT')
+    series, x = chart_series(frame, REGIONS, 'AVG_EFFICIENCY', weight='EFFICIENCY_COUNT', max_bars=20)
+    assert x == 'REGION'
+    north = frame[frame['PLANT_ID'].map(REGIONS) == 'North']
+    expected = (north['AVG_EFFICIENCY'] * north['EFFICIENCY_COUNT']).sum() / north['EFFICIENCY_COUNT'].sum()
+    row = series.set_index('REGION').loc['North']
+    assert row['AVG_EFFICIENCY'] == pytest.approx(expected)
+    assert row['PLANTS'] == 25
+
+
+def test_region_drill_down_is_capped():
+    series, x = chart_series(plants('INVENTORY_VALUE'), REGIONS, 'INVENTORY_VALUE', max_bars=10, region='South')
+    assert x == 'PLANT_ID'
+    assert len(series) == 11
+    assert series['PLANTS'].sum() == 25
+    assert series['INVENTORY_VALUE'].sum() == sum(range(0, 50, 2))
+
+
+def test_figure_cache_builds_once_per_key():
+    cache = FigureCache(max_entries=1)
+    builds = []
+
+    def build():
+        import plotly.graph_objects as go
+        builds.append(1)
+        return go.Figure(go.Bar(x=['a'], y=[1]))
+
+    figure, size, hit = cache.get_or_build(('inventory', 'v1'), build)
+    assert not hit and size > 0
+    assert cache.get_or_build(('inventory', 'v1'), build) == (figure, size, True)
+    cache.get_or_build(('inventory', 'v2'), build)
+    cache.get_or_build(('inventory', 'v1'), build)
+    assert len(builds) == 3
+    assert cache.stats == {'hits': 1, 'misses': 3}
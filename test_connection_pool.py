@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for the Snowflake connection pool
+"""
+import pytest
+from connection_pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    """Just enough of a DB-API connection for the pool"""
+
+    def __init__(self):
+        self.closed = False
+        self.fail_next = False
+
+    def is_closed(self):
+        return self.closed
+
+    def close(self):
+        self.closed = True
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query):
+        if self.conn.closed or self.conn.fail_next:
+            raise ConnectionError("connection reset")
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+
+def test_pool_reuses_connections():
+    created = []
+    pool = ConnectionPool(lambda: created.append(FakeConnection()) or created[-1], size=2)
+
+    for _ in range(5):
+        with pool.connection():
+            pass
+
+    assert len(created) == 1
+
+
+def test_pool_is_bounded():
+    pool = ConnectionPool(FakeConnection, size=1, timeout=0.05)
+
+    with pool.connection():
+        with pytest.raises(PoolTimeout):
+            with pool.connection():
+                pass
+
+
+def test_run_reconnects_after_dropped_connection():
+    created = []
+    pool = ConnectionPool(lambda: created.append(FakeConnection()) or created[-1], size=2)
+
+    with pool.connection() as conn:
+        pass
+    conn.closed = True  # server dropped it while idle
+
+    def work(conn):
+        conn.cursor().execute("SELECT 1")
+        return "ok"
+
+    assert pool.run(work) == "ok"
+    assert len(created) == 2
+
+
+def test_run_retries_when_connection_dies_mid_query():
+    created = []
+    pool = ConnectionPool(lambda: created.append(FakeConnection()) or created[-1], size=2)
+
+    def work(conn):
+        if len(created) == 1:
+            conn.close()
+            raise ConnectionError("connection reset")
+        return "ok"
+
+    assert pool.run(work) == "ok"
+    assert len(created) == 2
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tests for the AI Assistant retrieval context
+"""
+from backends import LocalBackend
+from context_index import ContextIndex
+
+
+def make_index(max_chars=1500):
+    backend = LocalBackend(engine='sqlite')
+    queries = []
+
+    def run_query(query):
+        queries.append(query)
+        return backend.query(query)
+
+    return ContextIndex(run_query, max_chars=max_chars), queries
+
+
+def test_named_plant_and_supplier_are_selected():
+    index, _ = make_index()
+
+    context = index.context_for("How is Europe Center doing on efficiency?", 'v1')
+    assert context.startswith("- Overview: 4 plants")
+    assert "Europe Center (PLANT_002, Europe, Germany): inventory $109,360" in context
+    assert "avg efficiency 93.8%" in context
+    assert "Supplier" not in context
+
+    context = index.context_for("What is the risk for Asia Components Ltd?", 'v1')
+    assert "Supplier Asia Components Ltd (Singapore): performance 89.2, risk 4.2 (HIGH_RISK)" in context
+
+
+def test_context_respects_the_budget():
+    index, _ = make_index(max_chars=300)
+
+    context = index.context_for("Show inventory for every category", 'v1')
+    assert len(context) <= 300
+    assert context.count('\n') >= 1
+
+
+def test_index_rebuilds_only_when_the_data_version_changes():
+    index, queries = make_index()
+
+    index.context_for("Which plant is most efficient?", 'v1')
+    built = len(queries)
+    index.context_for("Which suppliers are risky?", 'v1')
+    assert len(queries) == built
+
+    index.context_for("Which suppliers are risky?", 'v2')
+    assert len(queries) == 2 * built
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for the single-statement executive dashboard query
+"""
+import datetime
+import pandas as pd
+import pytest
+from backends import HAS_DUCKDB, LocalBackend
+from dashboard_data import (load_dashboard_data, load_date_bounds, load_production_trend, rollup_segments,
+                            split_dashboard_result)
+from synthetic_data import SyntheticData, build_local_database
+
+ENGINES = ['sqlite'] + (['duckdb'] if HAS_DUCKDB else [])
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_dashboard_query_matches_separate_queries(engine):
+    """The batched statement returns what the three original queries did"""
+    backend = LocalBackend(engine=engine)
+    queries = []
+
+    def run_query(query):
+        queries.append(query)
+        return backend.query(query)
+
+    dashboard = load_dashboard_data(run_query)
+    assert len(queries) == 1
+
+    financial = dashboard['financial']
+    assert int(financial.iloc[0]['TOTAL_PLANTS']) == 4
+    assert financial.iloc[0]['TOTAL_INVENTORY'] == 56300000
+
+    inventory = backend.query("""
+    SELECT PLANT_ID, SUM(CURRENT_STOCK * UNIT_COST) as INVENTORY_VALUE
+    FROM INVENTORY GROUP BY PLANT_ID ORDER BY INVENTORY_VALUE DESC
+    """)
+    assert list(dashboard['inventory']['PLANT_ID']) == list(inventory['PLANT_ID'])
+    assert list(dashboard['inventory']['INVENTORY_VALUE']) == pytest.approx(list(inventory['INVENTORY_VALUE']))
+
+    efficiency = dashboard['production']
+    assert list(efficiency.columns) == ['PLANT_ID', 'AVG_EFFICIENCY', 'EFFICIENCY_COUNT']
+    assert efficiency.iloc[0]['PLANT_ID'] == 'PLANT_002'
+
+
+def test_split_empty_result_gives_empty_panels():
+    frames = split_dashboard_result(pd.DataFrame())
+    assert all(frame.empty for frame in frames.values())
+
+
+def test_rollup_segments_tile_the_range():
+    d = datetime.date
+    assert rollup_segments(d(2024, 1, 15), d(2024, 4, 10)) == (
+        (d(2024, 1, 15), d(2024, 1, 31)), (d(2024, 2, 1), d(2024, 3, 1)), (d(2024, 4, 1), d(2024, 4, 10))
+    )
+    assert rollup_segments(d(2024, 2, 1), d(2024, 2, 29)) == ((None, None), (d(2024, 2, 1), d(2024, 2, 1)), (None, None))
+    assert rollup_segments(d(2024, 8, 3), d(2024, 9, 1)) == ((d(2024, 8, 3), d(2024, 9, 1)), (None, None), (None, None))
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_date_range_dashboard_matches_base_tables(engine, tmp_path):
+    data = SyntheticData(plants=4, suppliers=5, days=200, lines_per_plant=2)
+    backend = build_local_database(data, str(tmp_path / f"range.{engine}"), engine=engine)
+    run_query = backend.query
+    first, last = load_date_bounds(run_query)
+    assert (last - first).days == 199
+
+    for start, end in [(last - datetime.timedelta(days=29), last), (first, last),
+                       (datetime.date(2024, 3, 20), datetime.date(2024, 6, 30))]:
+        dashboard = load_dashboard_data(run_query, (start, end))
+        expected = backend.query("""
+        SELECT PLANT_ID, AVG(EFFICIENCY_PERCENT) as AVG_EFFICIENCY FROM PRODUCTION
+        WHERE PRODUCTION_DATE BETWEEN ? AND ? GROUP BY PLANT_ID ORDER BY AVG_EFFICIENCY DESC
+        """, [start.isoformat(), end.isoformat()])
+        assert list(dashboard['production']['PLANT_ID']) == list(expected['PLANT_ID'])
+        assert list(dashboard['production']['AVG_EFFICIENCY']) == pytest.approx(list(expected['AVG_EFFICIENCY']))
+
+    grain, trend = load_production_trend(run_query, (last - datetime.timedelta(days=29), last))
+    assert grain == 'DAY' and len(trend) == 30
+    assert trend['TOTAL_QUANTITY'].sum() == backend.query(
+        "SELECT SUM(QUANTITY) as Q FROM PRODUCTION WHERE PRODUCTION_DATE >= ?",
+        [(last - datetime.timedelta(days=29)).isoformat()]
+    ).iloc[0]['Q']
+
+
+def test_range_binds_are_normalised():
+    backend = LocalBackend()
+    calls = []
+
+    def run_query(query, params=None):
+        calls.append(params)
+        return backend.query(query, params)
+
+    date_range = (datetime.date(2024, 8, 3), datetime.date(2024, 9, 1))
+    load_dashboard_data(run_query, date_range)
+    load_production_trend(run_query, date_range)
+    # ISO strings and NULLs only, the same as every other registered statement
+    assert calls[0] == ['2024-08-01', '2024-09-01', '2024-08-03', '2024-09-01', None, None, None, None]
+    assert calls[1] == ['DAY', '2024-08-03', '2024-09-01']
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for Data Explorer keyset pagination
+"""
+import datetime
+import pytest
+from backends import HAS_DUCKDB, LocalBackend
+from explorer_data import EXPLORER_TABLES, keyset_predicate, order_clause, page_query, row_key, summary_query
+
+ENGINES = ['sqlite'] + (['duckdb'] if HAS_DUCKDB else [])
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('table_name', list(EXPLORER_TABLES))
+def test_pages_cover_table_in_order(engine, table_name):
+    """Walking every page returns each row once, in the full-scan order"""
+    backend = LocalBackend(engine=engine)
+    spec = EXPLORER_TABLES[table_name]
+    expected = backend.query(f"SELECT * FROM {spec['table']} ORDER BY {order_clause(spec['order_by'])}")
+
+    rows, after = [], None
+    while True:
+        page = backend.query(*page_query(spec, 3, after))
+        rows.extend(page.head(3).itertuples(index=False, name=None))
+        if len(page) <= 3:
+            break
+        after = row_key(spec, page.iloc[2])
+
+    assert rows == list(expected.itertuples(index=False, name=None))
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_summary_metrics_are_sql_aggregates(engine):
+    backend = LocalBackend(engine=engine)
+    summary = backend.query(*summary_query(EXPLORER_TABLES['Suppliers']))
+    assert summary.iloc[0]['ROW_COUNT'] == 5
+    assert summary.iloc[0]['METRIC_VALUE'] == 1
+
+
+def test_cursor_values_are_bound_not_interpolated():
+    where, params = keyset_predicate([('SUPPLIER_NAME', 'ASC'), ('SUPPLIER_ID', 'ASC')], ("O'Brien Steel", 'SUP_009'))
+    assert where == ("(SUPPLIER_NAME > ? OR SUPPLIER_NAME IS NULL) OR "
+                     "(SUPPLIER_NAME = ? AND (SUPPLIER_ID > ? OR SUPPLIER_ID IS NULL))")
+    assert params == ["O'Brien Steel", "O'Brien Steel", 'SUP_009']
+
+    first, _ = page_query(EXPLORER_TABLES['Suppliers'], 25, ('4.2', "SUP_'1"))
+    second, _ = page_query(EXPLORER_TABLES['Suppliers'], 25, ('1.5', 'SUP_002'))
+    assert first == second
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_pages_reach_the_end_past_null_keys(engine):
+    """Suppliers without a risk score sort last and are still paged through"""
+    backend = LocalBackend(engine=engine)
+    backend.execute("UPDATE SUPPLIERS SET RISK_SCORE = NULL WHERE SUPPLIER_ID IN ('SUP_001', 'SUP_003', 'SUP_004')")
+    spec = EXPLORER_TABLES['Suppliers']
+
+    ids, after = [], None
+    while True:
+        page = backend.query(*page_query(spec, 2, after))
+        ids.extend(page['SUPPLIER_ID'].head(2))
+        if len(page) <= 2:
+            break
+        after = row_key(spec, page.iloc[1])
+
+    assert len(ids) == 5
+    assert ids[2:] == ['SUP_001', 'SUP_003', 'SUP_004']
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_date_range_pages_only_cover_the_range(engine):
+    backend = LocalBackend(engine=engine)
+    spec = EXPLORER_TABLES['Production']
+    date_range = (datetime.date(2024, 9, 1), datetime.date(2024, 9, 1))
+    expected = backend.query("SELECT * FROM PRODUCTION WHERE PRODUCTION_DATE = '2024-09-01' "
+                             "ORDER BY PRODUCTION_DATE DESC, PRODUCTION_ID ASC")
+
+    first = backend.query(*page_query(spec, 1, date_range=date_range))
+    second = backend.query(*page_query(spec, 1, row_key(spec, first.iloc[0]), date_range))
+    assert [first.iloc[0]['PRODUCTION_ID'], second.iloc[0]['PRODUCTION_ID']] == list(expected['PRODUCTION_ID'][:2])
+
+    summary = backend.query(*summary_query(spec, date_range))
+    assert summary.iloc[0]['ROW_COUNT'] == len(expected)
+    # Undated tables ignore the range
+    assert page_query(EXPLORER_TABLES['Suppliers'], 25, date_range=date_range)[1] is None
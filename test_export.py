@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for streaming explorer exports
+"""
+import datetime
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from backends import HAS_DUCKDB, LocalBackend
+from explorer_data import EXPLORER_TABLES, table_query
+from export import export_query, prune_exports, write_batches
+
+ENGINES = ['sqlite'] + (['duckdb'] if HAS_DUCKDB else [])
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('fmt', ['Parquet', 'CSV'])
+def test_export_streams_the_filtered_table(engine, fmt, tmp_path):
+    backend = LocalBackend(engine=engine)
+    spec = EXPLORER_TABLES['Production']
+    date_range = (datetime.date(2024, 9, 1), datetime.date(2024, 9, 1))
+    query, params = table_query(spec, date_range)
+    expected = backend.query(query, params)
+
+    progress = []
+    path = str(tmp_path / f"production.{fmt.lower()}")
+    rows = export_query(backend, query, path, fmt, params=params, batch_size=2, progress=progress.append)
+
+    assert rows == len(expected) and 0 < rows < len(backend.query("SELECT * FROM PRODUCTION"))
+    assert progress == [min(n, rows) for n in range(2, rows + 2, 2)]
+    exported = pq.read_table(path).to_pandas() if fmt == 'Parquet' else pd.read_csv(path)
+    assert list(exported['PRODUCTION_ID']) == list(expected['PRODUCTION_ID'])
+
+
+def test_later_batches_are_cast_to_the_first_schema(tmp_path):
+    schema = pa.schema([('PLANT_ID', pa.string()), ('QUANTITY', pa.float64())])
+    batches = [
+        pa.RecordBatch.from_pydict({'PLANT_ID': ['P1'], 'QUANTITY': [1.5]}, schema=schema),
+        pa.RecordBatch.from_pydict({'PLANT_ID': ['P2'], 'QUANTITY': pa.array([2], pa.int64())}),
+    ]
+    path = str(tmp_path / 'mixed.parquet')
+    assert write_batches(iter(batches), path) == 2
+    assert pq.read_table(path).column('QUANTITY').to_pylist() == [1.5, 2.0]
+
+
+@pytest.mark.parametrize('fmt', ['Parquet', 'CSV'])
+def test_null_first_page_takes_its_type_from_later_pages(fmt, tmp_path):
+    backend = LocalBackend(engine='sqlite')
+    backend.execute("UPDATE SUPPLIERS SET COUNTRY = NULL WHERE SUPPLIER_ID IN ('SUP_001', 'SUP_002')")
+    query = "SELECT SUPPLIER_ID, COUNTRY, RISK_SCORE FROM SUPPLIERS ORDER BY SUPPLIER_ID"
+    path = str(tmp_path / f"suppliers.{fmt.lower()}")
+
+    # The first page's COUNTRY is all NULL, so it arrives typed null
+    assert pa.types.is_null(next(backend.iter_batches(query, batch_size=2)).schema.field('COUNTRY').type)
+    assert export_query(backend, query, path, fmt, batch_size=2) == 5
+
+    exported = pq.read_table(path) if fmt == 'Parquet' else pa.Table.from_pandas(pd.read_csv(path))
+    countries = exported.column('COUNTRY').to_pylist()
+    assert countries[:2] == [None, None] and all(isinstance(country, str) for country in countries[2:])
+
+
+def test_failed_export_leaves_no_file(tmp_path):
+    def batches():
+        yield pa.RecordBatch.from_pydict({'A': [1]})
+        raise RuntimeError("connection lost")
+
+    path = str(tmp_path / 'broken.csv')
+    with pytest.raises(RuntimeError):
+        write_batches(batches(), path, 'CSV')
+    assert os.listdir(tmp_path) == []
+
+
+def test_old_exports_are_pruned(tmp_path):
+    old, new = tmp_path / 'old.csv', tmp_path / 'new.csv'
+    old.write_text('A\n1\n')
+    new.write_text('A\n2\n')
+    os.utime(old, (0, 0))
+    assert prune_exports(str(tmp_path), max_age=3600) == 1
+    assert os.listdir(tmp_path) == ['new.csv']
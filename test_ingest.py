@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Tests for the bulk ingestion pipeline
+"""
+import queue
+import threading
+import pandas as pd
+import pytest
+from backends import HAS_DUCKDB, LocalBackend
+from ingest import TABLE_SCHEMAS, IngestPipeline, Loader, LocalLoader, WarehouseLoader, batch_id_for, ingest_files, validate
+
+ENGINES = ['sqlite'] + (['duckdb'] if HAS_DUCKDB else [])
+
+TELEMETRY = pd.DataFrame({
+    'PRODUCTION_ID': ['PROD_900', 'PROD_901', 'PROD_902', None, 'PROD_904'],
+    'PLANT_ID': ['PLANT_001', 'PLANT_002', 'PLANT_001', 'PLANT_003', 'PLANT_004'],
+    'PRODUCT_NAME': ['Motor Assembly'] * 5,
+    'PRODUCTION_DATE': ['2024-09-02', '2024-09-02', 'not a date', '2024-09-02', '2024-09-03'],
+    'QUANTITY': [100, '250', 80, 90, 'lots'],
+    'EFFICIENCY_PERCENT': [91.5, 88, 90, 92, 95],
+})
+
+
+def summary(backend, plant_id):
+    return backend.query("SELECT * FROM PRODUCTION_SUMMARY WHERE PLANT_ID = ?", [plant_id]).iloc[0]
+
+
+def test_schema_comes_from_02_tables():
+    assert list(TABLE_SCHEMAS['PRODUCTION']) == [
+        'PRODUCTION_ID', 'PLANT_ID', 'PRODUCT_NAME', 'PRODUCTION_DATE', 'QUANTITY', 'EFFICIENCY_PERCENT'
+    ]
+    assert TABLE_SCHEMAS['PRODUCTION']['PRODUCTION_DATE'] == 'DATE'
+
+
+def test_validate_coerces_and_rejects():
+    valid, rejected = validate('PRODUCTION', TELEMETRY.assign(EXTRA=1))
+    assert valid['PRODUCTION_ID'].tolist() == ['PROD_900', 'PROD_901']
+    assert valid['QUANTITY'].tolist() == [100, 250]
+    assert 'EXTRA' not in valid.columns
+    assert rejected['REJECT_REASON'].tolist() == [
+        'PRODUCTION_DATE: not a valid DATE', 'PRODUCTION_ID: required', 'QUANTITY: not a valid NUMBER'
+    ]
+    with pytest.raises(ValueError, match='missing columns'):
+        validate('PRODUCTION', TELEMETRY.drop(columns=['QUANTITY']))
+
+
+def test_batch_ids_follow_content():
+    assert batch_id_for('PRODUCTION', TELEMETRY) == batch_id_for('PRODUCTION', TELEMETRY.copy())
+    assert batch_id_for('PRODUCTION', TELEMETRY) != batch_id_for('PRODUCTION', TELEMETRY.head(2))
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_pipeline_loads_once_and_maintains_summaries(engine):
+    backend = LocalBackend(engine=engine)
+    before = summary(backend, 'PLANT_001')
+
+    with IngestPipeline(backend, batch_rows=1000) as pipeline:
+        pipeline.submit('PRODUCTION', TELEMETRY)
+        pipeline.submit('production', TELEMETRY)   # replay
+        pipeline.drain()
+        pipeline.submit('PRODUCTION', TELEMETRY)   # replay after it landed
+
+    metrics = pipeline.metrics.snapshot()
+    assert metrics['rows_loaded'] == 2 and metrics['rows_rejected'] == 3
+    assert metrics['batches_loaded'] == 1 and metrics['batches_skipped'] == 2
+    assert backend.fetch("SELECT COUNT(*) FROM PRODUCTION WHERE PRODUCTION_ID LIKE 'PROD_90%'")[1][0][0] == 2
+    after = summary(backend, 'PLANT_001')
+    assert after['TOTAL_QUANTITY'] == before['TOTAL_QUANTITY'] + 100
+    assert after['PRODUCTION_COUNT'] == before['PRODUCTION_COUNT'] + 1
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_inventory_readings_upsert(engine):
+    backend = LocalBackend(engine=engine)
+    item = backend.query("SELECT * FROM INVENTORY WHERE ITEM_ID = 'INV_001'")
+    items_before = backend.fetch("SELECT COUNT(*) FROM INVENTORY")[1][0][0]
+    readings = pd.concat([item.assign(CURRENT_STOCK=5), item.assign(CURRENT_STOCK=7)], ignore_index=True)
+
+    with IngestPipeline(backend) as pipeline:
+        pipeline.submit('INVENTORY', readings)
+
+    assert backend.fetch("SELECT COUNT(*) FROM INVENTORY")[1][0][0] == items_before
+    assert backend.fetch("SELECT CURRENT_STOCK FROM INVENTORY WHERE ITEM_ID = 'INV_001'")[1] == [(7,)]
+    stock = backend.fetch("SELECT SUM(CURRENT_STOCK) FROM INVENTORY WHERE PLANT_ID = ? AND CATEGORY = ?",
+                          [item['PLANT_ID'][0], item['CATEGORY'][0]])[1][0][0]
+    summarised = backend.fetch("SELECT TOTAL_STOCK FROM INVENTORY_SUMMARY WHERE PLANT_ID = ? AND CATEGORY = ?",
+                               [item['PLANT_ID'][0], item['CATEGORY'][0]])[1][0][0]
+    assert summarised == stock
+    assert pipeline.metrics.snapshot()['rows_rejected'] == 1   # the superseded reading
+
+
+def test_files_replay_is_a_no_op(tmp_path):
+    backend = LocalBackend(engine='sqlite')
+    path = str(tmp_path / 'telemetry.csv')
+    TELEMETRY.head(2).to_csv(path, index=False)
+
+    with IngestPipeline(backend) as pipeline:
+        ingest_files(pipeline, 'PRODUCTION', [path, path], chunk_rows=1)
+    assert pipeline.metrics.snapshot()['batches_skipped'] == 2
+    assert backend.fetch("SELECT COUNT(*) FROM INGEST_BATCHES")[1][0][0] == 2
+
+
+class SlowLoader(Loader):
+    def __init__(self, backend):
+        super().__init__(backend)
+        self.release = threading.Event()
+
+    def loaded(self, batch_ids):
+        self.release.wait(5)
+        return set()
+
+    def load(self, table, frame, batch_counts):
+        pass
+
+
+def test_submit_applies_back_pressure():
+    backend = LocalBackend(engine='sqlite')
+    loader = SlowLoader(backend)
+    with IngestPipeline(backend, batch_rows=1, max_pending=1, loader=loader) as pipeline:
+        pipeline.submit('PRODUCTION', TELEMETRY.head(1))   # picked up, loader blocks
+        pipeline.submit('PRODUCTION', TELEMETRY.iloc[1:2])  # fills the queue
+        with pytest.raises(queue.Full):
+            pipeline.submit('PRODUCTION', TELEMETRY.iloc[2:3], timeout=0.1)
+        loader.release.set()
+
+
+class CrashingBackend(LocalBackend):
+    """Fails the first multi-statement transaction after all but its last statement ran"""
+    crashed = False
+
+    def transaction(self, statements):
+        if not self.crashed and len(statements) > 1:
+            self.crashed = True
+            statements = statements[:-1] + [("SELECT NO_SUCH_COLUMN FROM PLANTS", None)]
+        return super().transaction(statements)
+
+
+class StagedLoader(WarehouseLoader):
+    """WarehouseLoader with local inserts in place of write_pandas"""
+
+    def write(self, table, frame):
+        self.backend.insert_rows(table, frame)
+
+    def ensure_staging(self, table, columns):
+        self.backend.execute(f"CREATE TABLE IF NOT EXISTS {table}_INGEST AS "
+                             f"SELECT CAST(NULL AS TEXT) AS LOAD_ID, * FROM {table} WHERE 1 = 0")
+
+
+def test_warehouse_batch_is_recorded_in_the_same_transaction():
+    backend = CrashingBackend(engine='sqlite')
+    loader = StagedLoader(backend)
+    valid, _ = validate('PRODUCTION', TELEMETRY)
+    batch_id = batch_id_for('PRODUCTION', valid)
+    count = "SELECT COUNT(*) FROM PRODUCTION"
+    before = backend.fetch(count)[1][0][0]
+
+    # Crash after the move and the batch record ran - neither is kept
+    with pytest.raises(Exception):
+        loader.load('PRODUCTION', valid, {batch_id: len(valid)})
+    assert backend.crashed
+    assert backend.fetch(count)[1][0][0] == before
+    assert loader.loaded([batch_id]) == set()
+
+    loader.load('PRODUCTION', valid, {batch_id: len(valid)})
+    assert backend.fetch(count)[1][0][0] == before + len(valid)
+    assert loader.loaded([batch_id]) == {batch_id}
+    assert backend.fetch("SELECT COUNT(*) FROM PRODUCTION_INGEST")[1][0][0] == 0
+
+
+class FailingRecordLoader(LocalLoader):
+    """Fails the first batch record, after the upsert and the summary changes ran"""
+    failed = False
+
+    def write(self, table, frame):
+        if table == 'INGEST_BATCHES' and not self.failed:
+            self.failed = True
+            raise RuntimeError("batch record failed")
+        super().write(table, frame)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_local_upsert_is_recorded_in_the_same_transaction(engine):
+    backend = LocalBackend(engine=engine)
+    loader = FailingRecordLoader(backend)
+    item = backend.query("SELECT * FROM INVENTORY WHERE ITEM_ID = 'INV_001'")
+    valid, _ = validate('INVENTORY', item.assign(CURRENT_STOCK=7))
+    batch_id = batch_id_for('INVENTORY', valid)
+    stock = "SELECT CURRENT_STOCK FROM INVENTORY WHERE ITEM_ID = 'INV_001'"
+    summarised = ("SELECT TOTAL_STOCK FROM INVENTORY_SUMMARY WHERE PLANT_ID = 'PLANT_001' "
+                  "AND CATEGORY = 'Raw Materials'")
+    before = backend.fetch(summarised)[1]
+
+    with pytest.raises(RuntimeError):
+        loader.load('INVENTORY', valid, {batch_id: 1})
+    assert backend.fetch(stock)[1] == [(2500,)]
+    assert backend.fetch(summarised)[1] == before
+    assert loader.loaded([batch_id]) == set()
+
+    loader.load('INVENTORY', valid, {batch_id: 1})
+    assert backend.fetch(stock)[1] == [(7,)]
+    assert backend.fetch(summarised)[1] != before
+    assert loader.loaded([batch_id]) == {batch_id}
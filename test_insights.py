@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for bulk AI insight generation
+"""
+import pytest
+from backends import HAS_DUCKDB, LocalBackend
+from insights import InsightJob, bulk_insight_sql, load_insights
+from llm import StubLLM
+
+ENGINES = ['sqlite'] + (['duckdb'] if HAS_DUCKDB else [])
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_one_insight_per_row_tagged_with_the_data_version(engine):
+    backend = LocalBackend(engine=engine)
+    llm = StubLLM()
+    job = InsightJob(backend, llm, max_workers=4)
+
+    assert job.run('v1') == {'INVENTORY': 7, 'SUPPLIER': 5}
+    insights = load_insights(backend.query)
+    assert len(insights) == 12
+    assert set(insights['DATA_VERSION']) == {'v1'}
+
+    supplier = insights[insights['SUBJECT_KEY'] == 'Asia Components Ltd'].iloc[0]
+    assert supplier['INSIGHT_TYPE'] == 'SUPPLIER'
+    assert 'risk score 4.2, classified HIGH_RISK' in supplier['INSIGHT']
+
+    # Already current - nothing is regenerated
+    assert job.run('v1') == {}
+    assert llm.calls == 12
+
+    assert job.run('v2') == {'INVENTORY': 7, 'SUPPLIER': 5}
+    assert set(load_insights(backend.query)['DATA_VERSION']) == {'v2'}
+
+
+def test_bulk_sql_is_one_set_based_statement():
+    sql, params = bulk_insight_sql('INVENTORY', 'mixtral-8x7b', 'abc', limit=10)
+    assert params == ['INVENTORY', 'mixtral-8x7b', 'mixtral-8x7b', 'abc']
+    assert sql.count('SNOWFLAKE.CORTEX.COMPLETE(') == 1
+    assert "FROM INVENTORY_INSIGHTS" in sql
+    assert "' inventory at plant ' || COALESCE(TO_VARCHAR(PLANT_ID), 'n/a')" in sql
+    assert "LIMIT 10" in sql
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_failed_set_based_run_keeps_previous_insights(engine):
+    backend = LocalBackend(engine=engine)
+    job = InsightJob(backend, StubLLM(), max_workers=4)
+    job.run('v1')
+
+    # The set-based path, whose COMPLETE call fails on the local engine
+    backend.name = 'snowflake'
+    with pytest.raises(Exception):
+        job.run('v2')
+    insights = load_insights(backend.query)
+    assert len(insights) == 12 and set(insights['DATA_VERSION']) == {'v1'}
+
+    # The concurrent path, with the insert failing after the delete
+    backend.name = 'local'
+
+    def failing_insert(table, rows):
+        raise RuntimeError("insert failed")
+    backend.insert_rows = failing_insert
+    with pytest.raises(RuntimeError):
+        job.run('v2')
+    insights = load_insights(backend.query)
+    assert len(insights) == 12 and set(insights['DATA_VERSION']) == {'v1'}
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for query and LLM instrumentation
+"""
+import json
+import logging
+import pandas as pd
+import pytest
+from instrumentation import Instrumentation, InstrumentedLLM, result_size
+from llm import StubLLM
+
+
+def test_timed_records_latency_size_and_errors():
+    instrumentation = Instrumentation()
+    with instrumentation.timed('query', 'dashboard', cache='miss') as event:
+        event['rows'], event['bytes'] = result_size(pd.DataFrame({'A': [1, 2, 3]}))
+    with pytest.raises(ValueError):
+        with instrumentation.timed('query', 'explorer_production_summary'):
+            raise ValueError("boom")
+
+    first, second = instrumentation.events
+    assert first['rows'] == 3 and first['bytes'] == 24 and first['latency_ms'] >= 0
+    assert second['error'] == "ValueError: boom"
+    assert instrumentation.cache_stats('query') == {'miss': 1}
+
+
+def test_slowest_is_per_session():
+    instrumentation = Instrumentation()
+    for session, latency in [('a', 5), ('b', 50), ('a', 20)]:
+        instrumentation.record({'kind': 'query', 'name': 'q', 'session': session, 'latency_ms': latency})
+    assert [e['latency_ms'] for e in instrumentation.slowest(session='a')] == [20, 5]
+    assert instrumentation.slowest(1)[0]['session'] == 'b'
+
+
+def test_prometheus_exposition(tmp_path):
+    instrumentation = Instrumentation()
+    instrumentation.record({'kind': 'query', 'name': 'dashboard', 'latency_ms': 30, 'rows': 8, 'cache': 'hit'})
+    instrumentation.record({'kind': 'query', 'name': 'dashboard', 'latency_ms': 3000, 'rows': 8, 'cache': 'miss'})
+    text = instrumentation.prometheus()
+
+    assert 'manufacturing_call_duration_seconds_bucket{kind="query",name="dashboard",le="0.05"} 1' in text
+    assert 'manufacturing_call_duration_seconds_bucket{kind="query",name="dashboard",le="+Inf"} 2' in text
+    assert 'manufacturing_call_duration_seconds_count{kind="query",name="dashboard"} 2' in text
+    assert 'manufacturing_rows_total{kind="query",name="dashboard"} 16' in text
+    assert 'manufacturing_cache_requests_total{kind="query",result="hit"} 1' in text
+
+    path = tmp_path / 'metrics.prom'
+    instrumentation.write_metrics(str(path))
+    assert path.read_text() == text
+
+
+def test_events_are_logged_as_json(caplog):
+    instrumentation = Instrumentation()
+    with caplog.at_level(logging.INFO, logger='manufacturing.perf'):
+        instrumentation.record({'kind': 'llm', 'name': 'stub', 'latency_ms': 1.5})
+    assert json.loads(caplog.records[0].getMessage())['name'] == 'stub'
+
+
+def test_instrumented_llm_records_streams():
+    instrumentation = Instrumentation()
+    llm = InstrumentedLLM(StubLLM(), instrumentation)
+    answer = ''.join(llm.stream("Question: which plant?"))
+    assert llm.complete("Question: which plant?") == answer
+
+    streamed, completed = instrumentation.events
+    assert streamed['kind'] == 'llm' and streamed['name'] == 'stub'
+    assert streamed['response_chars'] == len(answer) and 'first_token_ms' in streamed
+    assert completed['prompt_chars'] == len("Question: which plant?")
+    assert llm.calls == 2
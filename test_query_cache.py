@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Tests for the data-version-aware query cache
+"""
+from backends import LocalBackend
+from query_cache import QueryCache, query_tables
+
+INVENTORY_QUERY = "SELECT PLANT_ID, SUM(CURRENT_STOCK * UNIT_COST) as INVENTORY_VALUE FROM INVENTORY GROUP BY PLANT_ID"
+PRODUCTION_QUERY = "SELECT AVG(EFFICIENCY_PERCENT) as AVG_EFFICIENCY FROM PRODUCTION"
+
+
+def counting_cache(backend):
+    runs = []
+    cache = QueryCache(backend, check_interval=0)
+
+    def run(query):
+        runs.append(query)
+        return backend.query(query)
+
+    return cache, runs, run
+
+
+def test_query_tables_ignores_column_prefixes():
+    assert query_tables("SELECT SUM(INVENTORY_VALUE) FROM FINANCIAL_KPIS") == ['FINANCIAL_KPIS']
+    assert query_tables("SELECT * FROM SUPPLIER_RISK") == ['SUPPLIERS', 'SUPPLIER_RISK_SUMMARY']
+
+
+def test_change_invalidates_only_dependent_queries():
+    backend = LocalBackend()
+    cache, runs, run = counting_cache(backend)
+
+    cache.get_or_run(INVENTORY_QUERY, run)
+    cache.get_or_run(PRODUCTION_QUERY, run)
+    cache.get_or_run(INVENTORY_QUERY, run)
+    assert len(runs) == 2
+
+    backend.execute("UPDATE INVENTORY SET CURRENT_STOCK = 0 WHERE ITEM_ID = 'INV_001'")
+
+    cache.get_or_run(PRODUCTION_QUERY, run)
+    result = cache.get_or_run(INVENTORY_QUERY, run)
+    assert runs[2:] == [INVENTORY_QUERY]
+    assert cache.stats['invalidations'] == 1
+    assert result.set_index('PLANT_ID').loc['PLANT_001', 'INVENTORY_VALUE'] == 1200 * 45 + 150 * 245
+
+
+def test_tokens_are_rechecked_only_after_interval():
+    backend = LocalBackend()
+    cache = QueryCache(backend, check_interval=3600)
+    version = cache.data_version()
+
+    backend.execute("DELETE FROM PRODUCTION WHERE PRODUCTION_ID = 'PROD_001'")
+    assert cache.data_version() == version
+
+    cache.refresh_tokens()
+    assert cache.data_version() != version
+    assert cache.data_version(['SUPPLIERS']) == QueryCache(backend).data_version(['SUPPLIERS'])
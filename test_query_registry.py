@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Tests for the named statement registry and bind variables
+"""
+import pandas as pd
+import pytest
+import dashboard_data, context_index, insights, llm  # noqa: F401 - register their statements
+from backends import HAS_DUCKDB, LocalBackend
+from query_cache import QueryCache
+from query_registry import QUERIES, bind_value, register, run_named
+
+ENGINES = ['sqlite'] + (['duckdb'] if HAS_DUCKDB else [])
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_registered_statements_run_locally(engine):
+    backend = LocalBackend(engine=engine)
+    for name, sql in QUERIES.items():
+        if '?' in sql or 'CORTEX' in sql:
+            continue
+        assert isinstance(backend.query(sql), pd.DataFrame), name
+
+    current = run_named(backend.query, 'insights_current', ['SUPPLIER', "v'1"])
+    assert current.iloc[0, 0] == 0
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_apostrophes_are_bound_safely(engine):
+    backend = LocalBackend(engine=engine)
+    backend.execute("INSERT INTO SUPPLIERS VALUES (?, ?, ?, ?, ?)", ['SUP_009', "O'Brien Steel", 'Ireland', 90, 1])
+
+    found = backend.query("SELECT SUPPLIER_ID FROM SUPPLIERS WHERE SUPPLIER_NAME = ?", ["O'Brien Steel"])
+    assert list(found['SUPPLIER_ID']) == ['SUP_009']
+
+
+def test_cache_keys_include_bind_values():
+    backend = LocalBackend(engine='sqlite')
+    cache = QueryCache(backend)
+    query = "SELECT COUNT(*) as N FROM SUPPLIERS WHERE COUNTRY = ?"
+
+    assert cache.get_or_run(query, params=['USA']).iloc[0]['N'] == 1
+    assert cache.get_or_run(query, params=['Mars']).iloc[0]['N'] == 0
+    assert cache.get_or_run(query, params=['USA']).iloc[0]['N'] == 1
+    assert cache.stats['hits'] == 1 and cache.stats['misses'] == 2
+
+
+def test_register_rejects_conflicting_text():
+    register('test_statement', "SELECT 1")
+    register('test_statement', "SELECT 1")
+    with pytest.raises(ValueError):
+        register('test_statement', "SELECT 2")
+
+
+def test_bind_values_are_plain_python():
+    assert bind_value(pd.Timestamp('2024-09-01')) == '2024-09-01'
+    assert type(bind_value(pd.Series([3]).iloc[0])) is int
+    assert bind_value(float('nan')) is None
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for routing metric questions to SQL templates
+"""
+import pytest
+from backends import HAS_DUCKDB, LocalBackend
+from question_router import QuestionRouter
+
+ENGINES = ['sqlite'] + (['duckdb'] if HAS_DUCKDB else [])
+
+
+def make_router(engine='sqlite'):
+    backend = LocalBackend(engine=engine)
+    queries = []
+
+    def run_query(query, params=None):
+        queries.append((query, params))
+        return backend.query(query, params)
+
+    return QuestionRouter(run_query), queries
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_sample_questions_are_answered_from_sql(engine):
+    router, _ = make_router(engine)
+
+    total = router.answer("What's our total inventory value across all plants?", 'v1')
+    assert total['metric'] == 'inventory_value' and total['kind'] == 'total'
+    assert "Inventory value across all plants: **$360,400**" in total['answer']
+
+    best = router.answer("Which plant has the highest production efficiency?", 'v1')
+    assert best['answer'].startswith("Europe Center (PLANT_002) has the highest average production efficiency: **93.8%**")
+
+    risky = router.answer("What suppliers pose the highest risk?", 'v1')
+    assert risky['kind'] == 'rank' and risky['limit'] == 5
+    assert "1. Asia Components Ltd (Singapore): 4.2" in risky['answer']
+
+
+def test_filters_become_bind_variables():
+    router, queries = make_router()
+
+    route = router.answer("Raw Materials inventory value in Europe", 'v1')
+    assert route['params'] == ['Europe', 'Raw Materials']
+    assert "Europe" not in route['query'] and route['query'].count('?') == 2
+    assert "$37,760" in route['answer']
+
+    route = router.answer("Top 3 plants by units produced in the last 30 days", 'v1')
+    assert route['limit'] == 3 and 'PRODUCTION_DATE BETWEEN ? AND ?' in route['query']
+    assert route['answer'].count('\n1. ') == 1 and '\n3. ' in route['answer'] and '\n4. ' not in route['answer']
+
+    route = router.answer("What was the cost savings at Europe Center?", 'v1')
+    assert route['params'] == ['PLANT_002']
+    assert "Cost savings at Europe Center (PLANT_002)" in route['answer']
+
+
+def test_open_ended_questions_go_to_the_model():
+    router, _ = make_router()
+    assert router.answer("How can we optimize our inventory levels?", 'v1') is None
+    assert router.answer("What is the weather like?", 'v1') is None
+    # Inventory is a current snapshot - a period can't be answered from it
+    assert router.answer("Inventory value last month", 'v1') is None
+    assert router.stats['llm'] == 3
+
+
+def test_question_shapes_are_resolved_once():
+    router, queries = make_router()
+    router.answer("Inventory value at Europe Center", 'v1')
+    route = router.answer("Inventory value at Asia Pacific", 'v1')
+    assert route['params'] == ['PLANT_003']
+    assert router.stats == {'routed': 2, 'llm': 0, 'shape_hits': 1, 'shape_misses': 1}
+    # Names and date bounds are loaded once per data version
+    assert len([q for q, _ in queries if 'FROM PLANTS' in q and 'JOIN' not in q]) == 1
+
+
+@pytest.mark.parametrize('question', [
+    "What is our inventory turnover?",
+    "What's the production efficiency trend?",
+    "Compare efficiency of Europe Center and Asia Pacific",
+    "Efficiency at Europe Center vs Asia Pacific",
+])
+def test_unexplained_questions_go_to_the_model(question):
+    router, _ = make_router()
+    assert router.answer(question, 'v1') is None
+    assert router.stats == {'routed': 0, 'llm': 1, 'shape_hits': 0, 'shape_misses': int('Center' not in question)}
+
+
+def test_a_plant_name_is_not_read_as_its_region():
+    router, _ = make_router()
+    router.refresh('v1')
+    filters, shape = router.entities("efficiency at asia pacific")
+    assert filters == {'plant': 'PLANT_003'} and shape == "efficiency at <PLANT>"
+    assert router.entities("efficiency of europe center and asia pacific")[0] is None
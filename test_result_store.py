@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared result store
+"""
+import os
+import threading
+import pandas as pd
+from backends import LocalBackend
+from query_cache import QueryCache
+from result_store import ArrowFileStore, RedisStore, result_key
+
+PRODUCTION_QUERY = "SELECT SUM(QUANTITY) AS TOTAL FROM PRODUCTION"
+
+
+class FakeRedis:
+    """Stand-in for a Redis client - get and set(ex=) over a dict"""
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+
+
+def frame(rows=3):
+    return pd.DataFrame({'PLANT_ID': range(rows), 'NAME': [f"Plant {i}" for i in range(rows)],
+                         'EFFICIENCY': [0.5 + i / 100 for i in range(rows)]})
+
+
+def test_file_store_round_trips_and_misses(tmp_path):
+    store = ArrowFileStore(str(tmp_path))
+    assert store.get('ab' * 32) is None
+    store.put('ab' * 32, frame())
+    pd.testing.assert_frame_equal(store.get('ab' * 32).to_pandas(), frame())
+    assert store.stats['hits'] == 1 and store.stats['misses'] == 1
+    assert not [name for name in os.listdir(tmp_path / 'ab') if name.endswith('.tmp')]
+
+
+def test_file_store_evicts_least_recently_used(tmp_path):
+    store = ArrowFileStore(str(tmp_path), max_bytes=10 ** 9)
+    keys = [f"{i:02d}" * 32 for i in range(4)]
+    for i, key in enumerate(keys):
+        store.put(key, frame(1000))
+        os.utime(store.path(key), (1000 + i, 1000 + i))
+    store.get(keys[0])  # touched - now the most recently used
+    store.max_bytes = store.size() * 0.8
+    store.evict()
+    assert store.get(keys[0]) is not None
+    assert store.get(keys[1]) is None
+    assert store.size() <= store.max_bytes
+
+
+def test_concurrent_writers_leave_a_complete_file(tmp_path):
+    store = ArrowFileStore(str(tmp_path))
+    key = 'cd' * 32
+    threads = [threading.Thread(target=store.put, args=(key, frame(5000))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.get(key).num_rows == 5000
+    assert os.listdir(tmp_path / 'cd') == [f"{key}.arrow"]
+
+
+def test_redis_store_round_trips():
+    client = FakeRedis()
+    store = RedisStore(client)
+    store.put('key', frame())
+    assert list(client.values) == ['manufacturing:result:key']
+    pd.testing.assert_frame_equal(store.get('key').to_pandas(), frame())
+    assert store.get('other') is None
+
+
+def test_keys_change_with_tokens_and_binds():
+    version = {'PRODUCTION': '10.0'}
+    key = result_key('ns', PRODUCTION_QUERY, None, version)
+    assert key == result_key('ns', PRODUCTION_QUERY, None, dict(version))
+    assert key != result_key('ns', PRODUCTION_QUERY, None, {'PRODUCTION': '11.0'})
+    assert key != result_key('ns', PRODUCTION_QUERY, [1], version)
+    assert key != result_key('other', PRODUCTION_QUERY, None, version)
+
+
+def test_replicas_share_results_through_the_store(tmp_path):
+    backend = LocalBackend()
+    store = ArrowFileStore(str(tmp_path))
+    first = QueryCache(backend, check_interval=0, shared=store, namespace='test')
+    runs = []
+
+    def run(query, params=None):
+        runs.append(query)
+        return backend.query(query, params)
+
+    expected = first.get_or_run(PRODUCTION_QUERY, run=run)
+    # A second replica (or a restart) with an empty in-process cache
+    second = QueryCache(backend, check_interval=0, shared=store, namespace='test')
+    result = second.get_or_run(PRODUCTION_QUERY, run=run)
+    assert len(runs) == 1 and second.stats['shared_hits'] == 1
+    assert int(result.iloc[0]['TOTAL']) == int(expected.iloc[0]['TOTAL'])
+
+    backend.execute("DELETE FROM PRODUCTION WHERE PRODUCTION_ID = 'PROD_001'")
+    third = QueryCache(backend, check_interval=0, shared=store, namespace='test')
+    third.get_or_run(PRODUCTION_QUERY, run=run)
+    assert len(runs) == 2
+
+
+def test_store_failures_fall_back_to_the_query(tmp_path):
+    class BrokenStore:
+        def get(self, key):
+            raise OSError("share unavailable")
+
+        def put(self, key, result):
+            raise OSError("share unavailable")
+
+    cache = QueryCache(LocalBackend(), check_interval=0, shared=BrokenStore())
+    assert int(cache.get_or_run(PRODUCTION_QUERY).iloc[0]['TOTAL']) > 0
+    assert cache.stats['shared_errors'] == 2
@@ -9,7 +9,10 @@ def test_sql_files():
         '01_setup.sql',
         '02_tables.sql', 
         '03_data.sql',
-        '04_cortex.sql'
+        '04_cortex.sql',
+        '05_aggregates.sql',
+        '06_insights.sql',
+        '07_ingest.sql'
     ]
     
     print("🧪 Testing SQL Files...")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Tests for the synthetic data generator at a tiny scale
+"""
+import pandas as pd
+from backends import LocalBackend
+from synthetic_data import SyntheticData, build_local_database, load_local, write_files
+
+
+def test_tables_match_the_schema_and_scale():
+    data = SyntheticData(plants=3, items_per_plant=2, suppliers=4, days=60, lines_per_plant=2)
+    tables = {}
+    for table, frame in data.tables(chunk_rows=50):
+        tables.setdefault(table, []).append(frame)
+    production = pd.concat(tables['PRODUCTION'])
+
+    assert len(tables['PRODUCTION']) > 1
+    assert list(production.columns) == [
+        'PRODUCTION_ID', 'PLANT_ID', 'PRODUCT_NAME', 'PRODUCTION_DATE', 'QUANTITY', 'EFFICIENCY_PERCENT'
+    ]
+    assert len(production) == data.production_rows == 3 * 2 * 60
+    assert production['PRODUCTION_ID'].is_unique
+    assert production['PRODUCTION_DATE'].max() == pd.Timestamp('2024-09-01')
+    assert production['EFFICIENCY_PERCENT'].between(0, 100).all()
+    assert {table: sum(len(f) for f in frames) for table, frames in tables.items()} == data.row_counts()
+
+
+def test_generation_is_deterministic_and_chunking_independent():
+    data = SyntheticData(plants=4, days=30, seed=7)
+    small = pd.concat(frame for table, frame in data.tables(chunk_rows=12) if table == 'PRODUCTION')
+    large = pd.concat(frame for table, frame in data.tables(chunk_rows=10000) if table == 'PRODUCTION')
+    assert small['PRODUCTION_ID'].tolist() == large['PRODUCTION_ID'].tolist()
+    again = SyntheticData(plants=4, days=30, seed=7).inventory_frame()
+    pd.testing.assert_frame_equal(data.inventory_frame(), again)
+
+
+def test_weekends_produce_less():
+    data = SyntheticData(plants=20, days=70)
+    production = pd.concat(frame for table, frame in data.tables() if table == 'PRODUCTION')
+    weekday = production['PRODUCTION_DATE'].dt.dayofweek
+    assert production[weekday >= 5]['QUANTITY'].mean() < production[weekday < 5]['QUANTITY'].mean()
+
+
+def test_write_files_and_load(tmp_path):
+    data = SyntheticData(plants=2, items_per_plant=3, suppliers=5, days=10)
+    paths = write_files(data, str(tmp_path / 'out'), fmt='csv', chunk_rows=20)
+    assert any(p.endswith('PRODUCTION/part-00001.csv') for p in paths)
+
+    backend = LocalBackend(engine='sqlite', seed_scripts=['02_tables.sql'])
+    assert load_local(data, backend) == data.row_counts()
+
+
+def test_build_local_database_builds_summaries(tmp_path):
+    data = SyntheticData(plants=3, suppliers=6, days=14)
+    backend = build_local_database(data, str(tmp_path / 'demo.sqlite'), engine='sqlite')
+    assert backend.query("SELECT COUNT(*) as N FROM PRODUCTION_SUMMARY").iloc[0]['N'] == 3